@@ -0,0 +1,145 @@
+import re
+import math
+import time
+import random
+import statistics
+from collections import Counter
+from sparse import Bm25Encoder, tokenize
+from sparse.legal_tokenizer import STOPWORDS
+
+
+# natural's WordTokenizer splits on anything outside [A-Za-z0-9_]
+JS_TOKEN_SPLIT = re.compile(r"[^a-z0-9_]+")
+
+
+def _js_tokenize(text: str) -> list[str]:
+    return [t for t in JS_TOKEN_SPLIT.split(" ".join(text.lower().split())) if t and t not in STOPWORDS]
+
+
+class InMemoryBm25Scan:
+    """Port of BM25LegalIndex (src/rag/retrieval/legalKeywordRetriever.js) for a like-for-like baseline.
+
+    Same data layout (a term-frequency map per chunk) and the same full scan over
+    every chunk per query, so build and query costs scale the way the Node index does.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.docs = {}
+        self.doc_freq = Counter()
+        self.total_length = 0
+
+    def upsert(self, key: str, text: str, payload: dict):
+        terms = _js_tokenize(text)
+        tf = Counter(terms)
+        self.doc_freq.update(tf.keys())
+        self.total_length += len(terms)
+        self.docs[key] = (payload, tf, len(terms))
+
+    def search(self, query: str, top_k: int) -> list[str]:
+        query_terms = _js_tokenize(query)
+        n = max(1, len(self.docs))
+        avgdl = self.total_length / n or 1
+        scores = []
+        for key, (_, tf, length) in self.docs.items():
+            score = 0.0
+            for term in query_terms:
+                df = self.doc_freq.get(term, 0)
+                count = tf.get(term, 0)
+                if not df or not count:
+                    continue
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                score += idf * count * (self.k1 + 1) / (count + self.k1 * (1 - self.b + self.b * length / avgdl))
+            if score > 0:
+                scores.append((score, key))
+        scores.sort(reverse=True)
+        return [key for _, key in scores[:top_k]]
+
+
+def _scroll_chunks(vector_store, text_store=None) -> list[tuple[str, dict]]:
+    chunks = []
+    offset = None
+    while True:
+        points, offset = vector_store.client.scroll(
+            collection_name=vector_store.collection_name,
+            limit=512,
+            offset=offset,
+            with_payload=True,
+            with_vectors=False,
+        )
+        chunks.extend((str(point.id), dict(point.payload or {})) for point in points)
+        if offset is None:
+            break
+
+    missing = [chunk_id for chunk_id, payload in chunks if "text" not in payload]
+    if missing and text_store is not None:
+        texts = text_store.get_texts(missing)
+        for chunk_id, payload in chunks:
+            payload.setdefault("text", texts.get(chunk_id, ""))
+    return chunks
+
+
+def _make_queries(chunks, count: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count * 10):
+        if len(queries) >= count:
+            break
+        terms = sorted(set(tokenize(rng.choice(chunks)[1].get("text", ""))))
+        if len(terms) >= 2:
+            queries.append(" ".join(rng.sample(terms, min(len(terms), rng.randint(2, 4)))))
+    return queries
+
+
+def _latency_ms(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))] * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+    }
+
+
+def run_keyword_benchmark(vector_store, queries: int = 200, top_k: int = 12, seed: int = 7, text_store=None) -> dict:
+    """Time the in-memory scan (warmup build + per-query scan) against Qdrant sparse queries."""
+    if not vector_store.sparse_vector_name:
+        return {"skipped": "collection has no sparse vector"}
+
+    chunks = _scroll_chunks(vector_store, text_store)
+    query_texts = _make_queries(chunks, queries, seed)
+    if not query_texts:
+        return {"skipped": "no chunks to query"}
+
+    build_start = time.perf_counter()
+    scan = InMemoryBm25Scan()
+    for chunk_id, payload in chunks:
+        scan.upsert(chunk_id, payload.get("text", ""), payload)
+    scan_build_seconds = time.perf_counter() - build_start
+
+    scan_latencies = []
+    qdrant_latencies = []
+    overlaps = []
+    for query in query_texts:
+        start = time.perf_counter()
+        scan_keys = scan.search(query, top_k)
+        scan_latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        points = vector_store.keyword_search(Bm25Encoder.encode_query(query), limit=top_k)
+        qdrant_latencies.append(time.perf_counter() - start)
+
+        if scan_keys:
+            qdrant_keys = {str(point.id) for point in points}
+            overlaps.append(len(qdrant_keys.intersection(scan_keys)) / len(scan_keys))
+
+    return {
+        "chunks": len(chunks),
+        "queries": len(query_texts),
+        "top_k": top_k,
+        "scan_build_seconds": round(scan_build_seconds, 4),
+        "scan_query": _latency_ms(scan_latencies),
+        "qdrant_query": _latency_ms(qdrant_latencies),
+        # Share of the scan's top-k that the sparse query also returns (tokenizers differ slightly)
+        "top_k_overlap": round(statistics.fmean(overlaps), 3) if overlaps else None,
+    }
@@ -0,0 +1,121 @@
+import json
+import time
+import random
+import statistics
+from qdrant_client.models import PointStruct
+from chunkstore import compact_payload
+from vectorstore.collection_config import CollectionSpec, create_collection
+from .keyword_search import _latency_ms
+
+
+def _json_bytes(value) -> int:
+    return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+def _scroll_points(vector_store, text_store=None) -> list[tuple[str, list[float], dict]]:
+    """(chunk_id, dense vector, full payload) for every point; compact payloads get their text back."""
+    points = []
+    offset = None
+    while True:
+        page, offset = vector_store.client.scroll(
+            collection_name=vector_store.collection_name,
+            limit=512,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        for point in page:
+            vector = point.vector.get("") if isinstance(point.vector, dict) else point.vector
+            points.append((str(point.id), vector, dict(point.payload or {})))
+        if offset is None:
+            break
+
+    missing = [chunk_id for chunk_id, _, payload in points if "text" not in payload]
+    if missing and text_store is not None:
+        texts = text_store.get_texts(missing)
+        for chunk_id, _, payload in points:
+            if chunk_id in texts:
+                payload["text"] = texts[chunk_id]
+    return points
+
+
+def _search_sample(client, collection: str, query_vectors, top_k: int) -> tuple[list[float], list[int], list[list[str]]]:
+    latencies, response_bytes, result_ids = [], [], []
+    for vector in query_vectors:
+        start = time.perf_counter()
+        result = client.query_points(collection_name=collection, query=vector, limit=top_k, with_payload=True)
+        latencies.append(time.perf_counter() - start)
+        # What a REST client receives for the hits (ids, scores, payloads)
+        response_bytes.append(_json_bytes([
+            {"id": str(point.id), "score": point.score, "payload": point.payload}
+            for point in result.points
+        ]))
+        result_ids.append([str(point.id) for point in result.points])
+    return (latencies, response_bytes, result_ids)
+
+
+def run_payload_benchmark(vector_store, text_store=None, queries: int = 100, top_k: int = 12, seed: int = 7) -> dict:
+    """Payload and search-response bytes with full payloads against compact payloads plus text lookup.
+
+    Both layouts are loaded from the ingested points into scratch collections on the
+    same client, so they hold identical vectors and differ only in payload.
+    """
+    points = _scroll_points(vector_store, text_store)
+    if not points:
+        return {"skipped": "no points to measure"}
+
+    rng = random.Random(seed)
+    query_vectors = [rng.choice(points)[1] for _ in range(queries)]
+    texts = {chunk_id: payload.get("text", "") for chunk_id, _, payload in points}
+    spec = CollectionSpec.from_env(len(points[0][1]))
+    spec.sparse_vector_name = None
+
+    layouts = {
+        "full": [(chunk_id, vector, payload) for chunk_id, vector, payload in points],
+        "compact": [(chunk_id, vector, compact_payload(payload)) for chunk_id, vector, payload in points],
+    }
+    results = {"points": len(points), "queries": len(query_vectors), "top_k": top_k}
+    for layout, layout_points in layouts.items():
+        collection = f"{vector_store.collection_name}__payload_{layout}"
+        create_collection(vector_store.client, collection, spec)
+        try:
+            for i in range(0, len(layout_points), 256):
+                vector_store.client.upsert(
+                    collection_name=collection,
+                    points=[
+                        PointStruct(id=chunk_id, vector=vector, payload=payload)
+                        for chunk_id, vector, payload in layout_points[i:i + 256]
+                    ],
+                    wait=True,
+                )
+            latencies, response_bytes, result_ids = _search_sample(vector_store.client, collection, query_vectors, top_k)
+        finally:
+            vector_store.client.delete_collection(collection)
+
+        payload_bytes = sum(_json_bytes(payload) for _, _, payload in layout_points)
+        stats = {
+            "payload_bytes": payload_bytes,
+            "payload_bytes_per_point": round(payload_bytes / len(layout_points), 1),
+            "search_response_bytes": round(statistics.fmean(response_bytes), 1),
+            "search": _latency_ms(latencies),
+        }
+        if layout == "compact":
+            # The text a caller then fetches for the hits, in one lookup per search
+            stats["text_fetch_bytes"] = round(statistics.fmean(
+                _json_bytes({chunk_id: texts[chunk_id] for chunk_id in ids}) for ids in result_ids
+            ), 1)
+            if text_store is not None:
+                lookups = []
+                for ids in result_ids:
+                    start = time.perf_counter()
+                    text_store.get_texts(ids)
+                    lookups.append(time.perf_counter() - start)
+                stats["text_lookup"] = _latency_ms(lookups)
+        results[layout] = stats
+
+    full, compact = results["full"], results["compact"]
+    results["payload_reduction_pct"] = round((1 - compact["payload_bytes"] / full["payload_bytes"]) * 100, 1)
+    results["response_reduction_pct"] = round(
+        (1 - compact["search_response_bytes"] / full["search_response_bytes"]) * 100, 1
+    )
+    return results
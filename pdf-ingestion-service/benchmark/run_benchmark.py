@@ -0,0 +1,408 @@
+"""End-to-end ingestion benchmark on a synthetic corpus with local stand-ins.
+
+Generates a reproducible legal-PDF corpus, serves it from an in-process S3 server
+(moto) or --s3-endpoint (e.g. MinIO), keeps state in mongomock or --mongo-url, and
+writes vectors to Qdrant local mode or --qdrant-url. Then runs one full incremental
+sync (decide -> fetch -> parse -> chunk -> embed -> upsert).
+
+    pip install -r benchmark/requirements.txt
+    python -m benchmark.run_benchmark --documents 100 --embedder hash --output results.json
+    python -m benchmark.run_benchmark --baseline baseline.json --fail-on-regression 10
+
+After the sync, --keyword-queries compares BM25 keyword search as the Node service
+does it (in-memory index over every chunk) with a sparse-vector query in Qdrant, and
+--payload-queries compares payload and search-response bytes of full payloads with
+compact ones (text in the chunk text store). --payload-mode compact ingests compact.
+--state-backend sqlite keeps ingestion state in a local SQLite file instead, and
+--state-write-through turns off the state store's write-behind buffering.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+from datetime import datetime
+from .synthetic_corpus import CorpusConfig, DEFAULT_DOMAINS, generate_corpus
+from .stand_ins import (
+    BENCHMARK_BUCKET,
+    HashEmbedder,
+    StageTimer,
+    start_s3_stand_in,
+    make_r2_client,
+    upload_corpus,
+    make_state_store,
+    make_vector_store,
+)
+
+
+# (metric, higher_is_better)
+COMPARED_METRICS = (
+    ("docs_per_second", True),
+    ("chunks_per_second", True),
+    ("wall_seconds", False),
+    ("peak_rss_mb", False),
+    ("state_store_seconds", False),
+)
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _stage_wall_seconds(job) -> dict[str, float]:
+    walls = {}
+    for name, stage in job.stages.items():
+        if stage.started_at and stage.finished_at:
+            started = datetime.fromisoformat(stage.started_at)
+            finished = datetime.fromisoformat(stage.finished_at)
+            walls[name] = round((finished - started).total_seconds(), 4)
+    return walls
+
+
+def _make_embedder(kind: str):
+    if kind == "hash":
+        return HashEmbedder()
+    if kind == "remote":
+        from embedding import RemoteEmbedder
+        return RemoteEmbedder()
+    from embedding import get_local_embedder
+    return get_local_embedder()
+
+
+def _instrument(pipeline, timer: StageTimer):
+    """Wrap the pipeline's services so time spent inside each stage is accumulated."""
+    timer.wrap(pipeline.r2_client, "download_pdf", "fetch", count_items=lambda args: 1)
+    timer.wrap(pipeline.r2_client, "download_range", "fetch")
+    timer.wrap(pipeline.parser, "parse", "parse", count_items=lambda args: 1)
+    timer.wrap(pipeline.chunker, "chunk_batch", "chunk", count_items=lambda args: len(args[0]))
+    timer.wrap(pipeline.enricher, "enrich_batch", "chunk")
+    timer.wrap(pipeline.embedder, "embed_matrix", "embed", count_items=lambda args: len(args[0]))
+    if pipeline.sparse_encoder is not None:
+        timer.wrap(pipeline.sparse_encoder, "encode_document", "sparse", count_items=lambda args: 1)
+    timer.wrap(pipeline.vector_store, "upsert_chunks", "upsert", count_items=lambda args: len(args[0]))
+
+
+def run_sync(pipeline, trigger: str, mode: str = "incremental") -> tuple[object, float]:
+    from jobs import IngestionJob
+
+    job = IngestionJob(trigger=trigger, mode=mode)
+    job.mark_running()
+    start = time.perf_counter()
+    try:
+        pipeline.run(job)
+        job.mark_finished()
+    except Exception as e:
+        job.mark_finished(error=str(e))
+        raise
+    return (job, time.perf_counter() - start)
+
+
+def run_benchmark(args) -> dict:
+    workdir = args.workdir or tempfile.mkdtemp(prefix="ingestion-benchmark-")
+    # Manifest, dedup index and spill files go under the benchmark's own data dir;
+    # set before the pipeline modules are imported because they read it at import time
+    os.environ["INGESTION_DATA_DIR"] = os.path.join(workdir, "data")
+    if not args.qdrant_url:
+        # Reindex bulk loads write from several threads, which Qdrant's local mode does not support
+        os.environ.setdefault("QDRANT_REINDEX_PARALLELISM", "1")
+    if args.state_write_through:
+        os.environ["INGESTION_STATE_WRITE_BEHIND"] = "false"
+    from pipeline import IngestionPipeline
+    from parsing import PdfParser
+    from chunkstore import get_chunk_text_store
+
+    config = CorpusConfig(
+        documents=args.documents,
+        min_pages=args.min_pages,
+        max_pages=args.max_pages,
+        words_per_page=args.words_per_page,
+        domains=tuple(args.domains.split(",")),
+        boilerplate=not args.no_boilerplate,
+        seed=args.seed,
+    )
+
+    server = None
+    if args.s3_endpoint:
+        endpoint_url = args.s3_endpoint
+    else:
+        endpoint_url, server = start_s3_stand_in()
+
+    try:
+        r2_client = make_r2_client(endpoint_url, args.bucket)
+        generate_start = time.perf_counter()
+        num_documents, corpus_bytes = upload_corpus(r2_client, generate_corpus(config))
+        generate_seconds = time.perf_counter() - generate_start
+        print(
+            f"Corpus: {num_documents} PDFs, {corpus_bytes / (1024 * 1024):.1f} MB "
+            f"generated and uploaded in {generate_seconds:.2f}s"
+        )
+
+        state_store = make_state_store(args.mongo_url, args.state_backend)
+        pipeline = IngestionPipeline(
+            r2_client=r2_client,
+            state_store=state_store,
+            embedder=_make_embedder(args.embedder),
+            vector_store=make_vector_store(args.qdrant_url, args.qdrant_path),
+            parser=PdfParser(args.pdf_backends) if args.pdf_backends else None,
+            text_store=get_chunk_text_store(
+                state_store.db, backend="sqlite" if state_store.db is None else "mongo"
+            ) if args.payload_mode == "compact" else None,
+        )
+        pipeline._ensure_services()
+        timer = StageTimer()
+        _instrument(pipeline, timer)
+
+        job, wall_seconds = run_sync(pipeline, trigger="benchmark")
+        # The headline metrics cover the first sync only; each extra run reports its own stage times
+        stage_busy = timer.to_dict()
+        chunks = timer.items.get("upsert", 0)
+        timer.reset()
+        rerun = None
+        if args.rerun:
+            _, rerun_seconds = run_sync(pipeline, trigger="benchmark-rerun")
+            rerun = {"wall_seconds": round(rerun_seconds, 4), "stage_busy": timer.to_dict()}
+            timer.reset()
+        rebuild = None
+        if args.rebuild:
+            # Both load a fresh collection; only the rebuild reads stored parsed text instead of the PDFs
+            _, reindex_seconds = run_sync(pipeline, trigger="benchmark-reindex", mode="reindex")
+            reindex_busy = timer.to_dict()
+            timer.reset()
+            rebuild_job, rebuild_seconds = run_sync(pipeline, trigger="benchmark-rebuild", mode="rebuild")
+            rebuild = {
+                "reindex_seconds": round(reindex_seconds, 4),
+                "reindex_stage_busy": reindex_busy,
+                "rebuild_seconds": round(rebuild_seconds, 4),
+                "rebuild_stage_busy": timer.to_dict(),
+                "from_parsed_text": rebuild_job.summary.get("from_parsed_text", 0),
+                "parsed_text_store": pipeline.parsed_store.stats() if pipeline.parsed_store is not None else None,
+            }
+        keyword_search = None
+        if args.keyword_queries:
+            from .keyword_search import run_keyword_benchmark
+            keyword_search = run_keyword_benchmark(
+                pipeline.vector_store, queries=args.keyword_queries, text_store=pipeline.text_store
+            )
+        payload_size = None
+        if args.payload_queries:
+            from .payload_size import run_payload_benchmark
+            payload_size = run_payload_benchmark(
+                pipeline.vector_store, pipeline.text_store, queries=args.payload_queries
+            )
+    finally:
+        if server is not None:
+            server.stop()
+        if not args.workdir and not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    documents = job.summary.get("successful_upserts", 0)
+
+    return {
+        "created_at": datetime.utcnow().isoformat(),
+        "corpus": {**config.to_dict(), "bytes": corpus_bytes},
+        "backends": {
+            "s3": args.s3_endpoint or "moto",
+            "mongo": "mongo" if args.mongo_url else "mongomock",
+            "state": args.state_backend,
+            "qdrant": args.qdrant_url or ("local:" + args.qdrant_path if args.qdrant_path else "memory"),
+            "embedder": args.embedder,
+            "pdf": ",".join(backend.name for backend in pipeline.parser.backends),
+            "payload": args.payload_mode,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "wall_seconds": round(wall_seconds, 4),
+        "rerun_wall_seconds": rerun["wall_seconds"] if rerun else None,
+        "documents": documents,
+        "chunks": chunks,
+        "docs_per_second": round(documents / wall_seconds, 3) if wall_seconds > 0 else 0.0,
+        "chunks_per_second": round(chunks / wall_seconds, 3) if wall_seconds > 0 else 0.0,
+        "mb_per_second": round(corpus_bytes / (1024 * 1024) / wall_seconds, 3) if wall_seconds > 0 else 0.0,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "state_store_seconds": job.summary.get("state_store", {}).get("seconds"),
+        "stage_wall_seconds": _stage_wall_seconds(job),
+        "stage_busy": stage_busy,
+        "keyword_search": keyword_search,
+        "payload_size": payload_size,
+        "rerun": rerun,
+        "rebuild": rebuild,
+        "job_summary": job.summary,
+    }
+
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance_pct: float = None) -> list[str]:
+    """Print metric changes against the baseline; returns the metrics that regressed past tolerance."""
+    regressions = []
+    print(f"\n{'metric':<22}{'baseline':>12}{'current':>12}{'change':>10}")
+
+    rows = [(metric, higher, baseline.get(metric), results.get(metric)) for metric, higher in COMPARED_METRICS]
+    for stage, busy in results.get("stage_busy", {}).items():
+        previous = baseline.get("stage_busy", {}).get(stage, {}).get("busy_seconds")
+        rows.append((f"{stage}_busy_seconds", False, previous, busy["busy_seconds"]))
+
+    for metric, higher_is_better, previous, current in rows:
+        if not previous or current is None:
+            continue
+        change_pct = (current - previous) / previous * 100
+        worse_pct = -change_pct if higher_is_better else change_pct
+        marker = ""
+        if tolerance_pct is not None and worse_pct > tolerance_pct:
+            regressions.append(metric)
+            marker = "  REGRESSION"
+        print(f"{metric:<22}{previous:>12.3f}{current:>12.3f}{change_pct:>+9.1f}%{marker}")
+
+    return regressions
+
+
+def _busy_total(stage_busy: dict) -> float:
+    return sum(busy["busy_seconds"] for busy in stage_busy.values())
+
+
+def print_results(results: dict):
+    print("\n=== Benchmark Results ===")
+    print(
+        f"{results['documents']} documents, {results['chunks']} chunks in {results['wall_seconds']:.2f}s "
+        f"({results['docs_per_second']:.2f} docs/s, {results['chunks_per_second']:.1f} chunks/s, "
+        f"{results['mb_per_second']:.2f} MB/s)"
+    )
+    print(f"Peak RSS: {results['peak_rss_mb']:.1f} MB")
+    state = results["job_summary"].get("state_store")
+    if state:
+        operations = ", ".join(
+            f"{name} {stats['calls']}x {stats['seconds']:.3f}s" for name, stats in state["by_operation"].items()
+        )
+        mode = "write-behind" if state["write_behind"] else "write-through"
+        print(f"State store ({state['backend']}, {mode}): {state['seconds']:.3f}s in {state['calls']} call(s): {operations}")
+    rerun = results.get("rerun")
+    if rerun:
+        print(f"No-change rerun: {rerun['wall_seconds']:.2f}s ({_busy_total(rerun['stage_busy']):.2f}s stage busy)")
+    rebuild = results.get("rebuild")
+    if rebuild:
+        store = rebuild["parsed_text_store"] or {}
+        print(
+            f"Reindex from PDFs: {rebuild['reindex_seconds']:.2f}s, rebuild from parsed text: {rebuild['rebuild_seconds']:.2f}s "
+            f"({rebuild['from_parsed_text']} document(s) from {store.get('bytes', 0) / (1024 * 1024):.2f} MB of stored pages; "
+            f"stage busy {_busy_total(rebuild['reindex_stage_busy']):.2f}s / {_busy_total(rebuild['rebuild_stage_busy']):.2f}s)"
+        )
+
+    print("Stage wall seconds: " + ", ".join(f"{k}={v:.2f}" for k, v in results["stage_wall_seconds"].items()))
+    print("Stage busy seconds (summed across threads):")
+    for stage, busy in results["stage_busy"].items():
+        print(f"  {stage:<8} {busy['busy_seconds']:8.2f}s  {busy['calls']} calls  {busy['items']} items")
+
+    for name, stats in results["job_summary"].get("parse_backends", {}).items():
+        print(
+            f"PDF backend {name}: {stats['documents']} document(s), {stats['pages_per_second']:.1f} pages/s, "
+            f"{stats['failures']} failure(s)"
+        )
+
+    keyword = results.get("keyword_search")
+    if keyword and "skipped" not in keyword:
+        print(f"Keyword search over {keyword['chunks']} chunks, {keyword['queries']} queries (top {keyword['top_k']}):")
+        print(f"  in-memory scan  build {keyword['scan_build_seconds']:.3f}s, query p50 {keyword['scan_query']['p50_ms']:.2f}ms / p95 {keyword['scan_query']['p95_ms']:.2f}ms")
+        print(f"  qdrant sparse   build during ingest, query p50 {keyword['qdrant_query']['p50_ms']:.2f}ms / p95 {keyword['qdrant_query']['p95_ms']:.2f}ms")
+        print(f"  top-k overlap {keyword['top_k_overlap']}")
+        if not results["backends"]["qdrant"].startswith("http"):
+            print("  (Qdrant local mode scores sparse queries in Python; use --qdrant-url for server latency)")
+    elif keyword:
+        print(f"Keyword search: skipped ({keyword['skipped']})")
+
+    payload = results.get("payload_size")
+    if payload and "skipped" not in payload:
+        full, compact = payload["full"], payload["compact"]
+        print(f"Payload size over {payload['points']} points, {payload['queries']} searches (top {payload['top_k']}):")
+        print(
+            f"  full     {full['payload_bytes'] / (1024 * 1024):.2f} MB ({full['payload_bytes_per_point']:.0f} B/point), "
+            f"search response {full['search_response_bytes']:.0f} B, p50 {full['search']['p50_ms']:.2f}ms"
+        )
+        lookup = compact.get("text_lookup")
+        lookup_note = f" + text lookup p50 {lookup['p50_ms']:.2f}ms" if lookup else ""
+        print(
+            f"  compact  {compact['payload_bytes'] / (1024 * 1024):.2f} MB ({compact['payload_bytes_per_point']:.0f} B/point), "
+            f"search response {compact['search_response_bytes']:.0f} B, p50 {compact['search']['p50_ms']:.2f}ms{lookup_note}"
+        )
+        print(
+            f"  payload -{payload['payload_reduction_pct']:.1f}%, search response -{payload['response_reduction_pct']:.1f}% "
+            f"(texts for the hits add {compact['text_fetch_bytes']:.0f} B when fetched)"
+        )
+    elif payload:
+        print(f"Payload size: skipped ({payload['skipped']})")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    corpus = parser.add_argument_group("corpus")
+    corpus.add_argument("--documents", type=int, default=50)
+    corpus.add_argument("--min-pages", type=int, default=2)
+    corpus.add_argument("--max-pages", type=int, default=20)
+    corpus.add_argument("--words-per-page", type=int, default=350)
+    corpus.add_argument("--domains", default=",".join(DEFAULT_DOMAINS))
+    corpus.add_argument("--no-boilerplate", action="store_true", help="omit repeated headers and footers")
+    corpus.add_argument("--seed", type=int, default=42)
+
+    backends = parser.add_argument_group("backends")
+    backends.add_argument("--s3-endpoint", help="existing S3-compatible endpoint instead of moto")
+    backends.add_argument("--bucket", default=BENCHMARK_BUCKET)
+    backends.add_argument("--mongo-url", help="real Mongo instead of mongomock")
+    backends.add_argument("--qdrant-url", help="Qdrant server instead of local mode")
+    backends.add_argument("--qdrant-path", help="on-disk Qdrant local mode instead of in-memory")
+    backends.add_argument("--pdf-backends", help="PDF extraction fallback chain, e.g. pypdfium2,pypdf (default: PDF_BACKENDS)")
+    backends.add_argument("--embedder", choices=["hash", "local", "remote"], default="local")
+    backends.add_argument("--payload-mode", choices=["full", "compact"], default="full", help="Qdrant payload layout to ingest with")
+    backends.add_argument("--state-backend", choices=["mongo", "sqlite"], default="mongo", help="ingestion state in Mongo (or mongomock) or a SQLite file")
+    backends.add_argument("--state-write-through", action="store_true", help="write every state update at once instead of at stage boundaries")
+
+    output = parser.add_argument_group("output")
+    output.add_argument("--output", help="write results JSON here")
+    output.add_argument("--baseline", help="compare against this results JSON")
+    output.add_argument("--save-baseline", action="store_true", help="write results to --baseline")
+    output.add_argument("--fail-on-regression", type=float, metavar="PCT", help="exit 1 if a metric is PCT%% worse than baseline")
+    output.add_argument("--rerun", action="store_true", help="also time a second sync with nothing changed")
+    output.add_argument("--rebuild", action="store_true", help="also time a reindex from the PDFs and a rebuild from parsed text")
+    output.add_argument("--keyword-queries", type=int, default=200, metavar="N", help="keyword search queries to time (0 to skip)")
+    output.add_argument("--payload-queries", type=int, default=100, metavar="N", help="searches for the payload size comparison (0 to skip)")
+    output.add_argument("--workdir", help="keep data (manifest, dedup index, spill) here")
+    output.add_argument("--keep-workdir", action="store_true")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = run_benchmark(args)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, default=str)
+        print(f"\nResults written to {args.output}")
+
+    regressions = []
+    if args.baseline:
+        if args.save_baseline:
+            with open(args.baseline, "w") as f:
+                json.dump(results, f, indent=2, default=str)
+            print(f"Baseline saved to {args.baseline}")
+        elif os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+            regressions = compare_to_baseline(results, baseline, args.fail_on_regression)
+        else:
+            print(f"Baseline {args.baseline} not found; run with --save-baseline to create it")
+
+    if regressions:
+        print(f"\nRegressed beyond {args.fail_on_regression}%: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+"""Several ingestion workers sharing one sync through Mongo document leases.
+
+Each worker runs a full incremental sync with its own data dir (manifest, dedup
+index, BM25 vocabulary, journal artifacts) against the same bucket, state database
+and collection, and claims every document before downloading it. The report shows
+how the documents were divided and whether any was processed twice.
+
+    python -m benchmark.sharded_workers --workers 4 --documents 80
+    python -m benchmark.sharded_workers --workers 4 --stale-leases 5 --stale-ttl 1
+    python -m benchmark.sharded_workers --processes --workers 4 \\
+        --mongo-url mongodb://localhost:27017/lease_test --qdrant-url http://localhost:6333
+
+Threads share mongomock and Qdrant local mode; --processes runs one OS process per
+worker and needs a real Mongo and Qdrant server. --stale-leases pre-seeds leases
+from a worker that "crashed", which the others take over once they expire.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import multiprocessing
+from collections import Counter
+from datetime import datetime, timedelta
+from .synthetic_corpus import CorpusConfig, generate_corpus
+from .stand_ins import (
+    BENCHMARK_BUCKET,
+    HashEmbedder,
+    start_s3_stand_in,
+    make_r2_client,
+    upload_corpus,
+    make_state_store,
+    make_vector_store,
+)
+
+
+class _SerializedClient:
+    """Qdrant's local mode is not safe for concurrent writers; threads share it through one lock."""
+
+    def __init__(self, client):
+        self._client = client
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            with self._lock:
+                return attr(*args, **kwargs)
+
+        return call
+
+
+def _build_worker(worker_id: str, data_dir: str, r2_client, state_store, vector_store):
+    from pipeline import IngestionPipeline
+    from r2 import R2Manifest
+    from dedup import ChunkDeduplicator
+    from sparse import Bm25Encoder
+    from state import IngestionJournal, DocumentLeaseStore
+
+    os.makedirs(data_dir, exist_ok=True)
+    pipeline = IngestionPipeline(
+        r2_client=r2_client,
+        state_store=state_store,
+        embedder=HashEmbedder(),
+        vector_store=vector_store,
+        manifest=R2Manifest(os.path.join(data_dir, "r2_manifest.json.gz")),
+        deduplicator=ChunkDeduplicator(index_path=os.path.join(data_dir, "dedup_index.json.gz")),
+        journal=IngestionJournal(state_store.db, artifact_dir=os.path.join(data_dir, "journal")),
+        sparse_encoder=Bm25Encoder(os.path.join(data_dir, "bm25_vocabulary.json")),
+        leases=DocumentLeaseStore(state_store.db, worker_id=worker_id),
+    )
+    pipeline._ensure_services()
+
+    processed = []
+    parse = pipeline.parser.parse
+
+    def recording_parse(doc_id, file_bytes):
+        processed.append(doc_id)
+        return parse(doc_id, file_bytes)
+
+    pipeline.parser.parse = recording_parse
+    return (pipeline, processed)
+
+
+def _run_worker(pipeline, processed: list[str]) -> dict:
+    from .run_benchmark import run_sync
+
+    job, wall_seconds = run_sync(pipeline, trigger="sharded-benchmark")
+    return {
+        "worker_id": pipeline.leases.worker_id,
+        "wall_seconds": round(wall_seconds, 3),
+        "processed": processed,
+        "successful_upserts": job.summary.get("successful_upserts", 0),
+        "leased_elsewhere": job.summary.get("leased_elsewhere", 0),
+        "error": job.error,
+    }
+
+
+def _process_worker(worker_id: str, workdir: str, endpoint_url: str, args, results):
+    # A fresh interpreter: point the data dir at this worker before the pipeline is imported
+    data_dir = os.path.join(workdir, worker_id)
+    os.environ["INGESTION_DATA_DIR"] = data_dir
+    os.makedirs(data_dir, exist_ok=True)
+    pipeline, processed = _build_worker(
+        worker_id,
+        data_dir,
+        make_r2_client(endpoint_url, args.bucket),
+        make_state_store(args.mongo_url),
+        make_vector_store(args.qdrant_url),
+    )
+    results.put(_run_worker(pipeline, processed))
+
+
+def _seed_stale_leases(state_store, doc_ids: list[str], ttl_seconds: float):
+    expires_at = datetime.utcnow() + timedelta(seconds=ttl_seconds)
+    for doc_id in doc_ids:
+        state_store.db["ingestion_leases"].update_one(
+            {"_id": doc_id},
+            {"$set": {"worker_id": "crashed-worker", "expires_at": expires_at, "claimed_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+
+def run_sharded(args) -> dict:
+    workdir = args.workdir or tempfile.mkdtemp(prefix="ingestion-sharded-")
+    os.environ["INGESTION_DATA_DIR"] = os.path.join(workdir, "shared")
+    os.makedirs(os.environ["INGESTION_DATA_DIR"], exist_ok=True)
+
+    endpoint_url, server = start_s3_stand_in()
+    try:
+        r2_client = make_r2_client(endpoint_url, args.bucket)
+        corpus = CorpusConfig(documents=args.documents, max_pages=args.max_pages, seed=args.seed)
+        num_documents, corpus_bytes = upload_corpus(r2_client, generate_corpus(corpus))
+        print(f"Corpus: {num_documents} PDFs, {corpus_bytes / (1024 * 1024):.1f} MB")
+
+        state_store = make_state_store(args.mongo_url)
+        vector_store = make_vector_store(args.qdrant_url)
+        if not args.qdrant_url:
+            vector_store.client = _SerializedClient(vector_store.client)
+        if args.stale_leases:
+            stale = [r2_client.build_pdf_document(obj).doc_id for obj in r2_client.list_objects_parallel()][:args.stale_leases]
+            _seed_stale_leases(state_store, stale, args.stale_ttl)
+            print(f"Seeded {len(stale)} lease(s) from a crashed worker, expiring in {args.stale_ttl}s")
+
+        worker_ids = [f"worker-{i}" for i in range(args.workers)]
+        start = time.perf_counter()
+        if args.processes:
+            context = multiprocessing.get_context("spawn")
+            queue = context.Queue()
+            children = [
+                context.Process(target=_process_worker, args=(worker_id, workdir, endpoint_url, args, queue))
+                for worker_id in worker_ids
+            ]
+            for child in children:
+                child.start()
+            workers = [queue.get() for _ in children]
+            for child in children:
+                child.join()
+        else:
+            built = [
+                _build_worker(worker_id, os.path.join(workdir, worker_id), r2_client, state_store, vector_store)
+                for worker_id in worker_ids
+            ]
+            workers = [None] * len(built)
+
+            def run(index: int):
+                workers[index] = _run_worker(*built[index])
+
+            threads = [threading.Thread(target=run, args=(i,)) for i in range(len(built))]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        wall_seconds = time.perf_counter() - start
+
+        completed = state_store.collection.count_documents({"upsert_completed": True})
+        points = vector_store.client.count(vector_store.collection_name, exact=True).count
+    finally:
+        server.stop()
+        if not args.workdir and not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    processed_by = Counter(doc_id for worker in workers for doc_id in set(worker["processed"]))
+    return {
+        "documents": num_documents,
+        "workers": len(workers),
+        "mode": "processes" if args.processes else "threads",
+        "wall_seconds": round(wall_seconds, 3),
+        "per_worker": {
+            worker["worker_id"]: {
+                "documents": len(set(worker["processed"])),
+                "successful_upserts": worker["successful_upserts"],
+                "leased_elsewhere": worker["leased_elsewhere"],
+                "wall_seconds": worker["wall_seconds"],
+                "error": worker["error"],
+            }
+            for worker in sorted(workers, key=lambda w: w["worker_id"])
+        },
+        "distinct_processed": len(processed_by),
+        "processed_twice": sorted(doc_id for doc_id, count in processed_by.items() if count > 1),
+        "state_completed": completed,
+        "points": points,
+    }
+
+
+def print_results(results: dict):
+    print(f"\n=== Sharded ingestion: {results['workers']} {results['mode']} over {results['documents']} documents ===")
+    for worker_id, stats in results["per_worker"].items():
+        error = f", error: {stats['error']}" if stats["error"] else ""
+        print(
+            f"  {worker_id:<10} {stats['documents']:>5} document(s) in {stats['wall_seconds']:.2f}s, "
+            f"{stats['leased_elsewhere']} left to others{error}"
+        )
+    print(
+        f"Distinct documents processed: {results['distinct_processed']}/{results['documents']}, "
+        f"processed twice: {len(results['processed_twice'])}, state completed: {results['state_completed']}, "
+        f"points: {results['points']}, wall {results['wall_seconds']:.2f}s"
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--documents", type=int, default=80)
+    parser.add_argument("--max-pages", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--bucket", default=BENCHMARK_BUCKET)
+    parser.add_argument("--processes", action="store_true", help="one OS process per worker (needs --mongo-url and --qdrant-url)")
+    parser.add_argument("--mongo-url", help="real Mongo instead of mongomock")
+    parser.add_argument("--qdrant-url", help="Qdrant server instead of local mode")
+    parser.add_argument("--stale-leases", type=int, default=0, metavar="N", help="pre-seed N leases from a crashed worker")
+    parser.add_argument("--stale-ttl", type=float, default=1.0, metavar="SECONDS", help="when the seeded leases expire")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--workdir")
+    parser.add_argument("--keep-workdir", action="store_true")
+    args = parser.parse_args(argv)
+    if args.processes and not (args.mongo_url and args.qdrant_url):
+        parser.error("--processes needs --mongo-url and --qdrant-url (mongomock and local Qdrant live in one process)")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = run_sharded(args)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    ok = not results["processed_twice"] and results["state_completed"] == results["documents"]
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
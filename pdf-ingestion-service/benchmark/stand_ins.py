@@ -0,0 +1,151 @@
+import time
+import socket
+import logging
+import hashlib
+import threading
+from collections import defaultdict
+import numpy as np
+
+
+BENCHMARK_BUCKET = "benchmark-pdfs"
+BENCHMARK_CREDENTIALS = {"access_key_id": "benchmark", "secret_access_key": "benchmark"}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_s3_stand_in() -> tuple[str, object]:
+    """Start an in-process moto S3 server; returns (endpoint_url, server)."""
+    from moto.server import ThreadedMotoServer
+
+    # Keep the per-request access log out of the benchmark output
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    port = _free_port()
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port)
+    server.start()
+    return (f"http://127.0.0.1:{port}", server)
+
+
+def make_r2_client(endpoint_url: str, bucket_name: str = BENCHMARK_BUCKET):
+    from r2 import R2Client
+
+    return R2Client(
+        account_id="benchmark",
+        access_key_id=BENCHMARK_CREDENTIALS["access_key_id"],
+        secret_access_key=BENCHMARK_CREDENTIALS["secret_access_key"],
+        bucket_name=bucket_name,
+        endpoint_url=endpoint_url,
+    )
+
+
+def upload_corpus(r2_client, documents) -> tuple[int, int]:
+    """Create the bucket if needed and upload SyntheticDocuments; returns (count, bytes)."""
+    s3 = r2_client.client
+    try:
+        s3.create_bucket(Bucket=r2_client.bucket_name)
+    except s3.exceptions.BucketAlreadyOwnedByYou:
+        pass
+
+    count = 0
+    total_bytes = 0
+    for document in documents:
+        s3.put_object(
+            Bucket=r2_client.bucket_name,
+            Key=document.object_key,
+            Body=document.data,
+            ContentType="application/pdf"
+        )
+        count += 1
+        total_bytes += len(document.data)
+    return (count, total_bytes)
+
+
+def make_state_store(mongo_url: str = None, backend: str = "mongo"):
+    """A SQLite state store under the data dir, or DocumentStateStore on a real Mongo when mongo_url is given, otherwise on mongomock."""
+    from state import DocumentStateStore, SqliteDocumentStateStore
+
+    if backend == "sqlite":
+        return SqliteDocumentStateStore()
+    if mongo_url:
+        return DocumentStateStore(mongo_url=mongo_url)
+
+    import mongomock
+    return DocumentStateStore(mongo_url="mongodb://benchmark", client=mongomock.MongoClient())
+
+
+def make_vector_store(qdrant_url: str = None, qdrant_path: str = None):
+    """QdrantVectorStore on a server, a local on-disk path, or Qdrant's in-memory local mode."""
+    from qdrant_client import QdrantClient
+    from vectorstore import QdrantVectorStore
+
+    if qdrant_url:
+        return QdrantVectorStore(url=qdrant_url)
+    client = QdrantClient(path=qdrant_path) if qdrant_path else QdrantClient(location=":memory:")
+    return QdrantVectorStore(client=client)
+
+
+class HashEmbedder:
+    """Deterministic pseudo-embeddings for measuring the pipeline without a model."""
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+
+    def _vector(self, text: str) -> np.ndarray:
+        seed = int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dimension).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def embed_matrix(self, texts: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        matrix = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for idx, text in enumerate(texts):
+            matrix[idx] = self._vector(text)
+        return (matrix, np.ones(len(texts), dtype=bool))
+
+    def embed_batch(self, texts: list[str]) -> list[tuple[int, list[float]]]:
+        return [(idx, self._vector(text).tolist()) for idx, text in enumerate(texts)]
+
+
+class StageTimer:
+    """Accumulates time spent inside wrapped service methods, per stage, across threads."""
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.items = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self.seconds.clear()
+            self.calls.clear()
+            self.items.clear()
+
+    def wrap(self, obj, method_name: str, stage: str, count_items=None):
+        original = getattr(obj, method_name)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                items = count_items(args) if count_items else 0
+                with self._lock:
+                    self.seconds[stage] += elapsed
+                    self.calls[stage] += 1
+                    self.items[stage] += items
+
+        setattr(obj, method_name, timed)
+
+    def to_dict(self) -> dict:
+        return {
+            stage: {
+                "busy_seconds": round(self.seconds[stage], 4),
+                "calls": self.calls[stage],
+                "items": self.items[stage],
+            }
+            for stage in sorted(self.seconds)
+        }
@@ -0,0 +1,164 @@
+import random
+from dataclasses import dataclass, field
+
+
+DEFAULT_DOMAINS = ("judgments", "contracts", "statutes", "regulations")
+
+VOCABULARY = (
+    "the court held that appellant respondent petitioner tribunal section act clause "
+    "agreement party parties liability damages contract breach notice evidence order "
+    "judgment appeal statute provision hereby whereas pursuant thereof herein shall "
+    "reasonable jurisdiction plaintiff defendant counsel hearing remedy injunction "
+    "indemnify warranty termination consideration obligation arbitration award costs"
+).split()
+
+HEADER = "IN THE HIGH COURT OF JUDICATURE - CERTIFIED COPY"
+FOOTER = "This document is provided for information only and does not constitute legal advice."
+
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+FONT_SIZE = 10
+LINE_HEIGHT = 12
+LINE_CHARS = 95
+
+
+@dataclass
+class CorpusConfig:
+    documents: int = 50
+    min_pages: int = 2
+    max_pages: int = 20
+    # Words of body text per page; ~350 is a dense legal page
+    words_per_page: int = 350
+    domains: tuple = DEFAULT_DOMAINS
+    # Repeated header/footer on every page, to exercise dedup
+    boilerplate: bool = True
+    seed: int = 42
+
+    def to_dict(self) -> dict:
+        return {
+            "documents": self.documents,
+            "min_pages": self.min_pages,
+            "max_pages": self.max_pages,
+            "words_per_page": self.words_per_page,
+            "domains": list(self.domains),
+            "boilerplate": self.boilerplate,
+            "seed": self.seed,
+        }
+
+
+@dataclass
+class SyntheticDocument:
+    object_key: str
+    domain: str
+    pages: int
+    data: bytes = field(repr=False)
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _wrap(words: list[str]) -> list[str]:
+    lines = []
+    current = []
+    length = 0
+    for word in words:
+        if current and length + len(word) + 1 > LINE_CHARS:
+            lines.append(" ".join(current))
+            current, length = [], 0
+        current.append(word)
+        length += len(word) + 1
+    if current:
+        lines.append(" ".join(current))
+    return lines
+
+
+def _page_stream(lines: list[str]) -> bytes:
+    ops = ["BT", f"/F1 {FONT_SIZE} Tf", f"{LINE_HEIGHT} TL", f"50 {PAGE_HEIGHT - 50} Td"]
+    for line in lines:
+        # A blank line still needs a Tj, or extractors drop the paragraph break
+        ops.append(f"({_escape(line) or ' '}) Tj T*")
+    ops.append("ET")
+    return "\n".join(ops).encode("latin-1")
+
+
+def build_pdf(pages: list[list[str]]) -> bytes:
+    """Minimal multi-page PDF with Helvetica text; each page is a list of lines ("" for a blank line)."""
+    objects = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog_id = add(b"")
+    pages_id = add(b"")
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    page_ids = []
+    for lines in pages:
+        stream = _page_stream(lines)
+        content_id = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (pages_id, PAGE_WIDTH, PAGE_HEIGHT, font_id, content_id)
+        ))
+
+    objects[catalog_id - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog_id, xref_offset)
+    return bytes(out)
+
+
+def _page_lines(rng: random.Random, config: CorpusConfig, page_number: int, total_pages: int) -> list[str]:
+    lines = []
+    if config.boilerplate:
+        lines += [HEADER, ""]
+
+    remaining = config.words_per_page
+    while remaining > 0:
+        paragraph_words = min(remaining, rng.randint(40, 140))
+        words = []
+        for _ in range(paragraph_words):
+            words.append(rng.choice(VOCABULARY))
+        # Sentence breaks every 8-25 words
+        position = 0
+        while position < len(words):
+            position += rng.randint(8, 25)
+            if position <= len(words):
+                words[position - 1] += "."
+        words[0] = words[0].capitalize()
+        lines += _wrap(words) + [""]
+        remaining -= paragraph_words
+
+    if config.boilerplate:
+        lines += [FOOTER, f"Page {page_number} of {total_pages}"]
+    return lines
+
+
+def generate_corpus(config: CorpusConfig):
+    """Yield SyntheticDocuments; the same config always produces the same bytes."""
+    rng = random.Random(config.seed)
+
+    for number in range(config.documents):
+        domain = config.domains[number % len(config.domains)]
+        total_pages = rng.randint(config.min_pages, config.max_pages)
+        pages = [_page_lines(rng, config, page, total_pages) for page in range(1, total_pages + 1)]
+        yield SyntheticDocument(
+            object_key=f"{domain}/synthetic-{number:05d}.pdf",
+            domain=domain,
+            pages=total_pages,
+            data=build_pdf(pages)
+        )
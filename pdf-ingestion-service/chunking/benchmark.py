@@ -0,0 +1,140 @@
+"""Chunker micro-benchmark on a synthetic document.
+
+    python -m chunking.benchmark --pages 5000
+    python -m chunking.benchmark --pages 2000 --size-unit tokens --across-pages
+
+The second table compares holding a document's chunks as list[TextChunk] with
+per-chunk vector lists against a ChunkBatch with a vector matrix: time to chunk,
+enrich and attach vectors, and memory retained per chunk (tracemalloc).
+"""
+import argparse
+import random
+import time
+import tracemalloc
+import numpy as np
+from models import ParsedPage, ChunkBatch
+from .legal_chunker import LegalChunker
+from .metadata_enricher import MetadataEnricher
+
+
+WORDS = (
+    "court appellant respondent section act judgment petition order tribunal evidence "
+    "contract clause liability damages statute provision hereby whereas pursuant thereof"
+).split()
+
+
+def synthetic_pages(num_pages: int, seed: int = 7) -> list[ParsedPage]:
+    rng = random.Random(seed)
+    pages = []
+
+    for page_number in range(1, num_pages + 1):
+        paragraphs = []
+        for _ in range(rng.randint(3, 9)):
+            sentences = [
+                " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 30))).capitalize() + "."
+                for _ in range(rng.randint(1, 12))
+            ]
+            paragraphs.append(" ".join(sentences))
+        pages.append(ParsedPage(
+            doc_id="benchmark.pdf",
+            page_number=page_number,
+            page_label=str(page_number),
+            text="\n\n".join(paragraphs)
+        ))
+
+    return pages
+
+
+def run(chunker: LegalChunker, pages: list[ParsedPage], repeat: int) -> tuple[float, list]:
+    best = float("inf")
+    chunks = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = chunker.chunk_pages(pages)
+        best = min(best, time.perf_counter() - start)
+    return (best, chunks)
+
+
+def build_objects(chunker: LegalChunker, pages: list[ParsedPage], dimension: int):
+    """The per-object representation: TextChunks plus (idx, list[float]) per chunk."""
+    chunks = MetadataEnricher().enrich(chunker.chunk_pages(pages), pages, domain="benchmark")
+    rng = np.random.default_rng(0)
+    vectors = [(idx, rng.standard_normal(dimension, dtype=np.float32).tolist()) for idx in range(len(chunks))]
+    return (chunks, vectors)
+
+
+def build_batch(chunker: LegalChunker, pages: list[ParsedPage], dimension: int) -> ChunkBatch:
+    batch = MetadataEnricher().enrich_batch(chunker.chunk_batch(pages), pages, domain="benchmark")
+    rng = np.random.default_rng(0)
+    batch.attach_vectors(rng.standard_normal((len(batch), dimension), dtype=np.float32))
+    return batch
+
+
+def measure(build, repeat: int) -> tuple[float, int]:
+    """(best seconds, bytes still allocated by the result) for build()."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = build()
+        best = min(best, time.perf_counter() - start)
+        del result
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del result
+    return (best, retained)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--size-unit", choices=["chars", "tokens"], default="chars")
+    parser.add_argument("--across-pages", action="store_true")
+    parser.add_argument("--dimension", type=int, default=384, help="vector size for the representation comparison")
+    args = parser.parse_args()
+
+    pages = synthetic_pages(args.pages)
+    total_mb = sum(len(page.text) for page in pages) / (1024 * 1024)
+    print(f"{args.pages} pages, {total_mb:.1f} MB of text (best of {args.repeat})")
+
+    chunkers = {
+        "legacy": LegalChunker(mode="legacy"),
+        f"offset/{args.size_unit}": LegalChunker(
+            mode="offset",
+            size_unit=args.size_unit,
+            across_pages=args.across_pages
+        ),
+    }
+
+    for name, chunker in chunkers.items():
+        seconds, chunks = run(chunker, pages, args.repeat)
+        chunked_mb = sum(len(chunk.text) for chunk in chunks) / (1024 * 1024)
+        print(
+            f"  {name:<16} {seconds:8.3f}s  {total_mb / seconds:8.1f} MB/s  "
+            f"{len(chunks)} chunks  {chunked_mb:.1f} MB chunked"
+        )
+
+    chunker = chunkers[f"offset/{args.size_unit}"]
+    sample = chunker.chunk_batch(pages)
+    num_chunks = len(sample)
+    text_bytes = sample.text_chars() / num_chunks
+    del sample
+    print(
+        f"Chunk representation, chunk + enrich + {args.dimension}-dim vectors "
+        f"({num_chunks} chunks, ~{text_bytes:.0f} B of text each):"
+    )
+    representations = {
+        "list[TextChunk]": lambda: build_objects(chunker, pages, args.dimension),
+        "ChunkBatch": lambda: build_batch(chunker, pages, args.dimension),
+    }
+    for name, build in representations.items():
+        seconds, retained = measure(build, args.repeat)
+        print(f"  {name:<16} {seconds:8.3f}s  {retained / num_chunks:8.0f} B/chunk  {retained / (1024 * 1024):.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,266 @@
+import os
 import re
-from models import ParsedPage, RawChunk
+import bisect
+from typing import Callable, Optional
+from models import ParsedPage, RawChunk, ChunkBatch
+from models.chunk_batch import NO_PAGE
+from .token_counter import count_tokens
 
 
 MIN_CHUNK_SIZE = 600
 MAX_CHUNK_SIZE = 800
 OVERLAP_PARAGRAPHS = 1
 
+# "offset" (linear-time, exact offsets) or "legacy" (the original concatenating chunker)
+CHUNKER_MODE = os.getenv("CHUNKER_MODE", "offset").lower()
+# "chars" or "tokens" (tokens of the embedding model's tokenizer)
+CHUNK_SIZE_UNIT = os.getenv("CHUNK_SIZE_UNIT", "chars").lower()
+MIN_CHUNK_TOKENS = int(os.getenv("CHUNK_MIN_TOKENS", "150"))
+MAX_CHUNK_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "200"))
+# Embedder input limit (512) minus [CLS] and [SEP]
+TOKEN_LIMIT = 510
+CHUNK_ACROSS_PAGES = os.getenv("CHUNK_ACROSS_PAGES", "false").lower() == "true"
+PAGE_SEPARATOR = "\n\n"
+
+# Group 1 is the gap between spans; patterns start with a literal so the scan stays fast
+PARAGRAPH_BREAK = re.compile(r'(\n\s*\n\s*)')
+SENTENCE_BREAK = re.compile(r'[.!?](\s+)')
+WORD = re.compile(r'\S+')
+
 
 class LegalChunker:
+    """Paragraph-first chunker.
+
+    The default "offset" mode works on (start, end) spans into the page text, so every
+    chunk's text is exactly text[start_char:end_char] and each paragraph, sentence or
+    word is measured once. Paragraphs over max_size fall back to sentences, then to
+    runs of words. With across_pages, chunks may continue onto the next page; their
+    start_char is on page_number and end_char on end_page_number.
+    """
+
+    def __init__(
+        self,
+        mode: str = CHUNKER_MODE,
+        size_unit: str = CHUNK_SIZE_UNIT,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        across_pages: bool = CHUNK_ACROSS_PAGES,
+        token_counter: Optional[Callable[[list[str]], list[int]]] = None,
+    ):
+        if mode not in ("offset", "legacy"):
+            raise ValueError(f"Unknown chunker mode: {mode}")
+        if size_unit not in ("chars", "tokens"):
+            raise ValueError(f"Unknown chunk size unit: {size_unit}")
+
+        self.mode = mode
+        self.size_unit = size_unit
+        self.across_pages = across_pages
+        self.token_counter = token_counter or count_tokens
+
+        if size_unit == "tokens":
+            self.min_size = min_size or MIN_CHUNK_TOKENS
+            self.max_size = min(max_size or MAX_CHUNK_TOKENS, TOKEN_LIMIT)
+        else:
+            self.min_size = min_size or MIN_CHUNK_SIZE
+            self.max_size = max_size or MAX_CHUNK_SIZE
+
     def chunk_pages(self, pages: list[ParsedPage]) -> list[RawChunk]:
-        all_chunks = []
-        
+        if self.mode == "legacy":
+            return [chunk for page in pages for chunk in self._chunk_single_page(page)]
+        return self.chunk_batch(pages).raw_chunks()
+
+    def chunk_batch(self, pages: list[ParsedPage]) -> ChunkBatch:
+        """The document's chunks as a ChunkBatch, built column by column without per-chunk objects."""
+        doc_id = pages[0].doc_id if pages else ""
+        if self.mode == "legacy":
+            return ChunkBatch.from_raw_chunks(doc_id, self.chunk_pages(pages))
+
+        columns = {
+            "texts": [],
+            "page_numbers": [],
+            "chunk_indexes": [],
+            "start_chars": [],
+            "end_chars": [],
+            "end_page_numbers": [],
+        }
+        if self.across_pages:
+            self._chunk_document(pages, columns)
+        else:
+            for page in pages:
+                self._chunk_text(page.text, [0], [page.page_number], columns)
+        return ChunkBatch(doc_id, **columns)
+
+    def _chunk_document(self, pages: list[ParsedPage], columns: dict[str, list]):
+        if not pages:
+            return
+
+        page_starts = []
+        offset = 0
         for page in pages:
-            page_chunks = self._chunk_single_page(page)
-            all_chunks.extend(page_chunks)
-        
-        return all_chunks
-    
+            page_starts.append(offset)
+            offset += len(page.text) + len(PAGE_SEPARATOR)
+
+        text = PAGE_SEPARATOR.join(page.text for page in pages)
+        self._chunk_text(text, page_starts, [page.page_number for page in pages], columns)
+
+    def _chunk_text(self, text: str, page_starts: list[int], page_numbers: list[int], columns: dict[str, list]):
+        """Append the chunks of text to columns (ChunkBatch's per-chunk fields)."""
+        spans, sizes = self._split_units(text)
+        if not spans:
+            return
+
+        # chunk_index counts per starting page so chunk ids stay unique per (page, index)
+        next_index = {}
+
+        for start, end in self._pack_units(spans, sizes):
+            start_page = bisect.bisect_right(page_starts, start) - 1
+            end_page = bisect.bisect_right(page_starts, end - 1) - 1
+            page_number = page_numbers[start_page]
+            chunk_index = next_index.get(page_number, 0)
+            next_index[page_number] = chunk_index + 1
+
+            columns["texts"].append(text[start:end])
+            columns["page_numbers"].append(page_number)
+            columns["chunk_indexes"].append(chunk_index)
+            columns["start_chars"].append(start - page_starts[start_page])
+            columns["end_chars"].append(end - page_starts[end_page])
+            columns["end_page_numbers"].append(page_numbers[end_page] if end_page != start_page else NO_PAGE)
+
+    def _measure(self, text: str, spans: list[tuple[int, int]]) -> list[int]:
+        if self.size_unit == "chars":
+            return [end - start for start, end in spans]
+        return self.token_counter([text[start:end] for start, end in spans])
+
+    def _window_size(self, spans, prefix, i: int, j: int) -> int:
+        """Size of spans[i:j] as one chunk; in chars this includes the gaps between them."""
+        if self.size_unit == "chars":
+            return spans[j - 1][1] - spans[i][0]
+        return prefix[j] - prefix[i]
+
+    @staticmethod
+    def _prefix_sums(sizes: list[int]) -> list[int]:
+        prefix = [0]
+        for size in sizes:
+            prefix.append(prefix[-1] + size)
+        return prefix
+
+    @staticmethod
+    def _spans(text: str, separator, start: int, end: int) -> list[tuple[int, int]]:
+        """Non-empty spans of text[start:end] between separator matches, trimmed of whitespace."""
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start == end:
+            return []
+
+        spans = []
+        pos = start
+        for match in separator.finditer(text, start, end):
+            span_end = match.start(1)
+            while span_end > pos and text[span_end - 1].isspace():
+                span_end -= 1
+            if span_end > pos:
+                spans.append((pos, span_end))
+            pos = match.end(1)
+        spans.append((pos, end))
+        return spans
+
+    def _split_units(self, text: str) -> tuple[list[tuple[int, int, bool]], list[int]]:
+        """Units to pack: (start, end, is_whole_paragraph) with their sizes."""
+        units = []
+        sizes = []
+
+        paragraphs = self._spans(text, PARAGRAPH_BREAK, 0, len(text))
+        for (start, end), size in zip(paragraphs, self._measure(text, paragraphs)):
+            if size <= self.max_size:
+                units.append((start, end, True))
+                sizes.append(size)
+                continue
+
+            sentences = self._spans(text, SENTENCE_BREAK, start, end)
+            for (sent_start, sent_end), sent_size in zip(sentences, self._measure(text, sentences)):
+                if sent_size <= self.max_size:
+                    units.append((sent_start, sent_end, False))
+                    sizes.append(sent_size)
+                    continue
+
+                words = [(m.start(), m.end()) for m in WORD.finditer(text, sent_start, sent_end)]
+                word_sizes = self._measure(text, words)
+                prefix = self._prefix_sums(word_sizes)
+                for i, j in self._greedy_windows(words, prefix):
+                    units.append((words[i][0], words[j - 1][1], False))
+                    sizes.append(self._window_size(words, prefix, i, j))
+
+        return (units, sizes)
+
+    def _greedy_windows(self, spans, prefix, overlap_flags: Optional[list[bool]] = None) -> list[tuple[int, int]]:
+        """Maximal index windows [i, j) within max_size.
+
+        When both sides of a break are whole paragraphs, the last OVERLAP_PARAGRAPHS
+        paragraphs are repeated at the start of the next window, but only if that
+        window can still take a new unit, so j always advances and the scan is linear.
+        """
+        windows = []
+        n = len(spans)
+        i = 0
+
+        while i < n:
+            j = i + 1
+            while j < n and self._window_size(spans, prefix, i, j + 1) <= self.max_size:
+                j += 1
+            windows.append((i, j))
+            if j >= n:
+                break
+
+            overlap_start = j - OVERLAP_PARAGRAPHS
+            if (
+                overlap_flags
+                and overlap_start > i
+                and all(overlap_flags[overlap_start:j + 1])
+                and self._window_size(spans, prefix, overlap_start, j + 1) <= self.max_size
+            ):
+                i = overlap_start
+            else:
+                i = j
+
+        return windows
+
+    def _pack_units(self, units: list[tuple[int, int, bool]], sizes: list[int]) -> list[tuple[int, int]]:
+        prefix = self._prefix_sums(sizes)
+        windows = self._greedy_windows(units, prefix, [whole for _, _, whole in units])
+
+        # A short tail borrows trailing units from the previous chunk, without overlap
+        if len(windows) > 1:
+            prev_start, prev_end = windows[-2]
+            tail_start, tail_end = windows[-1]
+            tail_start = max(tail_start, prev_end)
+            while (
+                self._window_size(units, prefix, tail_start, tail_end) < self.min_size
+                and tail_start - 1 > prev_start
+                and self._window_size(units, prefix, tail_start - 1, tail_end) <= self.max_size
+            ):
+                tail_start -= 1
+            if tail_start < prev_end:
+                windows[-2] = (prev_start, tail_start)
+                windows[-1] = (tail_start, tail_end)
+
+        return [(units[i][0], units[j - 1][1]) for i, j in windows]
+
     def _chunk_single_page(self, page: ParsedPage) -> list[RawChunk]:
+        """Legacy chunker (CHUNKER_MODE=legacy); offsets are approximate."""
         text = page.text
         paragraphs = self._split_into_paragraphs(text)
-        
+
         chunks = []
         chunk_index = 0
         current_chunk_text = ""
         current_start_char = 0
         overlap_text = ""
-        
+
         for para in paragraphs:
             candidate_text = current_chunk_text + ("\n\n" if current_chunk_text else "") + para
-            
+
             if len(candidate_text) <= MAX_CHUNK_SIZE:
                 current_chunk_text = candidate_text
             else:
@@ -44,7 +275,7 @@ class LegalChunker:
                         text=current_chunk_text
                     ))
                     chunk_index += 1
-                    
+
                     overlap_text = current_chunk_text.split("\n\n")[-OVERLAP_PARAGRAPHS:][0] if "\n\n" in current_chunk_text else ""
                     current_start_char = end_char - len(overlap_text)
                     current_chunk_text = overlap_text + "\n\n" + para if overlap_text else para
@@ -67,7 +298,7 @@ class LegalChunker:
                                 chunk_index += 1
                                 current_start_char = end_char
                             current_chunk_text = sent
-        
+
         if current_chunk_text and len(current_chunk_text.strip()) >= MIN_CHUNK_SIZE:
             end_char = current_start_char + len(current_chunk_text)
             chunks.append(RawChunk(
@@ -78,12 +309,12 @@ class LegalChunker:
                 end_char=end_char,
                 text=current_chunk_text
             ))
-        
+
         return chunks
-    
+
     def _split_into_paragraphs(self, text: str) -> list[str]:
         return [p.strip() for p in re.split(r'\n\s*\n', text) if p.strip()]
-    
+
     def _split_into_sentences(self, text: str) -> list[str]:
         pattern = r'(?<=[.!?])\s+'
         sentences = re.split(pattern, text)
@@ -1,4 +1,4 @@
-from models import RawChunk, TextChunk, ParsedPage
+from models import RawChunk, TextChunk, ParsedPage, ChunkBatch
 
 
 class MetadataEnricher:
@@ -31,8 +31,28 @@ class MetadataEnricher:
                 doc_type=doc_type,
                 domain=domain,
                 source="pdf",
-                source_system="r2"
+                source_system="r2",
+                end_page_number=chunk.end_page_number
             )
             text_chunks.append(text_chunk)
         
         return text_chunks
+
+    def enrich_batch(
+        self,
+        batch: ChunkBatch,
+        pages: list[ParsedPage],
+        domain: str,
+        doc_type: str = "unknown"
+    ) -> ChunkBatch:
+        """enrich() for a ChunkBatch, in place: document-wide values are set once and chunk_ids filled in."""
+        batch.page_labels = {p.page_number: p.page_label for p in pages}
+        batch.domain = domain
+        batch.doc_type = doc_type
+        batch.source = "pdf"
+        batch.source_system = "r2"
+        batch.chunk_ids = [
+            TextChunk.generate_chunk_id(batch.doc_id, page_number, chunk_index)
+            for page_number, chunk_index in zip(batch.page_numbers.tolist(), batch.chunk_indexes.tolist())
+        ]
+        return batch
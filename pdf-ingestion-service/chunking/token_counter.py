@@ -0,0 +1,30 @@
+import threading
+
+
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+
+
+def _get_tokenizer():
+    """The embedding model's tokenizer, loaded once without the model weights."""
+    global _tokenizer
+    if _tokenizer is None:
+        with _tokenizer_lock:
+            if _tokenizer is None:
+                from transformers import AutoTokenizer
+                from embedding.local_embedder import MODEL_NAME
+                _tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    return _tokenizer
+
+
+def count_tokens(texts: list[str]) -> list[int]:
+    """Token count of each text, without special tokens, in one tokenizer call."""
+    if not texts:
+        return []
+    encoded = _get_tokenizer()(texts, add_special_tokens=False)
+    return [len(ids) for ids in encoded["input_ids"]]
+
+
+def approximate_token_count(texts: list[str], chars_per_token: float = 4.0) -> list[int]:
+    """Rough count (~4 chars per token) for when the tokenizer is unavailable."""
+    return [max(1, int(len(text) / chars_per_token)) for text in texts]
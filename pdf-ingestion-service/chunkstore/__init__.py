@@ -0,0 +1,17 @@
+from .chunk_text_store import (
+    MongoChunkTextStore,
+    SqliteChunkTextStore,
+    get_chunk_text_store,
+    compact_payload,
+    PAYLOAD_MODE,
+    CHUNK_TEXT_STORE,
+)
+
+__all__ = [
+    "MongoChunkTextStore",
+    "SqliteChunkTextStore",
+    "get_chunk_text_store",
+    "compact_payload",
+    "PAYLOAD_MODE",
+    "CHUNK_TEXT_STORE",
+]
@@ -0,0 +1,213 @@
+from typing import Optional
+import threading
+import sqlite3
+import zlib
+import os
+from pymongo import UpdateOne
+from bson import Binary
+from utils import data_path
+
+
+# "full" keeps chunk text in the Qdrant payload; "compact" moves it to the chunk text store
+PAYLOAD_MODE = os.getenv("QDRANT_PAYLOAD_MODE", "full").lower()
+# "mongo" (the state database, which the API reads too) or "sqlite" (a file under the data dir)
+CHUNK_TEXT_STORE = os.getenv("CHUNK_TEXT_STORE", "mongo").lower()
+COMPRESSION_LEVEL = int(os.getenv("CHUNK_TEXT_COMPRESSION_LEVEL", "6"))
+# chunk_ids per $in / IN (...) query
+LOOKUP_BATCH_SIZE = 500
+WRITE_BATCH_SIZE = 1000
+# Collection / table names: the texts served now, and the ones a reindex is loading
+LIVE_NAME = "chunk_texts"
+STAGING_NAME = "chunk_texts_staging"
+
+# What compact points keep: filter fields (doc_id, domain, doc_type) and what a citation shows
+COMPACT_PAYLOAD_FIELDS = (
+    "doc_id",
+    "page_number",
+    "end_page_number",
+    "page_label",
+    "chunk_index",
+    "doc_type",
+    "domain",
+    "pdf_url",
+)
+
+
+def compact_payload(payload: dict) -> dict:
+    return {key: payload[key] for key in COMPACT_PAYLOAD_FIELDS if key in payload}
+
+
+def compress_text(text: str) -> bytes:
+    return zlib.compress(text.encode("utf-8"), COMPRESSION_LEVEL)
+
+
+def decompress_text(data: bytes) -> str:
+    return zlib.decompress(data).decode("utf-8")
+
+
+def _batches(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class MongoChunkTextStore:
+    """zlib-compressed chunk text in the chunk_texts collection, keyed by chunk_id.
+
+    Lives in the same database as ingestion_state, so the API can hydrate search
+    results with one $in query per batch of chunk_ids.
+
+    A reindex writes to a separate staging collection (staging()), since its chunk_ids
+    are the ones live points use; promote() renames it over the live collection once
+    the reindex is published, and drop() discards it otherwise.
+    """
+
+    name = "mongo"
+
+    def __init__(self, db, collection_name: str = LIVE_NAME):
+        self.db = db
+        self.collection = db[collection_name]
+        self.collection.create_index("doc_id")
+
+    def staging(self) -> "MongoChunkTextStore":
+        """An empty store in the staging collection."""
+        self.db.drop_collection(STAGING_NAME)
+        return MongoChunkTextStore(self.db, STAGING_NAME)
+
+    def promote(self):
+        """Replace the live texts with this store's, in one rename."""
+        self.collection.rename(LIVE_NAME, dropTarget=True)
+        self.collection = self.db[LIVE_NAME]
+
+    def drop(self):
+        self.collection.drop()
+
+    def put_many(self, items: list[tuple[str, str, str]]) -> int:
+        """Store (chunk_id, doc_id, text) items, replacing texts already stored under the same chunk_id."""
+        for batch in _batches(items, WRITE_BATCH_SIZE):
+            self.collection.bulk_write(
+                [
+                    UpdateOne(
+                        {"_id": chunk_id},
+                        {"$set": {"doc_id": doc_id, "text": Binary(compress_text(text))}},
+                        upsert=True,
+                    )
+                    for chunk_id, doc_id, text in batch
+                ],
+                ordered=False,
+            )
+        return len(items)
+
+    def get_texts(self, chunk_ids: list[str]) -> dict[str, str]:
+        """Texts by chunk_id; ids with no stored text are left out."""
+        texts = {}
+        for batch in _batches(list(dict.fromkeys(chunk_ids)), LOOKUP_BATCH_SIZE):
+            for doc in self.collection.find({"_id": {"$in": batch}}, {"text": 1}):
+                texts[doc["_id"]] = decompress_text(doc["text"])
+        return texts
+
+    def delete_by_doc_ids(self, doc_ids: list[str]) -> int:
+        deleted = 0
+        for batch in _batches(list(doc_ids), LOOKUP_BATCH_SIZE):
+            deleted += self.collection.delete_many({"doc_id": {"$in": batch}}).deleted_count
+        return deleted
+
+    def delete_stale(self, doc_id: str, keep_chunk_ids: set[str]) -> int:
+        """Delete the document's texts whose chunk_id is not in keep_chunk_ids."""
+        return self.collection.delete_many({"doc_id": doc_id, "_id": {"$nin": list(keep_chunk_ids)}}).deleted_count
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "chunks": self.collection.count_documents({})}
+
+
+class SqliteChunkTextStore:
+    """zlib-compressed chunk text in a local SQLite file, for single-node deployments.
+
+    Staging works as in MongoChunkTextStore, with a second table in the same file.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: Optional[str] = None, table: str = LIVE_NAME):
+        self.path = path or os.getenv("CHUNK_TEXT_STORE_PATH") or data_path("chunk_texts.sqlite")
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._create_table()
+
+    def _create_table(self):
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} "
+            "(chunk_id TEXT PRIMARY KEY, doc_id TEXT NOT NULL, text BLOB NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_doc_id ON {self.table} (doc_id)")
+
+    def staging(self) -> "SqliteChunkTextStore":
+        """An empty store in the staging table."""
+        with self._lock, self._conn:
+            self._conn.execute(f"DROP TABLE IF EXISTS {STAGING_NAME}")
+        return SqliteChunkTextStore(self.path, STAGING_NAME)
+
+    def promote(self):
+        """Replace the live texts with this store's, in one transaction."""
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute(f"DROP TABLE IF EXISTS {LIVE_NAME}")
+            self._conn.execute(f"DROP INDEX IF EXISTS {self.table}_doc_id")
+            self._conn.execute(f"ALTER TABLE {self.table} RENAME TO {LIVE_NAME}")
+            self.table = LIVE_NAME
+            self._create_table()
+
+    def drop(self):
+        with self._lock, self._conn:
+            self._conn.execute(f"DROP TABLE IF EXISTS {self.table}")
+
+    def put_many(self, items: list[tuple[str, str, str]]) -> int:
+        rows = [(chunk_id, doc_id, compress_text(text)) for chunk_id, doc_id, text in items]
+        with self._lock, self._conn:
+            self._conn.executemany(f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?)", rows)
+        return len(rows)
+
+    def get_texts(self, chunk_ids: list[str]) -> dict[str, str]:
+        texts = {}
+        with self._lock:
+            for batch in _batches(list(dict.fromkeys(chunk_ids)), LOOKUP_BATCH_SIZE):
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT chunk_id, text FROM {self.table} WHERE chunk_id IN ({placeholders})", batch
+                )
+                texts.update((chunk_id, decompress_text(data)) for chunk_id, data in rows)
+        return texts
+
+    def delete_by_doc_ids(self, doc_ids: list[str]) -> int:
+        deleted = 0
+        with self._lock, self._conn:
+            for batch in _batches(list(doc_ids), LOOKUP_BATCH_SIZE):
+                placeholders = ",".join("?" * len(batch))
+                cursor = self._conn.execute(f"DELETE FROM {self.table} WHERE doc_id IN ({placeholders})", batch)
+                deleted += cursor.rowcount
+        return deleted
+
+    def delete_stale(self, doc_id: str, keep_chunk_ids: set[str]) -> int:
+        with self._lock, self._conn:
+            rows = self._conn.execute(f"SELECT chunk_id FROM {self.table} WHERE doc_id = ?", (doc_id,))
+            stale = [(chunk_id,) for (chunk_id,) in rows.fetchall() if chunk_id not in keep_chunk_ids]
+            self._conn.executemany(f"DELETE FROM {self.table} WHERE chunk_id = ?", stale)
+        return len(stale)
+
+    def stats(self) -> dict:
+        with self._lock:
+            (chunks,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        return {"backend": self.name, "chunks": chunks}
+
+
+def get_chunk_text_store(db=None, backend: str = CHUNK_TEXT_STORE):
+    """The configured store; db is the state database the Mongo backend writes to."""
+    if backend == "sqlite":
+        return SqliteChunkTextStore()
+    if backend == "mongo":
+        if db is None:
+            raise ValueError("The mongo chunk text store needs the state database")
+        return MongoChunkTextStore(db)
+    raise ValueError(f"Unknown chunk text store: {backend} (choose mongo or sqlite)")
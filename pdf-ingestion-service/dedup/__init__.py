@@ -0,0 +1,16 @@
+from .minhash import MinHasher, normalize, signature_words, fingerprint, number_key, estimate_jaccard
+from .lsh_index import LshIndex
+from .chunk_deduplicator import ChunkDeduplicator, DedupPlan, DEDUP_POLICY
+
+__all__ = [
+    "MinHasher",
+    "normalize",
+    "signature_words",
+    "fingerprint",
+    "number_key",
+    "estimate_jaccard",
+    "LshIndex",
+    "ChunkDeduplicator",
+    "DedupPlan",
+    "DEDUP_POLICY",
+]
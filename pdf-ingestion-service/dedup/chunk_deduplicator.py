@@ -0,0 +1,207 @@
+import os
+from typing import Callable, Optional
+from dataclasses import dataclass, field
+from models import ChunkBatch
+from utils import data_path
+from .minhash import MinHasher, normalize, signature_words, fingerprint, number_key
+from .lsh_index import LshIndex
+
+
+POLICIES = ("off", "reuse", "drop")
+# "reuse": duplicates are stored with the canonical chunk's vector (no embedding call)
+# "drop": exact duplicates are not stored at all; search finds the canonical chunk instead.
+# Near-duplicates hold text of their own, so they are always stored (as under "reuse")
+DEDUP_POLICY = os.getenv("DEDUP_POLICY", "reuse").lower()
+# Per-domain overrides, e.g. "judgments:reuse,contracts:drop"
+DEDUP_DOMAIN_POLICIES = os.getenv("DEDUP_DOMAIN_POLICIES", "")
+DEDUP_JACCARD_THRESHOLD = float(os.getenv("DEDUP_JACCARD_THRESHOLD", "0.9"))
+
+
+def parse_domain_policies(raw: str) -> dict[str, str]:
+    policies = {}
+    for item in raw.split(","):
+        if not item.strip():
+            continue
+        domain, _, policy = item.partition(":")
+        policy = policy.strip().lower()
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown dedup policy for domain {domain.strip()!r}: {policy!r}")
+        policies[domain.strip()] = policy
+    return policies
+
+
+@dataclass
+class DedupPlan:
+    doc_id: str
+    policy: str
+    # chunk position → position of an earlier, equivalent chunk in the same document
+    within_doc: dict[int, int] = field(default_factory=dict)
+    # chunk position → chunk_id of an equivalent chunk already stored for another document
+    across_corpus: dict[int, str] = field(default_factory=dict)
+    # chunk position → (fingerprint, signature, number key), kept to index the chunks that get embedded
+    sketches: dict = field(default_factory=dict)
+    # positions whose match is a near-duplicate rather than the same text
+    near: set = field(default_factory=set)
+
+    def is_duplicate(self, position: int) -> bool:
+        return position in self.within_doc or position in self.across_corpus
+
+    def is_dropped(self, position: int) -> bool:
+        """Left out of the stored points: an exact duplicate under the "drop" policy."""
+        return self.policy == "drop" and self.is_duplicate(position) and position not in self.near
+
+    @property
+    def dropped(self) -> int:
+        if self.policy != "drop":
+            return 0
+        return sum(1 for position in (*self.within_doc, *self.across_corpus) if position not in self.near)
+
+    @property
+    def duplicates(self) -> int:
+        return len(self.within_doc) + len(self.across_corpus)
+
+
+class ChunkDeduplicator:
+    """Finds exact and near-duplicate chunks within a document and against a persisted corpus index.
+
+    plan() sketches each chunk, resolve() drops corpus matches whose canonical point is
+    gone, and commit() indexes a document's embedded chunks once they are upserted.
+    commit() and forget_doc() return the other documents that matched chunks which
+    changed or went away; their points were built from those chunks, so the caller
+    re-ingests them.
+    """
+
+    def __init__(
+        self,
+        index_path: Optional[str] = None,
+        policy: str = DEDUP_POLICY,
+        domain_policies: Optional[dict[str, str]] = None,
+        threshold: float = DEDUP_JACCARD_THRESHOLD,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown dedup policy: {policy}")
+        self.index_path = index_path or os.getenv("DEDUP_INDEX_PATH") or data_path("dedup_index.npz")
+        self.policy = policy
+        self.domain_policies = domain_policies if domain_policies is not None else parse_domain_policies(DEDUP_DOMAIN_POLICIES)
+        self.threshold = threshold
+        self.hasher = MinHasher()
+        self.index = LshIndex(num_perm=self.hasher.num_perm)
+        self.embeddings_saved = 0
+        self.points_avoided = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.policy != "off" or any(p != "off" for p in self.domain_policies.values())
+
+    def policy_for(self, domain: str) -> str:
+        return self.domain_policies.get(domain, self.policy)
+
+    def load(self) -> int:
+        if not self.enabled:
+            return 0
+        return self.index.load(self.index_path)
+
+    def save(self):
+        if self.enabled:
+            self.index.save(self.index_path)
+
+    def reset(self):
+        """Start from an empty index (a full reindex rebuilds it)."""
+        self.index.reset()
+
+    def reset_stats(self):
+        self.embeddings_saved = 0
+        self.points_avoided = 0
+
+    def plan(self, doc_id: str, domain: str, chunks: ChunkBatch) -> DedupPlan:
+        plan = DedupPlan(doc_id=doc_id, policy=self.policy_for(domain))
+        if plan.policy == "off":
+            return plan
+
+        local = LshIndex(num_perm=self.hasher.num_perm)
+        local_positions = {}
+
+        for position, (chunk_id, text) in enumerate(zip(chunks.chunk_ids, chunks.texts)):
+            words = normalize(text)
+            fp = fingerprint(words)
+            sketch_words = signature_words(words)
+            signature = self.hasher.signature(sketch_words)
+            numbers = number_key(sketch_words)
+            plan.sketches[position] = (fp, signature, numbers)
+
+            local_match = local.query(fp, signature, self.threshold, number_key=numbers)
+            if local_match is not None:
+                plan.within_doc[position] = local_positions[local_match]
+                if local.fingerprints[local_match] != fp:
+                    plan.near.add(position)
+                continue
+
+            corpus_match = self.index.query(fp, signature, self.threshold, exclude_doc=doc_id, number_key=numbers)
+            if corpus_match is not None:
+                plan.across_corpus[position] = corpus_match
+                if self.index.fingerprints.get(corpus_match) != fp:
+                    plan.near.add(position)
+                continue
+
+            local.add(chunk_id, doc_id, fp, signature, number_key=numbers)
+            local_positions[chunk_id] = position
+
+        return plan
+
+    def resolve(self, plan: DedupPlan, lookup_vectors: Callable[[list[str]], dict]) -> dict[str, list[float]]:
+        """Fetch canonical vectors for corpus matches; matches whose point is gone become unique.
+
+        lookup_vectors returns {chunk_id: (vector, content_hash)}. A point whose content
+        hash is not the one indexed holds other text under the same chunk_id (a later
+        ingest or an abandoned reindex), so its vector is not reused.
+        """
+        if not plan.across_corpus:
+            return {}
+
+        try:
+            stored = lookup_vectors(sorted(set(plan.across_corpus.values())))
+        except Exception as e:
+            print(f"  Warning: dedup vector lookup failed: {e} (embedding duplicates)")
+            stored = {}
+
+        vectors = {}
+        for chunk_id, (vector, stored_hash) in stored.items():
+            indexed_hash = self.index.content_hashes.get(chunk_id)
+            if indexed_hash and stored_hash == indexed_hash:
+                vectors[chunk_id] = vector
+        for position, chunk_id in list(plan.across_corpus.items()):
+            if chunk_id not in vectors:
+                del plan.across_corpus[position]
+        return vectors
+
+    def record(self, plan: DedupPlan):
+        self.embeddings_saved += plan.duplicates
+        self.points_avoided += plan.dropped
+
+    def commit(self, plan: DedupPlan, chunks: ChunkBatch, content_hashes: dict[str, str]) -> set[str]:
+        """Replace the document's index entries with its non-duplicate chunks; call after they are stored.
+
+        content_hashes maps each stored chunk_id to its point's content hash; chunks
+        without a point (failed embeddings) are not indexed. Returns the documents that
+        matched a chunk of this one whose content changed or which is no longer indexed.
+        """
+        if plan.policy == "off":
+            return set()
+        previous = self.index.doc_chunks(plan.doc_id)
+        self.index.forget_doc(plan.doc_id)
+        for position, chunk_id in enumerate(chunks.chunk_ids):
+            if plan.is_duplicate(position) or chunk_id not in content_hashes:
+                continue
+            fp, signature, numbers = plan.sketches[position]
+            self.index.add(chunk_id, plan.doc_id, fp, signature, content_hashes[chunk_id], numbers)
+        for canonical in plan.across_corpus.values():
+            self.index.add_dependent(canonical, plan.doc_id)
+
+        changed = [chunk_id for chunk_id, content_hash in previous.items() if self.index.content_hashes.get(chunk_id) != content_hash]
+        return self.index.take_dependents(changed) - {plan.doc_id}
+
+    def forget_doc(self, doc_id: str) -> set[str]:
+        """Drop a deleted document from the index; returns the documents that matched its chunks."""
+        chunk_ids = list(self.index.doc_chunks(doc_id))
+        self.index.forget_doc(doc_id)
+        return self.index.take_dependents(chunk_ids) - {doc_id}
@@ -0,0 +1,186 @@
+import os
+import json
+import threading
+from typing import Optional
+import numpy as np
+from .minhash import NUM_PERM, estimate_jaccard
+
+
+LSH_BANDS = 16
+
+
+class LshIndex:
+    """Banded LSH over MinHash signatures, plus an exact-fingerprint map.
+
+    Entries are keyed by chunk_id and remember their doc_id so a document's entries
+    can be dropped when it is re-ingested, the content hash of the point they were
+    stored as so a reused vector can be checked against the point, and the number key
+    a near-duplicate must share. dependents records which other documents matched each
+    chunk, so they can be re-ingested when it changes. Persisted as a compressed .npz;
+    the band buckets are rebuilt on load.
+    """
+
+    def __init__(self, num_perm: int = NUM_PERM, bands: int = LSH_BANDS):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.doc_ids = {}
+        self.signatures = {}
+        self.fingerprints = {}
+        self.content_hashes = {}
+        self.number_keys = {}
+        # canonical chunk_id → doc_ids whose chunks matched it
+        self.dependents = {}
+        self._depends_on = {}
+        self._by_fingerprint = {}
+        self._by_doc = {}
+        self._buckets = [{} for _ in range(self.bands)]
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def _band_keys(self, signature: np.ndarray) -> list[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, chunk_id: str, doc_id: str, fp: str, signature: np.ndarray, content_hash: str = "", number_key: str = ""):
+        with self._lock:
+            if chunk_id in self.signatures:
+                self._remove(chunk_id)
+            self.doc_ids[chunk_id] = doc_id
+            self.signatures[chunk_id] = signature
+            self.fingerprints[chunk_id] = fp
+            self.content_hashes[chunk_id] = content_hash
+            self.number_keys[chunk_id] = number_key
+            self._by_fingerprint.setdefault(fp, chunk_id)
+            self._by_doc.setdefault(doc_id, set()).add(chunk_id)
+            for bucket, key in zip(self._buckets, self._band_keys(signature)):
+                bucket.setdefault(key, set()).add(chunk_id)
+
+    def _remove(self, chunk_id: str):
+        doc_id = self.doc_ids.pop(chunk_id)
+        signature = self.signatures.pop(chunk_id)
+        fp = self.fingerprints.pop(chunk_id)
+        self.content_hashes.pop(chunk_id, None)
+        self.number_keys.pop(chunk_id, None)
+        if self._by_fingerprint.get(fp) == chunk_id:
+            del self._by_fingerprint[fp]
+        self._by_doc.get(doc_id, set()).discard(chunk_id)
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            members = bucket.get(key)
+            if members is not None:
+                members.discard(chunk_id)
+                if not members:
+                    del bucket[key]
+
+    def doc_chunks(self, doc_id: str) -> dict[str, str]:
+        """The document's indexed chunk_ids with their content hashes."""
+        with self._lock:
+            return {chunk_id: self.content_hashes[chunk_id] for chunk_id in self._by_doc.get(doc_id, ())}
+
+    def forget_doc(self, doc_id: str) -> int:
+        """Drop the document's entries and the matches it depended on; what depends on its chunks is kept."""
+        with self._lock:
+            chunk_ids = self._by_doc.pop(doc_id, set())
+            for chunk_id in chunk_ids:
+                self._remove(chunk_id)
+            for canonical in self._depends_on.pop(doc_id, set()):
+                self._drop_dependent(canonical, doc_id)
+            return len(chunk_ids)
+
+    def _drop_dependent(self, chunk_id: str, doc_id: str):
+        members = self.dependents.get(chunk_id)
+        if members is not None:
+            members.discard(doc_id)
+            if not members:
+                del self.dependents[chunk_id]
+
+    def add_dependent(self, chunk_id: str, doc_id: str):
+        with self._lock:
+            self.dependents.setdefault(chunk_id, set()).add(doc_id)
+            self._depends_on.setdefault(doc_id, set()).add(chunk_id)
+
+    def take_dependents(self, chunk_ids) -> set[str]:
+        """Remove and return the documents that matched any of chunk_ids."""
+        with self._lock:
+            doc_ids = set()
+            for chunk_id in chunk_ids:
+                for doc_id in self.dependents.pop(chunk_id, set()):
+                    doc_ids.add(doc_id)
+                    self._depends_on.get(doc_id, set()).discard(chunk_id)
+            return doc_ids
+
+    def query(self, fp: str, signature: np.ndarray, threshold: float, exclude_doc: Optional[str] = None, number_key: Optional[str] = None) -> Optional[str]:
+        """chunk_id of an exact duplicate, else of the most similar candidate at or above threshold.
+
+        With number_key, a near-duplicate candidate must have the same one.
+        """
+        with self._lock:
+            exact = self._by_fingerprint.get(fp)
+            if exact is not None and self.doc_ids[exact] != exclude_doc:
+                return exact
+
+            candidates = set()
+            for bucket, key in zip(self._buckets, self._band_keys(signature)):
+                candidates.update(bucket.get(key, ()))
+
+            best_id, best_score = None, threshold
+            for chunk_id in candidates:
+                if self.doc_ids[chunk_id] == exclude_doc:
+                    continue
+                if number_key is not None and self.number_keys[chunk_id] != number_key:
+                    continue
+                score = estimate_jaccard(signature, self.signatures[chunk_id])
+                if score >= best_score:
+                    best_id, best_score = chunk_id, score
+            return best_id
+
+    def save(self, path: str):
+        with self._lock:
+            chunk_ids = list(self.signatures)
+            signatures = (
+                np.stack([self.signatures[c] for c in chunk_ids])
+                if chunk_ids else np.zeros((0, self.num_perm), dtype=np.uint32)
+            )
+            # np.savez appends .npz to names without it, so write to a .npz temp file
+            tmp_path = f"{path}.tmp.npz"
+            np.savez_compressed(
+                tmp_path,
+                chunk_ids=np.array(chunk_ids, dtype=str),
+                doc_ids=np.array([self.doc_ids[c] for c in chunk_ids], dtype=str),
+                fingerprints=np.array([self.fingerprints[c] for c in chunk_ids], dtype=str),
+                content_hashes=np.array([self.content_hashes[c] for c in chunk_ids], dtype=str),
+                number_keys=np.array([self.number_keys[c] for c in chunk_ids], dtype=str),
+                signatures=signatures,
+                dependents=np.array(json.dumps({c: sorted(docs) for c, docs in self.dependents.items()})),
+            )
+            os.replace(tmp_path, path)
+
+    def load(self, path: str) -> int:
+        self.reset()
+        if not os.path.exists(path):
+            return 0
+        try:
+            with np.load(path) as data:
+                # Older indexes load without content hashes (never reused) or number keys (never near-matched)
+                missing = [""] * len(data["chunk_ids"])
+                content_hashes = data["content_hashes"] if "content_hashes" in data.files else missing
+                number_keys = data["number_keys"] if "number_keys" in data.files else missing
+                rows = zip(data["chunk_ids"], data["doc_ids"], data["fingerprints"], data["signatures"], content_hashes, number_keys)
+                for chunk_id, doc_id, fp, signature, content_hash, key in rows:
+                    if len(signature) != self.num_perm:
+                        raise ValueError(f"signature length {len(signature)} != {self.num_perm}")
+                    self.add(str(chunk_id), str(doc_id), str(fp), signature, str(content_hash), str(key))
+                dependents = json.loads(str(data["dependents"])) if "dependents" in data.files else {}
+                for chunk_id, doc_ids in dependents.items():
+                    for doc_id in doc_ids:
+                        self.add_dependent(chunk_id, doc_id)
+        except Exception as e:
+            print(f"Warning: could not read dedup index {path}: {e} (starting empty)")
+            self.reset()
+        return len(self)
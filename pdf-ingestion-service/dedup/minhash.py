@@ -0,0 +1,75 @@
+import os
+import re
+import hashlib
+import numpy as np
+
+
+NUM_PERM = 64
+SHINGLE_WORDS = 3
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+# Chunks this short (running headers, footers, page stamps) match near-duplicates
+# regardless of their numbers; longer chunks keep them, since clauses that differ
+# only in an amount, date or section number are different clauses
+BOILERPLATE_MAX_WORDS = int(os.getenv("DEDUP_BOILERPLATE_MAX_WORDS", "16"))
+
+_WORD = re.compile(r"\w+")
+_DIGITS = re.compile(r"\d+")
+
+
+def normalize(text: str) -> list[str]:
+    """Lowercased words, numbers included."""
+    return _WORD.findall(text.lower())
+
+
+def signature_words(words: list[str]) -> list[str]:
+    """The words a near-duplicate signature is built from: digit runs collapsed in
+    boilerplate-length chunks, so "Page 3 of 40" matches "Page 4 of 40", else as is."""
+    if len(words) > BOILERPLATE_MAX_WORDS:
+        return words
+    return [_DIGITS.sub("0", word) for word in words]
+
+
+def fingerprint(words: list[str]) -> str:
+    """Exact-duplicate key of the normalized text; numbers are part of it."""
+    return hashlib.blake2b(" ".join(words).encode(), digest_size=16).hexdigest()
+
+
+def number_key(words: list[str]) -> str:
+    """Key of the multiset of number-bearing words, which near-duplicates must share.
+
+    Shingle overlap barely moves when one amount, date or section number changes in a
+    long clause, so similarity alone would merge "Rs. 10000" with "Rs. 250000".
+    Built from signature_words(), so boilerplate keeps matching across page numbers.
+    """
+    numbers = sorted(word for word in words if _DIGITS.search(word))
+    return hashlib.blake2b(" ".join(numbers).encode(), digest_size=8).hexdigest()
+
+
+def _hash32(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=4).digest(), "little")
+
+
+class MinHasher:
+    """MinHash signatures over word shingles; equal seeds give comparable signatures."""
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        # a, b < 2^32 keep a * h + b within uint64 for 32-bit shingle hashes
+        self.a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def signature(self, words: list[str]) -> np.ndarray:
+        if len(words) <= SHINGLE_WORDS:
+            shingles = {" ".join(words)}
+        else:
+            shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+        hashes = np.fromiter((_hash32(s) for s in shingles), dtype=np.uint64, count=len(shingles))
+        permuted = (np.outer(hashes, self.a) + self.b) % MERSENNE_PRIME & MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+def estimate_jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.count_nonzero(a == b)) / len(a)
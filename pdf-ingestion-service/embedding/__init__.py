@@ -1,3 +1,5 @@
-from .local_embedder import LocalEmbedder
+from .local_embedder import LocalEmbedder, get_local_embedder
+from .remote_embedder import RemoteEmbedder
+from .factory import get_embedder
 
-__all__ = ["LocalEmbedder"]
+__all__ = ["LocalEmbedder", "get_local_embedder", "RemoteEmbedder", "get_embedder"]
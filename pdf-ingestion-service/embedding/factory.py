@@ -0,0 +1,26 @@
+import os
+import threading
+from typing import Optional, Union
+from .local_embedder import LocalEmbedder, get_local_embedder
+from .remote_embedder import RemoteEmbedder
+
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "local").lower()
+
+_shared_remote_embedder: Optional[RemoteEmbedder] = None
+_shared_remote_lock = threading.Lock()
+
+
+def get_embedder() -> Union[LocalEmbedder, RemoteEmbedder]:
+    """Return the embedder selected by EMBEDDING_BACKEND ("local" or "remote")."""
+    global _shared_remote_embedder
+
+    if EMBEDDING_BACKEND != "remote":
+        return get_local_embedder()
+
+    if _shared_remote_embedder is None:
+        with _shared_remote_lock:
+            if _shared_remote_embedder is None:
+                _shared_remote_embedder = RemoteEmbedder()
+
+    return _shared_remote_embedder
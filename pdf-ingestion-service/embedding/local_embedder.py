@@ -1,52 +1,126 @@
+import os
+import threading
 from typing import Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
 from sentence_transformers import SentenceTransformer
 
 
 MODEL_NAME = "BAAI/bge-small-en-v1.5"
 EMBEDDING_DIMENSION = 384
-MAX_CONCURRENT_EMBEDDINGS = 3
+MAX_SEQ_TOKENS = 512
+MAX_BATCH_TOKENS = int(os.getenv("EMBEDDING_MAX_BATCH_TOKENS", "16384"))
+MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "64"))
 
 
 class LocalEmbedder:
+    """Process-wide sentence-transformer; use get_local_embedder() to share it."""
+
     def __init__(self):
         print(f"Loading embedding model: {MODEL_NAME}...")
         self.model = SentenceTransformer(MODEL_NAME)
         print(f"Model loaded successfully. Vector dimension: {EMBEDDING_DIMENSION}")
-    
-    def _embed_single_text(self, text: str) -> Optional[list[float]]:
-        if not text or not isinstance(text, str):
-            return None
-        
+
+    def _count_tokens(self, texts: list[str]) -> list[int]:
+        try:
+            encoded = self.model.tokenizer(
+                texts,
+                add_special_tokens=True,
+                truncation=True,
+                max_length=MAX_SEQ_TOKENS,
+            )
+            return [len(ids) for ids in encoded["input_ids"]]
+        except Exception:
+            # Rough fallback (~4 chars per token) keeps batching usable
+            return [min(MAX_SEQ_TOKENS, len(text) // 4 + 2) for text in texts]
+
+    def _plan_batches(self, texts: list[str], indices: list[int]) -> list[list[int]]:
+        """Group indices into batches whose padded size fits MAX_BATCH_TOKENS.
+
+        Texts are sorted by token length so each batch pads to a similar length.
+        """
+        token_counts = self._count_tokens([texts[i] for i in indices])
+        ordered = sorted(zip(indices, token_counts), key=lambda x: x[1])
+
+        batches = []
+        current = []
+        current_max = 0
+
+        for idx, count in ordered:
+            padded_max = max(current_max, count)
+            if current and (
+                padded_max * (len(current) + 1) > MAX_BATCH_TOKENS
+                or len(current) >= MAX_BATCH_SIZE
+            ):
+                batches.append(current)
+                current = []
+                padded_max = count
+            current.append(idx)
+            current_max = padded_max
+
+        if current:
+            batches.append(current)
+
+        return batches
+
+    def _encode_with_isolation(self, texts: list[str], batch: list[int], matrix: np.ndarray, valid: np.ndarray):
+        """Encode a batch; on failure retry each half so only failing items are lost."""
         try:
-            embedding = self.model.encode(text, convert_to_numpy=True)
-            vector = embedding.tolist()
-            
-            if len(vector) != EMBEDDING_DIMENSION:
-                raise ValueError(f"Vector dimension mismatch: got {len(vector)}, expected {EMBEDDING_DIMENSION}")
-            
-            return vector
-        
+            vectors = self.model.encode(
+                [texts[i] for i in batch],
+                batch_size=len(batch),
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            )
+            if vectors.ndim != 2 or vectors.shape[1] != EMBEDDING_DIMENSION:
+                raise ValueError(f"Vector dimension mismatch: got {vectors.shape}, expected (*, {EMBEDDING_DIMENSION})")
+            matrix[batch] = vectors
+            valid[batch] = True
         except Exception as e:
-            print(f"Embedding failed: {str(e)}")
-            return None
-    
+            if len(batch) == 1:
+                print(f"Embedding failed: {str(e)}")
+                return
+            mid = len(batch) // 2
+            self._encode_with_isolation(texts, batch[:mid], matrix, valid)
+            self._encode_with_isolation(texts, batch[mid:], matrix, valid)
+
+    def embed_matrix(self, texts: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """Embed texts into a float32 (n, dim) matrix plus a boolean mask of rows that succeeded."""
+        matrix = np.zeros((len(texts), EMBEDDING_DIMENSION), dtype=np.float32)
+        valid = np.zeros(len(texts), dtype=bool)
+
+        indices = [i for i, text in enumerate(texts) if text and isinstance(text, str)]
+        if not indices:
+            return (matrix, valid)
+
+        for batch in self._plan_batches(texts, indices):
+            self._encode_with_isolation(texts, batch, matrix, valid)
+
+        return (matrix, valid)
+
     def embed_batch(self, texts: list[str]) -> list[tuple[int, Optional[list[float]]]]:
         if not texts:
             return []
-        
-        results = []
-        
-        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_EMBEDDINGS) as executor:
-            futures = {
-                executor.submit(self._embed_single_text, text): idx 
-                for idx, text in enumerate(texts)
-            }
-            
-            for future in as_completed(futures):
-                idx = futures[future]
-                vector = future.result()
-                results.append((idx, vector))
-        
-        results.sort(key=lambda x: x[0])
-        return results
+
+        matrix, valid = self.embed_matrix(texts)
+        rows = matrix.tolist()
+
+        return [
+            (idx, rows[idx] if valid[idx] else None)
+            for idx in range(len(texts))
+        ]
+
+
+_shared_embedder: Optional[LocalEmbedder] = None
+_shared_embedder_lock = threading.Lock()
+
+
+def get_local_embedder() -> LocalEmbedder:
+    """Return the process-wide LocalEmbedder, loading the model on first use."""
+    global _shared_embedder
+
+    if _shared_embedder is None:
+        with _shared_embedder_lock:
+            if _shared_embedder is None:
+                _shared_embedder = LocalEmbedder()
+
+    return _shared_embedder
@@ -0,0 +1,167 @@
+import os
+import time
+import random
+import itertools
+import threading
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+import numpy as np
+from observability import metrics
+from .local_embedder import EMBEDDING_DIMENSION, get_local_embedder
+
+
+EMBEDDING_RPC_URL = os.getenv("EMBEDDING_RPC_URL", "http://embedding:8001/rpc")
+MAX_REQUEST_CHARS = int(os.getenv("EMBEDDING_RPC_MAX_REQUEST_CHARS", "64000"))
+MAX_REQUEST_TEXTS = int(os.getenv("EMBEDDING_RPC_MAX_REQUEST_TEXTS", "64"))
+MAX_IN_FLIGHT = int(os.getenv("EMBEDDING_RPC_MAX_IN_FLIGHT", "4"))
+MAX_RETRIES = 3
+REQUEST_TIMEOUT_SECONDS = 60
+FALLBACK_COOLDOWN_SECONDS = 60
+
+
+class RemoteEmbeddingError(Exception):
+    pass
+
+
+class RemoteEmbedder:
+    """Embeds through the embedding service's JSON-RPC `embed_batch` method.
+
+    Requests that still fail after retries are embedded by the local model, and the
+    remote service is bypassed for FALLBACK_COOLDOWN_SECONDS afterwards.
+    """
+
+    def __init__(self, rpc_url: Optional[str] = None, max_in_flight: int = MAX_IN_FLIGHT):
+        self.rpc_url = rpc_url or EMBEDDING_RPC_URL
+        self.max_in_flight = max(1, max_in_flight)
+        self.client = httpx.Client(
+            timeout=REQUEST_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=self.max_in_flight,
+                max_keepalive_connections=self.max_in_flight,
+                keepalive_expiry=120,
+            ),
+        )
+        self._request_ids = itertools.count(1)
+        self._unavailable_until = 0.0
+        self._lock = threading.Lock()
+        print(f"Using remote embedding service: {self.rpc_url} (max in flight: {self.max_in_flight})")
+
+    def _remote_available(self) -> bool:
+        with self._lock:
+            return time.monotonic() >= self._unavailable_until
+
+    def _mark_unavailable(self):
+        with self._lock:
+            self._unavailable_until = time.monotonic() + FALLBACK_COOLDOWN_SECONDS
+
+    def _plan_requests(self, texts: list[str], indices: list[int]) -> list[list[int]]:
+        """Split indices into requests bounded by MAX_REQUEST_CHARS and MAX_REQUEST_TEXTS."""
+        requests = []
+        current = []
+        current_chars = 0
+
+        for idx in indices:
+            size = len(texts[idx])
+            if current and (
+                current_chars + size > MAX_REQUEST_CHARS
+                or len(current) >= MAX_REQUEST_TEXTS
+            ):
+                requests.append(current)
+                current = []
+                current_chars = 0
+            current.append(idx)
+            current_chars += size
+
+        if current:
+            requests.append(current)
+
+        return requests
+
+    def _call_embed_batch(self, batch_texts: list[str]) -> np.ndarray:
+        response = self.client.post(
+            self.rpc_url,
+            json={
+                "jsonrpc": "2.0",
+                "method": "embed_batch",
+                "params": {"texts": batch_texts},
+                "id": next(self._request_ids),
+            },
+        )
+        response.raise_for_status()
+        body = response.json()
+
+        if body.get("error"):
+            raise RemoteEmbeddingError(body["error"].get("message", "Unknown RPC error"))
+
+        vectors = np.asarray(body.get("result", {}).get("vectors", []), dtype=np.float32)
+        if vectors.shape != (len(batch_texts), EMBEDDING_DIMENSION):
+            raise RemoteEmbeddingError(
+                f"Unexpected vectors shape {vectors.shape}, expected ({len(batch_texts)}, {EMBEDDING_DIMENSION})"
+            )
+        return vectors
+
+    def _embed_request_with_retry(self, batch_texts: list[str]) -> Optional[np.ndarray]:
+        """Returns None when the remote service could not embed this request."""
+        for attempt in range(MAX_RETRIES):
+            if not self._remote_available():
+                return None
+            try:
+                return self._call_embed_batch(batch_texts)
+            except (httpx.HTTPError, RemoteEmbeddingError, ValueError) as e:
+                if attempt < MAX_RETRIES - 1:
+                    wait_time = (2 ** attempt) * 0.5 + random.uniform(0, 0.25)
+                    metrics.retries.inc(component="remote_embedder")
+                    print(f"Remote embedding failed (attempt {attempt + 1}/{MAX_RETRIES}): {str(e)}. Retrying in {wait_time:.2f}s...")
+                    time.sleep(wait_time)
+                else:
+                    print(f"Remote embedding failed after {MAX_RETRIES} attempts: {str(e)}. Falling back to local model")
+                    self._mark_unavailable()
+        return None
+
+    def embed_matrix(self, texts: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """Same contract as LocalEmbedder.embed_matrix."""
+        matrix = np.zeros((len(texts), EMBEDDING_DIMENSION), dtype=np.float32)
+        valid = np.zeros(len(texts), dtype=bool)
+
+        indices = [i for i, text in enumerate(texts) if text and isinstance(text, str)]
+        if not indices:
+            return (matrix, valid)
+
+        requests = self._plan_requests(texts, indices)
+        fallback_indices = []
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            futures = [
+                (batch, executor.submit(self._embed_request_with_retry, [texts[i] for i in batch]))
+                for batch in requests
+            ]
+            for batch, future in futures:
+                vectors = future.result()
+                if vectors is None:
+                    fallback_indices.extend(batch)
+                    continue
+                matrix[batch] = vectors
+                valid[batch] = True
+
+        if fallback_indices:
+            local_matrix, local_valid = get_local_embedder().embed_matrix([texts[i] for i in fallback_indices])
+            matrix[fallback_indices] = local_matrix
+            valid[fallback_indices] = local_valid
+
+        return (matrix, valid)
+
+    def embed_batch(self, texts: list[str]) -> list[tuple[int, Optional[list[float]]]]:
+        if not texts:
+            return []
+
+        matrix, valid = self.embed_matrix(texts)
+        rows = matrix.tolist()
+
+        return [
+            (idx, rows[idx] if valid[idx] else None)
+            for idx in range(len(texts))
+        ]
+
+    def close(self):
+        self.client.close()
@@ -1,3 +1,10 @@
-from .pdf_fetcher import PdfFetchResult, PdfFetcher
+from .pdf_fetcher import PdfFetchResult, PdfFetcher, MIN_CONCURRENT_DOWNLOADS, MAX_CONCURRENT_DOWNLOADS
+from .adaptive_concurrency import AdaptiveConcurrencyLimiter
 
-__all__ = ["PdfFetchResult", "PdfFetcher"]
+__all__ = [
+    "PdfFetchResult",
+    "PdfFetcher",
+    "MIN_CONCURRENT_DOWNLOADS",
+    "MAX_CONCURRENT_DOWNLOADS",
+    "AdaptiveConcurrencyLimiter",
+]
@@ -0,0 +1,64 @@
+import threading
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD limit on concurrent downloads.
+
+    Every `limit` completions form a window. The limit grows by one while window
+    throughput keeps up with the previous window, and is multiplied by
+    `decrease_factor` on an error or when throughput drops sharply.
+    """
+
+    def __init__(self, min_limit: int, max_limit: int, initial_limit: int, decrease_factor: float = 0.5):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.decrease_factor = decrease_factor
+        self.peak_limit = int(self.limit)
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._window_bytes = 0
+        self._window_seconds = 0.0
+        self._window_count = 0
+        self._previous_throughput = 0.0
+
+    def acquire(self):
+        with self._condition:
+            while self._in_flight >= int(self.limit):
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self):
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def _decrease(self):
+        self.limit = max(float(self.min_limit), self.limit * self.decrease_factor)
+
+    def on_success(self, num_bytes: int, seconds: float):
+        with self._condition:
+            self._window_bytes += num_bytes
+            self._window_seconds += seconds
+            self._window_count += 1
+
+            if self._window_count < int(self.limit):
+                return
+
+            # Per-download bytes/s times the concurrency that produced it
+            throughput = (self._window_bytes / self._window_seconds) * int(self.limit) if self._window_seconds > 0 else 0.0
+            if throughput >= self._previous_throughput * 0.95:
+                self.limit = min(float(self.max_limit), self.limit + 1)
+            elif throughput < self._previous_throughput * 0.7:
+                self._decrease()
+
+            self.peak_limit = max(self.peak_limit, int(self.limit))
+            self._previous_throughput = throughput
+            self._window_bytes = 0
+            self._window_seconds = 0.0
+            self._window_count = 0
+            self._condition.notify_all()
+
+    def on_error(self):
+        with self._condition:
+            self._decrease()
@@ -1,12 +1,28 @@
+import os
 import time
-from typing import Optional
+import random
+import hashlib
+import threading
+from typing import Iterator, Optional
 from dataclasses import dataclass
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from r2.client import R2Client
+from observability import metrics, get_tracer
+from .adaptive_concurrency import AdaptiveConcurrencyLimiter
 
 
-MAX_CONCURRENT_DOWNLOADS = 3
+MIN_CONCURRENT_DOWNLOADS = int(os.getenv("FETCH_MIN_CONCURRENCY", "2"))
+MAX_CONCURRENT_DOWNLOADS = int(os.getenv("FETCH_MAX_CONCURRENCY", "16"))
+INITIAL_CONCURRENT_DOWNLOADS = int(os.getenv("FETCH_INITIAL_CONCURRENCY", "4"))
 MAX_RETRIES = 2
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 8.0
+# Objects at least this large are downloaded as parallel ranged GETs
+RANGE_THRESHOLD_BYTES = int(os.getenv("FETCH_RANGE_THRESHOLD_BYTES", str(16 * 1024 * 1024)))
+RANGE_PART_BYTES = int(os.getenv("FETCH_RANGE_PART_BYTES", str(8 * 1024 * 1024)))
+RANGE_PARTS_IN_FLIGHT = int(os.getenv("FETCH_RANGE_PARTS_IN_FLIGHT", "4"))
+# Admission estimate when the object size is not known up front
+DEFAULT_SIZE_ESTIMATE_BYTES = 5 * 1024 * 1024
 
 
 @dataclass
@@ -16,48 +32,103 @@ class PdfFetchResult:
     file_bytes: Optional[bytes] = None
     success: bool = True
     error: Optional[str] = None
+    latency_seconds: float = 0.0
+    size_bytes: int = 0
+    # Set instead of file_bytes when the download was spilled to disk
+    spill_path: Optional[str] = None
+    # The claim callback turned the document down (another worker has it); nothing was fetched
+    skipped: bool = False
 
 
 class PdfFetcher:
     def __init__(self, r2_client: R2Client):
         self.r2_client = r2_client
-    
-    def _download_with_retry(self, object_key: str, max_retries: int = MAX_RETRIES) -> bytes:
+        self.limiter = AdaptiveConcurrencyLimiter(
+            min_limit=MIN_CONCURRENT_DOWNLOADS,
+            max_limit=MAX_CONCURRENT_DOWNLOADS,
+            initial_limit=INITIAL_CONCURRENT_DOWNLOADS,
+        )
+
+    @staticmethod
+    def _backoff_seconds(attempt: int) -> float:
+        """Full-jitter exponential backoff."""
+        return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+    def _download_ranged(self, object_key: str, size: int, etag: Optional[str] = None) -> bytes:
+        """Parallel ranged GETs of one object version (the listed etag); any short or changed part raises."""
+        ranges = [
+            (start, min(start + RANGE_PART_BYTES, size) - 1)
+            for start in range(0, size, RANGE_PART_BYTES)
+        ]
+        buffer = bytearray(size)
+
+        with ThreadPoolExecutor(max_workers=RANGE_PARTS_IN_FLIGHT) as executor:
+            futures = {
+                executor.submit(self.r2_client.download_range, object_key, start, end, etag): (start, end)
+                for start, end in ranges
+            }
+            for future in as_completed(futures):
+                start, end = futures[future]
+                part = future.result()
+                if len(part) != end - start + 1:
+                    # The object shrank or changed since it was listed
+                    raise ValueError(f"Range {start}-{end} of {object_key} returned {len(part)} bytes")
+                buffer[start:end + 1] = part
+
+        return bytes(buffer)
+
+    def _download_once(self, object_key: str, size: Optional[int], etag: Optional[str] = None) -> bytes:
+        if size is not None and size >= RANGE_THRESHOLD_BYTES:
+            return self._download_ranged(object_key, size, etag)
+        return self.r2_client.download_pdf(object_key)
+
+    def _download_with_retry(self, object_key: str, size: Optional[int] = None, etag: Optional[str] = None, max_retries: int = MAX_RETRIES) -> bytes:
         last_error = None
-        
+
         for attempt in range(max_retries + 1):
             try:
-                file_bytes = self.r2_client.download_pdf(object_key)
+                file_bytes = self._download_once(object_key, size, etag)
                 if not isinstance(file_bytes, bytes):
                     raise TypeError(f"Expected bytes, got {type(file_bytes)}")
                 return file_bytes
             except Exception as e:
                 last_error = e
+                self.limiter.on_error()
                 if attempt < max_retries:
-                    time.sleep(0.5 * (attempt + 1))
+                    metrics.retries.inc(component="r2_download")
+                    time.sleep(self._backoff_seconds(attempt))
                     continue
                 raise last_error
-    
-    def _fetch_single_pdf(self, doc_id: str, object_key: str) -> PdfFetchResult:
+
+    def _fetch_single_pdf(self, doc_id: str, object_key: str, size: Optional[int] = None, etag: Optional[str] = None) -> PdfFetchResult:
+        self.limiter.acquire()
+        start = time.perf_counter()
         try:
             print(f"Downloading PDF: {doc_id}")
-            file_bytes = self._download_with_retry(object_key)
-            
+            with get_tracer().span("fetch", doc_id=doc_id, object_key=object_key) as span:
+                file_bytes = self._download_with_retry(object_key, size, etag)
+                span.set_attribute("bytes", len(file_bytes))
+            latency = time.perf_counter() - start
+            metrics.bytes_downloaded.inc(len(file_bytes))
+
             if len(file_bytes) == 0:
                 raise ValueError("Downloaded PDF is empty (0 bytes)")
-            
+
             if not file_bytes.startswith(b'%PDF'):
                 raise ValueError("Downloaded file is not a valid PDF (missing PDF header)")
-            
-            print(f"Downloaded PDF: {doc_id} ({len(file_bytes)} bytes)")
-            
+
+            self.limiter.on_success(len(file_bytes), latency)
+            print(f"Downloaded PDF: {doc_id} ({len(file_bytes)} bytes, {latency * 1000:.0f}ms)")
+
             return PdfFetchResult(
                 doc_id=doc_id,
                 object_key=object_key,
                 file_bytes=file_bytes,
-                success=True
+                success=True,
+                latency_seconds=latency,
+                size_bytes=len(file_bytes)
             )
-        
+
         except Exception as e:
             print(f"Failed PDF download: {doc_id} ({str(e)})")
             return PdfFetchResult(
@@ -65,23 +136,174 @@ class PdfFetcher:
                 object_key=object_key,
                 file_bytes=None,
                 success=False,
-                error=str(e)
+                error=str(e),
+                latency_seconds=time.perf_counter() - start
             )
-    
-    def fetch_pdfs(self, candidates: list[tuple[str, str]]) -> list[PdfFetchResult]:
+        finally:
+            self.limiter.release()
+
+    @staticmethod
+    def _print_stats(results: list[PdfFetchResult], wall_seconds: float, peak_limit: int):
+        succeeded = [r for r in results if r.success]
+        if not succeeded or wall_seconds <= 0:
+            return
+
+        total_mb = sum(r.size_bytes for r in succeeded) / (1024 * 1024)
+        latencies = sorted(r.latency_seconds for r in succeeded)
+        p50 = latencies[len(latencies) // 2]
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(
+            f"Fetched {total_mb:.2f} MB in {wall_seconds:.2f}s ({total_mb / wall_seconds:.2f} MB/s), "
+            f"latency p50 {p50 * 1000:.0f}ms / p95 {p95 * 1000:.0f}ms, peak concurrency {peak_limit}"
+        )
+
+    def fetch_pdfs(
+        self,
+        candidates: list[tuple[str, str]],
+        sizes: Optional[dict[str, int]] = None,
+        etags: Optional[dict[str, str]] = None,
+    ) -> list[PdfFetchResult]:
+        """Download candidates (doc_id, object_key); sizes (by object_key) enable ranged GETs of the listed etags."""
         if not candidates:
             return []
-        
+
+        sizes = sizes or {}
+        etags = etags or {}
         results = []
-        
+        start = time.perf_counter()
+
+        # Pool is sized for the ceiling; the limiter decides how many run at once
         with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_DOWNLOADS) as executor:
             futures = {
-                executor.submit(self._fetch_single_pdf, doc_id, object_key): (doc_id, object_key)
+                executor.submit(
+                    self._fetch_single_pdf, doc_id, object_key, sizes.get(object_key), etags.get(object_key)
+                ): (doc_id, object_key)
                 for doc_id, object_key in candidates
             }
-            
+
             for future in as_completed(futures):
                 result = future.result()
                 results.append(result)
-        
+
+        self._print_stats(results, time.perf_counter() - start, self.limiter.peak_limit)
         return results
+
+    @staticmethod
+    def _spill(result: PdfFetchResult, spill_dir: str):
+        os.makedirs(spill_dir, exist_ok=True)
+        name = hashlib.sha256(result.doc_id.encode()).hexdigest()[:32]
+        path = os.path.join(spill_dir, f"{name}.pdf")
+        with open(path, "wb") as f:
+            f.write(result.file_bytes)
+        result.spill_path = path
+        result.file_bytes = None
+
+    @staticmethod
+    def load_bytes(result: PdfFetchResult) -> bytes:
+        """Return the downloaded bytes, reading back (and removing) a spilled file."""
+        if result.file_bytes is not None or not result.spill_path:
+            return result.file_bytes
+        with open(result.spill_path, "rb") as f:
+            file_bytes = f.read()
+        os.remove(result.spill_path)
+        result.spill_path = None
+        return file_bytes
+
+    @staticmethod
+    def discard(result: PdfFetchResult, budget):
+        """Drop a result nobody will process: release its bytes from the budget or remove its spill file."""
+        if result.file_bytes is not None:
+            result.file_bytes = None
+            budget.release(result.size_bytes)
+        elif result.spill_path:
+            try:
+                os.remove(result.spill_path)
+            except OSError:
+                pass
+            result.spill_path = None
+
+    def _fetch_admitted(self, doc_id: str, object_key: str, size: Optional[int], etag: Optional[str], budget, spill_dir: Optional[str], claim=None, closed: Optional[threading.Event] = None) -> PdfFetchResult:
+        skipped = PdfFetchResult(doc_id=doc_id, object_key=object_key, success=False, skipped=True)
+        if closed is not None and closed.is_set():
+            return skipped
+        # Claimed before admission: a claim may wait for the consumer, which must not hold the budget
+        if claim is not None and not claim(doc_id):
+            return skipped
+        admitted = size or DEFAULT_SIZE_ESTIMATE_BYTES
+        budget.acquire(admitted)
+        if closed is not None and closed.is_set():
+            budget.release(admitted)
+            return skipped
+        result = self._fetch_single_pdf(doc_id, object_key, size, etag)
+        # Re-base the admission on the real size
+        budget.release(admitted)
+
+        if not result.success:
+            return result
+
+        if spill_dir and budget.above_watermark():
+            self._spill(result, spill_dir)
+        else:
+            budget.charge(result.size_bytes)
+        return result
+
+    def iter_pdfs(
+        self,
+        candidates: list[tuple[str, str]],
+        budget,
+        sizes: Optional[dict[str, int]] = None,
+        spill_dir: Optional[str] = None,
+        claim=None,
+        etags: Optional[dict[str, str]] = None,
+    ) -> Iterator[PdfFetchResult]:
+        """Yield downloads as they complete, admitting each one against a MemoryBudget.
+
+        A yielded result that holds file_bytes has size_bytes charged to the budget; the
+        consumer releases it. Results finished while the budget is above its watermark
+        are spilled to spill_dir and hold nothing until loaded.
+
+        claim(doc_id), when given, is asked right before each download; a document it
+        turns down is yielded as a skipped result without being fetched.
+
+        etags (by object_key) pin ranged GETs to the listed version of each object.
+
+        If the consumer stops early (it raised, or closed the generator) or a download
+        thread raised, downloads not yet started are cancelled and the results nobody
+        consumed are discarded, so their bytes never stay charged to the budget.
+        """
+        if not candidates:
+            return
+
+        sizes = sizes or {}
+        etags = etags or {}
+        results = []
+        start = time.perf_counter()
+        closed = threading.Event()
+
+        executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_DOWNLOADS)
+        pending = {
+            executor.submit(
+                self._fetch_admitted, doc_id, object_key, sizes.get(object_key), etags.get(object_key), budget, spill_dir, claim, closed
+            )
+            for doc_id, object_key in candidates
+        }
+        try:
+            for future in as_completed(list(pending)):
+                pending.discard(future)
+                result = future.result()
+                results.append(result)
+                yield result
+        finally:
+            closed.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            # Threads still running finish here; releasing what they hold lets admissions waiting on the budget through
+            for future in as_completed([future for future in pending if not future.cancelled()]):
+                if future.exception() is None:
+                    self.discard(future.result(), budget)
+            executor.shutdown(wait=True)
+
+        self._print_stats(
+            results,
+            time.perf_counter() - start,
+            self.limiter.peak_limit
+        )
@@ -1,7 +1,7 @@
 from enum import Enum
 from typing import Optional
 from r2.client import PdfDocument, R2Client
-from state import DocumentStateStore
+from state import DocumentState, DocumentStateStore
 from utils import compute_file_checksum
 
 
@@ -15,9 +15,21 @@ class IngestionDecisionEngine:
     def __init__(self, r2_client: R2Client, state_store: DocumentStateStore):
         self.r2_client = r2_client
         self.state_store = state_store
+        self._states: Optional[dict[str, DocumentState]] = None
+        self._pending_etag_updates: dict[str, str] = {}
+    
+    def preload_states(self) -> int:
+        """Load all document states in one query so decide() makes no per-document reads."""
+        self._states = self.state_store.load_all()
+        return len(self._states)
+    
+    def _get_state(self, doc_id: str) -> Optional[DocumentState]:
+        if self._states is not None:
+            return self._states.get(doc_id)
+        return self.state_store.get(doc_id)
     
     def decide(self, doc: PdfDocument) -> tuple[IngestionDecision, Optional[str]]:
-        previous_state = self.state_store.get(doc.doc_id)
+        previous_state = self._get_state(doc.doc_id)
         
         if not previous_state:
             checksum = self._compute_checksum(doc.object_key)
@@ -34,14 +46,49 @@ class IngestionDecisionEngine:
         checksum = self._compute_checksum(doc.object_key)
         
         if previous_state.checksum == checksum:
-            self.state_store.update_etag_only(doc.doc_id, doc.etag)
+            if self._states is not None:
+                self._pending_etag_updates[doc.doc_id] = doc.etag
+            else:
+                self.state_store.update_etag_only(doc.doc_id, doc.etag)
             return (IngestionDecision.SKIP, None)
         
         return (IngestionDecision.REINGEST, checksum)
     
+    def decide_resumed(self, doc: PdfDocument, checksum: str) -> Optional[tuple[IngestionDecision, str]]:
+        """Decision for a document journaled mid-ingest at its current etag, without downloading it.
+        
+        Returns None when state already records the upsert as complete (the journal is stale).
+        """
+        previous_state = self._get_state(doc.doc_id)
+        
+        if not previous_state:
+            return (IngestionDecision.INGEST, checksum)
+        
+        if previous_state.upsert_completed and previous_state.etag == doc.etag:
+            return None
+        
+        return (IngestionDecision.REINGEST, checksum)
+    
+    def known_checksum(self, doc: PdfDocument) -> Optional[str]:
+        """Checksum state recorded for the document's current etag, or None if it changed or never completed."""
+        previous_state = self._get_state(doc.doc_id)
+        
+        if previous_state and previous_state.upsert_completed and previous_state.etag == doc.etag:
+            return previous_state.checksum
+        return None
+    
     def _compute_checksum(self, object_key: str) -> str:
         file_bytes = self.r2_client.download_pdf(object_key)
         return compute_file_checksum(file_bytes)
     
+    def flush_etag_updates(self) -> int:
+        """Write etag-only updates buffered by decide() in one bulk operation."""
+        if not self._pending_etag_updates:
+            return 0
+        
+        updated = self.state_store.bulk_update_etags(self._pending_etag_updates)
+        self._pending_etag_updates = {}
+        return updated
+    
     def mark_ingested(self, doc: PdfDocument, checksum: str):
         self.state_store.upsert(doc.doc_id, doc.etag, checksum)
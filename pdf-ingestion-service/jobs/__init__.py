@@ -0,0 +1,4 @@
+from .ingestion_job import IngestionJob, JobStatus, StageProgress
+from .job_manager import JobManager, SYNC_INTERVAL_SECONDS
+
+__all__ = ["IngestionJob", "JobStatus", "StageProgress", "JobManager", "SYNC_INTERVAL_SECONDS"]
@@ -0,0 +1,113 @@
+import uuid
+import threading
+from enum import Enum
+from typing import Optional
+from dataclasses import dataclass, field
+from datetime import datetime
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class StageStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+@dataclass
+class StageProgress:
+    name: str
+    status: StageStatus = StageStatus.PENDING
+    total: int = 0
+    completed: int = 0
+    failed: int = 0
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+
+
+@dataclass
+class IngestionJob:
+    trigger: str
+    mode: str
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: JobStatus = JobStatus.QUEUED
+    created_at: str = field(default_factory=_now)
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    error: Optional[str] = None
+    stages: dict[str, StageProgress] = field(default_factory=dict)
+    summary: dict = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+    def mark_running(self):
+        with self._lock:
+            self.status = JobStatus.RUNNING
+            self.started_at = _now()
+
+    def mark_finished(self, error: Optional[str] = None):
+        with self._lock:
+            self.status = JobStatus.FAILED if error else JobStatus.SUCCEEDED
+            self.error = error
+            self.finished_at = _now()
+
+    def start_stage(self, name: str, total: int = 0):
+        with self._lock:
+            self.stages[name] = StageProgress(
+                name=name,
+                status=StageStatus.RUNNING,
+                total=total,
+                started_at=_now()
+            )
+
+    def advance(self, name: str, completed: int = 1, failed: int = 0):
+        with self._lock:
+            stage = self.stages.get(name)
+            if stage:
+                stage.completed += completed
+                stage.failed += failed
+
+    def finish_stage(self, name: str):
+        with self._lock:
+            stage = self.stages.get(name)
+            if stage:
+                stage.status = StageStatus.DONE
+                stage.finished_at = _now()
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "job_id": self.job_id,
+                "trigger": self.trigger,
+                "mode": self.mode,
+                "status": self.status.value,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "error": self.error,
+                "stages": [
+                    {
+                        "name": stage.name,
+                        "status": stage.status.value,
+                        "total": stage.total,
+                        "completed": stage.completed,
+                        "failed": stage.failed,
+                        "started_at": stage.started_at,
+                        "finished_at": stage.finished_at,
+                    }
+                    for stage in self.stages.values()
+                ],
+                "summary": dict(self.summary),
+            }
@@ -0,0 +1,93 @@
+import os
+import threading
+import traceback
+from typing import Optional
+from collections import OrderedDict
+from .ingestion_job import IngestionJob
+
+
+SYNC_INTERVAL_SECONDS = int(os.getenv("INGESTION_SYNC_INTERVAL_SECONDS", "0"))
+MAX_JOB_HISTORY = 50
+
+
+class JobManager:
+    """Runs ingestion jobs on a background thread, one at a time (single-flight).
+
+    `runner` is called as runner(job) and is expected to report progress on the job.
+    """
+
+    def __init__(self, runner, max_history: int = MAX_JOB_HISTORY):
+        self.runner = runner
+        self.max_history = max_history
+        self._jobs: OrderedDict[str, IngestionJob] = OrderedDict()
+        self._active: Optional[IngestionJob] = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._scheduler: Optional[threading.Thread] = None
+
+    def submit(self, trigger: str, mode: str) -> tuple[IngestionJob, bool]:
+        """Start a job unless one is already running. Returns (job, created)."""
+        with self._lock:
+            if self._active and not self._active.is_finished:
+                return (self._active, False)
+
+            job = IngestionJob(trigger=trigger, mode=mode)
+            self._jobs[job.job_id] = job
+            while len(self._jobs) > self.max_history:
+                self._jobs.popitem(last=False)
+            self._active = job
+
+        worker = threading.Thread(
+            target=self._run_job,
+            args=(job,),
+            name=f"ingestion-job-{job.job_id[:8]}",
+            daemon=True
+        )
+        worker.start()
+        return (job, True)
+
+    def _run_job(self, job: IngestionJob):
+        job.mark_running()
+        print(f"\n[Job {job.job_id[:8]}] Started ({job.trigger}, mode={job.mode})")
+        try:
+            self.runner(job)
+            job.mark_finished()
+            print(f"[Job {job.job_id[:8]}] Finished")
+        except Exception as e:
+            print(f"\n!!! FATAL ERROR DURING INGESTION !!!")
+            print(f"Error: {e}")
+            print(traceback.format_exc())
+            job.mark_finished(error=str(e))
+
+    def active(self) -> Optional[IngestionJob]:
+        """The job currently running, if any."""
+        with self._lock:
+            if self._active and not self._active.is_finished:
+                return self._active
+            return None
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> list[IngestionJob]:
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def start_scheduler(self, interval_seconds: int, mode: str):
+        """Submit a "scheduled" job every interval_seconds; skipped while a job is running."""
+        if interval_seconds <= 0 or self._scheduler:
+            return
+
+        def loop():
+            while not self._stop_event.wait(interval_seconds):
+                job, created = self.submit(trigger="scheduled", mode=mode)
+                if not created:
+                    print(f"[Scheduler] Sync skipped: job {job.job_id[:8]} still running")
+
+        self._scheduler = threading.Thread(target=loop, name="ingestion-scheduler", daemon=True)
+        self._scheduler.start()
+        print(f"Periodic sync enabled every {interval_seconds}s")
+
+    def shutdown(self):
+        self._stop_event.set()
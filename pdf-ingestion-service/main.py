@@ -1,26 +1,50 @@
 
 import os
+import json
+import asyncio
+import threading
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+from typing import Optional
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
 import uvicorn
 from dotenv import load_dotenv
-from r2 import list_pdf_objects, get_r2_client
-from state import DocumentStateStore
-from ingestion import IngestionDecisionEngine, IngestionDecision
-from fetch import PdfFetcher
-from parsing import PdfParser
-from chunking import LegalChunker, MetadataEnricher
-from embedding import LocalEmbedder
-from vectorstore import QdrantVectorStore
-from reconciliation import DeletionReconciler
+from state import get_state_store
+from chunkstore import get_chunk_text_store
+from jobs import JobManager, SYNC_INTERVAL_SECONDS
+from pipeline import IngestionPipeline, INGESTION_MODE
+from observability import metrics
 
 
 load_dotenv()
 
+INGEST_ON_STARTUP = os.getenv("INGEST_ON_STARTUP", "true").lower() == "true"
+
+# Largest chunk_ids list one /chunks/texts call may ask for
+MAX_CHUNK_TEXT_LOOKUP = 1000
+MAX_DOCUMENT_UPLOAD_BYTES = int(os.getenv("MAX_DOCUMENT_UPLOAD_MB", "100")) * 1024 * 1024
+
+job_manager: Optional[JobManager] = None
+pipeline: Optional[IngestionPipeline] = None
+chunk_text_store = None
+
+
+class IngestRequest(BaseModel):
+    mode: Optional[str] = None
+
+
+class ChunkTextsRequest(BaseModel):
+    chunk_ids: list[str]
+
+
+class DocumentRequest(BaseModel):
+    object_key: str
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    global job_manager, pipeline
     print(" PDF Ingestion Service starting...")
     
     required_env_vars = [
@@ -37,232 +61,20 @@ async def lifespan(app: FastAPI):
     if missing_vars:
         raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
     
-    # Wrap entire ingestion in try-except to prevent crashes
-    try:
-        # List R2 objects (early failure if R2 is unavailable)
-        try:
-            documents = list_pdf_objects()
-        except Exception as e:
-            print(f"ERROR: Failed to list R2 objects: {e}")
-            print(" PDF Ingestion Service starting in degraded mode (R2 unavailable)")
-            yield
-            print(" PDF Ingestion Service shutting down...")
-            return
-        
-        print(f"Discovered {len(documents)} PDF documents in bucket {os.getenv('CLOUDFLARE_R2_BUCKET_NAME')}")
-        
-        total_size_mb = sum(doc.size for doc in documents) / (1024 * 1024)
-        print(f"Total size: {total_size_mb:.2f} MB")
-        
-        domains = {}
-        for doc in documents:
-            domains[doc.domain] = domains.get(doc.domain, 0) + 1
-        
-        print(f"Domains: {dict(sorted(domains.items()))}")
-        
-        # Initialize services
-        r2_client = get_r2_client()
-        mongo_url = os.getenv("MONGO_URL", "mongodb://mongo:27017")
-        state_store = DocumentStateStore(mongo_url=mongo_url)
-        decision_engine = IngestionDecisionEngine(r2_client, state_store)
-        embedder = LocalEmbedder()
-        vector_store = QdrantVectorStore()
-        deletion_reconciler = DeletionReconciler(state_store, vector_store)
-        
-        # Reconcile deletions
-        current_doc_ids = {doc.doc_id for doc in documents}
-        deleted_count, deletion_error = deletion_reconciler.reconcile_deletions(current_doc_ids)
-        
-        if deletion_error:
-            print(f"Warning: Deletion reconciliation failed: {deletion_error}")
-        elif deleted_count > 0:
-            print(f"Deleted {deleted_count} stale document(s) from vector store")
-        else:
-            print("No deletions needed")
-        
-        # Process ingestion decisions
-        print("\nProcessing decisions:")
-        ingest_count = 0
-        skip_count = 0
-        reingest_count = 0
-        download_candidates = []
-        documents_map = {doc.doc_id: doc for doc in documents}
-        
-        # Store checksums for later marking
-        checksums_to_mark = {}
-        
-        for doc in documents:
-            decision, checksum = decision_engine.decide(doc)
-            
-            if decision == IngestionDecision.INGEST:
-                print(f"  INGEST   {doc.object_key}")
-                download_candidates.append((doc.doc_id, doc.object_key))
-                checksums_to_mark[doc.doc_id] = (doc, checksum)
-                ingest_count += 1
-            elif decision == IngestionDecision.SKIP:
-                print(f"  SKIP     {doc.object_key} (etag unchanged)")
-                skip_count += 1
-            elif decision == IngestionDecision.REINGEST:
-                print(f"  REINGEST {doc.object_key} (checksum changed or incomplete upload)")
-                download_candidates.append((doc.doc_id, doc.object_key))
-                checksums_to_mark[doc.doc_id] = (doc, checksum)
-                reingest_count += 1
-        
-        print(f"\nSummary: {ingest_count} INGEST, {skip_count} SKIP, {reingest_count} REINGEST")
-        
-        if download_candidates:
-            print(f"\nDownloading {len(download_candidates)} PDFs with bounded concurrency (max 3)...")
-            fetcher = PdfFetcher(r2_client)
-            fetch_results = fetcher.fetch_pdfs(download_candidates)
-            
-            success_count = sum(1 for r in fetch_results if r.success)
-            failed_count = sum(1 for r in fetch_results if not r.success)
-            
-            print(f"Download complete: {success_count} succeeded, {failed_count} failed")
-            
-            failed_downloads = []
-            for result in fetch_results:
-                if not result.success:
-                    print(f"  FAILED_DOWNLOAD: {result.doc_id} - {result.error}")
-                    failed_downloads.append(result.doc_id)
-            
-            print(f"\nProcessing PDFs into chunks...")
-            parser = PdfParser()
-            chunker = LegalChunker()
-            enricher = MetadataEnricher()
-            
-            # Group results by document for per-doc processing
-            doc_chunks_map = {}
-            parse_failures = []
-            
-            for result in fetch_results:
-                if not result.success or result.doc_id in failed_downloads:
-                    continue
-                
-                doc_meta = documents_map.get(result.doc_id)
-                if not doc_meta:
-                    continue
-                
-                pages, failure_reason = parser.parse(result.doc_id, result.file_bytes)
-                
-                if failure_reason:
-                    print(f"  {failure_reason}: {result.doc_id}")
-                    parse_failures.append(result.doc_id)
-                    continue
-                
-                raw_chunks = chunker.chunk_pages(pages)
-                text_chunks = enricher.enrich(
-                    raw_chunks,
-                    pages,
-                    domain=doc_meta.domain,
-                    doc_type="unknown"
-                )
-                
-                doc_chunks_map[result.doc_id] = (text_chunks, doc_meta)
-                print(f"  Processed {result.doc_id}: {len(pages)} pages → {len(text_chunks)} chunks")
-            
-            print(f"\nChunking complete: {len(doc_chunks_map)} documents ready, {len(parse_failures)} parse failures")
-            
-            # Process each document: embed → delete-before-upsert → mark complete
-            if doc_chunks_map:
-                embedder = LocalEmbedder()
-                total_docs = len(doc_chunks_map)
-                successful_upserts = 0
-                failed_upserts = []
-                
-                for doc_num, (doc_id, (text_chunks, doc_meta)) in enumerate(doc_chunks_map.items(), 1):
-                    print(f"\n[{doc_num}/{total_docs}] Processing {doc_id}...")
-                    
-                    # Step 1: Generate embeddings
-                    print(f"  Generating embeddings for {len(text_chunks)} chunks...")
-                    chunk_texts = [chunk.text for chunk in text_chunks]
-                    embedding_results = embedder.embed_batch(chunk_texts)
-                    
-                    embedding_success = sum(1 for _, vec in embedding_results if vec is not None)
-                    embedding_failures = len(embedding_results) - embedding_success
-                    
-                    if embedding_failures > 0:
-                        print(f"  Embedding failures: {embedding_failures}/{len(text_chunks)}")
-                    
-                    # Prepare chunk data
-                    chunk_data = []
-                    for chunk, (idx, vector) in zip(text_chunks, embedding_results):
-                        if vector is None:
-                            continue
-                        
-                        r2_public_domain = os.getenv("CLOUDFLARE_R2_PUBLIC_DOMAIN", "")
-                        pdf_url = f"{r2_public_domain}/{chunk.doc_id}" if r2_public_domain else ""
-                        
-                        payload = {
-                            "doc_id": chunk.doc_id,
-                            "page_number": chunk.page_number,
-                            "page_label": chunk.page_label,
-                            "chunk_index": chunk.chunk_index,
-                            "text": chunk.text,
-                            "doc_type": chunk.doc_type,
-                            "domain": chunk.domain,
-                            "source": chunk.source,
-                            "source_system": chunk.source_system,
-                            "pdf_url": pdf_url,
-                        }
-                        
-                        chunk_data.append({
-                            "chunk_id": chunk.chunk_id,
-                            "vector": vector,
-                            "payload": payload
-                        })
-                    
-                    if not chunk_data:
-                        print(f"  ✗ Skipping upsert: all embeddings failed")
-                        failed_upserts.append((doc_id, "All embeddings failed"))
-                        continue
-                    
-                    # Step 2: Delete existing chunks (clean slate)
-                    print(f"  Deleting existing chunks for {doc_id}...")
-                    del_success, del_error = vector_store.delete_by_doc_id(doc_id)
-                    if not del_success:
-                        print(f"  Warning: deletion failed: {del_error} (continuing anyway)")
-                    
-                    # Step 3: Mark as ingested (but not complete) before upload
-                    if doc_id in checksums_to_mark:
-                        doc_meta_obj, checksum = checksums_to_mark[doc_id]
-                        decision_engine.mark_ingested(doc_meta_obj, checksum)
-                    
-                    # Step 4: Upsert all chunks in batches
-                    upsert_success, upsert_error = vector_store.upsert_chunks(chunk_data)
-                    
-                    if upsert_success:
-                        # Step 5: Mark as complete in state (atomic operation)
-                        state_store.mark_upsert_complete(doc_id)
-                        successful_upserts += 1
-                        print(f"  ✓ Successfully upserted {len(chunk_data)} chunks")
-                    else:
-                        failed_upserts.append((doc_id, upsert_error))
-                        print(f"  ✗ Upsert failed: {upsert_error}")
-            
-            print(f"\n=== Ingestion Complete ===")
-            print(f"Successful: {successful_upserts}/{total_docs} documents")
-            if failed_upserts:
-                print(f"Failed: {len(failed_upserts)} documents")
-                for doc_id, error in failed_upserts:
-                    print(f"  - {doc_id}: {error}")
-            else:
-                print("\nNo documents ready for embedding/upsert")
-        else:
-            print("\nNo PDFs to download (all skipped)")
+    # Ingestion runs on a background worker so /health is ready immediately
+    pipeline = IngestionPipeline()
+    job_manager = JobManager(runner=pipeline.run)
     
-    except Exception as e:
-        import traceback
-        print(f"\n!!! FATAL ERROR DURING INGESTION !!!")
-        print(f"Error: {e}")
-        print(f"Traceback:")
-        print(traceback.format_exc())
-        print(f"\nService will continue running for health checks...")
+    if INGEST_ON_STARTUP:
+        job, _ = job_manager.submit(trigger="startup", mode=INGESTION_MODE)
+        print(f"Startup ingestion queued as job {job.job_id}")
+    
+    job_manager.start_scheduler(SYNC_INTERVAL_SECONDS, mode="incremental")
     
-    # Keep service alive for health checks
     print("\n PDF Ingestion Service is ready and waiting for health checks...")
     yield
     
+    job_manager.shutdown()
     print(" PDF Ingestion Service shutting down...")
 
 
@@ -280,39 +92,159 @@ async def health_check():
         content={"status": "ok", "service": "pdf-ingestion-service"}
     )
 
+@app.post("/ingest")
+async def trigger_ingestion(request: Optional[IngestRequest] = None):
+    """Start a sync in the background; returns the running job if one is in flight."""
+    mode = (request.mode if request and request.mode else "incremental").lower()
+    if mode not in ("incremental", "reindex", "rebuild"):
+        return JSONResponse(status_code=400, content={"error": f"Unknown mode: {mode}"})
+    
+    job, created = job_manager.submit(trigger="api", mode=mode)
+    return JSONResponse(
+        status_code=202 if created else 409,
+        content={"created": created, "job": job.to_dict()}
+    )
+
+async def read_upload(request: Request) -> Optional[bytes]:
+    """The request body, or None once it is known to exceed MAX_DOCUMENT_UPLOAD_BYTES.
+    
+    A declared Content-Length over the cap is refused before anything is read; otherwise
+    the body is streamed and reading stops as soon as the running total passes the cap.
+    """
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > MAX_DOCUMENT_UPLOAD_BYTES:
+        return None
+    
+    body = bytearray()
+    async for part in request.stream():
+        body.extend(part)
+        if len(body) > MAX_DOCUMENT_UPLOAD_BYTES:
+            return None
+    return bytes(body)
+
+@app.post("/documents")
+async def ingest_document(request: Request, key: Optional[str] = None):
+    """Ingest one PDF now and stream its progress as Server-Sent Events.
+
+    Either upload the PDF as the body (Content-Type: application/pdf) with ?key= naming
+    the R2 object to store it as, or send {"object_key": ...} for a PDF already in R2.
+    Events: "stage" as each stage finishes, then "done" with success and total seconds.
+    """
+    content_type = request.headers.get("content-type", "")
+    file_bytes = None
+    if content_type.startswith("application/pdf"):
+        if not key:
+            return JSONResponse(status_code=400, content={"error": "Uploads need ?key= for the R2 object key"})
+        file_bytes = await read_upload(request)
+        if file_bytes is None:
+            return JSONResponse(status_code=413, content={"error": f"Upload exceeds {MAX_DOCUMENT_UPLOAD_BYTES} bytes"})
+        if not file_bytes.startswith(b"%PDF"):
+            return JSONResponse(status_code=400, content={"error": "Body is not a PDF"})
+    elif content_type.startswith("application/json"):
+        try:
+            key = DocumentRequest(**await request.json()).object_key
+        except Exception:
+            return JSONResponse(status_code=400, content={"error": 'Expected {"object_key": "<R2 key>"}'})
+    else:
+        return JSONResponse(status_code=415, content={"error": "Send application/pdf or application/json"})
+    
+    if not key.lower().endswith(".pdf"):
+        return JSONResponse(status_code=400, content={"error": "Object key must end in .pdf"})
+    active = job_manager.active()
+    if active and active.mode in ("reindex", "rebuild"):
+        # Points written now would miss the collection the running job is about to publish
+        return JSONResponse(status_code=409, content={"error": f"A {active.mode} is running", "job": active.to_dict()})
+    
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    
+    def emit(event: str, data: dict):
+        loop.call_soon_threadsafe(events.put_nowait, (event, data))
+    
+    def run():
+        try:
+            pipeline.ingest_document(key, file_bytes, on_event=emit)
+        finally:
+            emit(None, None)
+    
+    # Runs to completion even if the client disconnects
+    threading.Thread(target=run, name="ingest-document", daemon=True).start()
+    
+    async def stream():
+        while True:
+            event, data = await events.get()
+            if event is None:
+                break
+            yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/jobs")
+async def list_jobs():
+    return JSONResponse(
+        status_code=200,
+        content={"jobs": [job.to_dict() for job in job_manager.list_jobs()]}
+    )
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if not job:
+        return JSONResponse(status_code=404, content={"error": f"Job not found: {job_id}"})
+    return JSONResponse(status_code=200, content=job.to_dict())
+
+@app.get("/metrics")
+async def ingestion_metrics():
+    """Prometheus text format: stage latency histograms, bytes, pages, chunks, points and retries."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.post("/chunks/texts")
+def get_chunk_texts(request: ChunkTextsRequest):
+    """Texts of compact-payload points by chunk_id (the Qdrant point id), in one batched lookup."""
+    global chunk_text_store
+    if len(request.chunk_ids) > MAX_CHUNK_TEXT_LOOKUP:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"At most {MAX_CHUNK_TEXT_LOOKUP} chunk_ids per request"}
+        )
+    
+    try:
+        if chunk_text_store is None:
+            mongo_url = os.getenv("MONGO_URL", "mongodb://mongo:27017")
+            chunk_text_store = get_chunk_text_store(get_state_store(mongo_url=mongo_url).db)
+        texts = chunk_text_store.get_texts(request.chunk_ids)
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+    
+    return JSONResponse(
+        status_code=200,
+        content={
+            "texts": texts,
+            "missing": [chunk_id for chunk_id in request.chunk_ids if chunk_id not in texts],
+        }
+    )
+
 @app.get("/status")
-async def ingestion_status():
-    """Check ingestion status of all documents."""
+def ingestion_status():
+    """Check ingestion status of all documents.
+    
+    Reads through the pipeline's write-behind store, which flushes deferred completion
+    markers first, so documents finished during a running sync count as complete. Before
+    the pipeline has created its services (no sync or /documents call yet) nothing is
+    deferred, so the state store is read directly.
+    """
     try:
-        mongo_url = os.getenv("MONGO_URL", "mongodb://mongo:27017")
-        state_store = DocumentStateStore(mongo_url=mongo_url)
-        all_docs = state_store.get_all_doc_ids()
-        
-        completed = 0
-        incomplete = 0
-        details = []
-        
-        for doc_id in all_docs:
-            state = state_store.get(doc_id)
-            if state:
-                if state.upsert_completed:
-                    completed += 1
-                else:
-                    incomplete += 1
-                    details.append({
-                        "doc_id": doc_id,
-                        "status": "incomplete",
-                        "last_ingested_at": state.last_ingested_at
-                    })
-        
+        if pipeline._services_ready:
+            store = pipeline.state_store
+        else:
+            store = get_state_store(mongo_url=os.getenv("MONGO_URL", "mongodb://mongo:27017"))
         return JSONResponse(
             status_code=200,
-            content={
-                "total": len(all_docs),
-                "completed": completed,
-                "incomplete": incomplete,
-                "incomplete_docs": details
-            }
+            content=store.status_summary()
         )
     except Exception as e:
         return JSONResponse(
@@ -1,3 +1,4 @@
 from .text_chunk import ParsedPage, RawChunk, TextChunk
+from .chunk_batch import ChunkBatch
 
-__all__ = ["ParsedPage", "RawChunk", "TextChunk"]
+__all__ = ["ParsedPage", "RawChunk", "TextChunk", "ChunkBatch"]
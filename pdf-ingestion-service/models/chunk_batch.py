@@ -0,0 +1,212 @@
+from typing import Optional, Iterator
+import numpy as np
+from .text_chunk import RawChunk, TextChunk
+
+
+# end_page_numbers value for a chunk that ends on the page it starts on
+NO_PAGE = -1
+
+
+class ChunkBatch:
+    """One document's chunks as columns, from chunking through embedding to upsert.
+
+    Per-chunk values are parallel columns: texts and chunk_ids are lists of str (a NumPy
+    string array would pad every text to the longest), positions are int32 arrays.
+    Values shared by the whole document (doc_id, domain, doc_type, source, page labels)
+    are held once instead of on every chunk, and vectors attach as one float32 (n, dim)
+    matrix. batch[i] and iteration build TextChunk objects for code that wants them.
+    """
+
+    __slots__ = (
+        "doc_id",
+        "domain",
+        "doc_type",
+        "source",
+        "source_system",
+        "page_labels",
+        "texts",
+        "chunk_ids",
+        "page_numbers",
+        "chunk_indexes",
+        "start_chars",
+        "end_chars",
+        "end_page_numbers",
+        "vectors",
+    )
+
+    def __init__(
+        self,
+        doc_id: str,
+        texts: list[str],
+        page_numbers,
+        chunk_indexes,
+        start_chars,
+        end_chars,
+        end_page_numbers=None,
+        chunk_ids: Optional[list[str]] = None,
+        domain: str = "",
+        doc_type: str = "unknown",
+        source: str = "pdf",
+        source_system: str = "r2",
+        page_labels: Optional[dict[int, Optional[str]]] = None,
+        vectors: Optional[np.ndarray] = None,
+    ):
+        self.doc_id = doc_id
+        self.texts = texts
+        self.page_numbers = np.asarray(page_numbers, dtype=np.int32)
+        self.chunk_indexes = np.asarray(chunk_indexes, dtype=np.int32)
+        self.start_chars = np.asarray(start_chars, dtype=np.int32)
+        self.end_chars = np.asarray(end_chars, dtype=np.int32)
+        if end_page_numbers is None:
+            self.end_page_numbers = np.full(len(texts), NO_PAGE, dtype=np.int32)
+        else:
+            self.end_page_numbers = np.asarray(end_page_numbers, dtype=np.int32)
+        # Filled in by MetadataEnricher.enrich_batch
+        self.chunk_ids = chunk_ids if chunk_ids is not None else []
+        self.domain = domain
+        self.doc_type = doc_type
+        self.source = source
+        self.source_system = source_system
+        self.page_labels = page_labels or {}
+        self.vectors = vectors
+
+    @classmethod
+    def from_raw_chunks(cls, doc_id: str, chunks: list[RawChunk]) -> "ChunkBatch":
+        return cls(
+            doc_id,
+            [chunk.text for chunk in chunks],
+            [chunk.page_number for chunk in chunks],
+            [chunk.chunk_index for chunk in chunks],
+            [chunk.start_char for chunk in chunks],
+            [chunk.end_char for chunk in chunks],
+            [NO_PAGE if chunk.end_page_number is None else chunk.end_page_number for chunk in chunks],
+        )
+
+    @classmethod
+    def from_rows(cls, rows: list[dict]) -> "ChunkBatch":
+        """The inverse of to_rows(); the document-wide values are taken from the first row."""
+        first = rows[0] if rows else {}
+        page_labels = {}
+        for row in rows:
+            page_labels.setdefault(row["page_number"], row["page_label"])
+        return cls(
+            first.get("doc_id", ""),
+            [row["text"] for row in rows],
+            [row["page_number"] for row in rows],
+            [row["chunk_index"] for row in rows],
+            [row["start_char"] for row in rows],
+            [row["end_char"] for row in rows],
+            [NO_PAGE if row.get("end_page_number") is None else row["end_page_number"] for row in rows],
+            chunk_ids=[row["chunk_id"] for row in rows],
+            domain=first.get("domain", ""),
+            doc_type=first.get("doc_type", "unknown"),
+            source=first.get("source", "pdf"),
+            source_system=first.get("source_system", "r2"),
+            page_labels=page_labels,
+        )
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def end_page_number(self, i: int) -> Optional[int]:
+        end_page = int(self.end_page_numbers[i])
+        return None if end_page == NO_PAGE else end_page
+
+    def __getitem__(self, i: int) -> TextChunk:
+        page_number = int(self.page_numbers[i])
+        return TextChunk(
+            doc_id=self.doc_id,
+            chunk_id=self.chunk_ids[i],
+            page_number=page_number,
+            page_label=self.page_labels.get(page_number),
+            chunk_index=int(self.chunk_indexes[i]),
+            start_char=int(self.start_chars[i]),
+            end_char=int(self.end_chars[i]),
+            text=self.texts[i],
+            doc_type=self.doc_type,
+            domain=self.domain,
+            source=self.source,
+            source_system=self.source_system,
+            end_page_number=self.end_page_number(i),
+        )
+
+    def __iter__(self) -> Iterator[TextChunk]:
+        return (self[i] for i in range(len(self)))
+
+    def raw_chunks(self) -> list[RawChunk]:
+        return [
+            RawChunk(
+                doc_id=self.doc_id,
+                page_number=page_number,
+                chunk_index=chunk_index,
+                start_char=start_char,
+                end_char=end_char,
+                text=text,
+                end_page_number=None if end_page == NO_PAGE else end_page,
+            )
+            for text, page_number, chunk_index, start_char, end_char, end_page in zip(
+                self.texts,
+                self.page_numbers.tolist(),
+                self.chunk_indexes.tolist(),
+                self.start_chars.tolist(),
+                self.end_chars.tolist(),
+                self.end_page_numbers.tolist(),
+            )
+        ]
+
+    def to_rows(self) -> list[dict]:
+        """One dict per chunk with TextChunk's fields, as asdict(TextChunk) would give."""
+        return [
+            {
+                "doc_id": self.doc_id,
+                "chunk_id": chunk_id,
+                "page_number": page_number,
+                "page_label": self.page_labels.get(page_number),
+                "chunk_index": chunk_index,
+                "start_char": start_char,
+                "end_char": end_char,
+                "text": text,
+                "doc_type": self.doc_type,
+                "domain": self.domain,
+                "source": self.source,
+                "source_system": self.source_system,
+                "end_page_number": None if end_page == NO_PAGE else end_page,
+            }
+            for chunk_id, text, page_number, chunk_index, start_char, end_char, end_page in zip(
+                self.chunk_ids,
+                self.texts,
+                self.page_numbers.tolist(),
+                self.chunk_indexes.tolist(),
+                self.start_chars.tolist(),
+                self.end_chars.tolist(),
+                self.end_page_numbers.tolist(),
+            )
+        ]
+
+    def take(self, indices: list[int]) -> "ChunkBatch":
+        """A batch of the chunks at indices, in that order; document-wide values are shared, not copied."""
+        index = np.asarray(indices, dtype=np.intp)
+        return ChunkBatch(
+            self.doc_id,
+            [self.texts[i] for i in indices],
+            self.page_numbers[index],
+            self.chunk_indexes[index],
+            self.start_chars[index],
+            self.end_chars[index],
+            self.end_page_numbers[index],
+            chunk_ids=[self.chunk_ids[i] for i in indices] if self.chunk_ids else [],
+            domain=self.domain,
+            doc_type=self.doc_type,
+            source=self.source,
+            source_system=self.source_system,
+            page_labels=self.page_labels,
+            vectors=self.vectors[index] if self.vectors is not None else None,
+        )
+
+    def attach_vectors(self, vectors: np.ndarray):
+        if vectors.shape[0] != len(self):
+            raise ValueError(f"{vectors.shape[0]} vectors for {len(self)} chunks")
+        self.vectors = vectors
+
+    def text_chars(self) -> int:
+        return sum(len(text) for text in self.texts)
@@ -3,7 +3,7 @@ from dataclasses import dataclass
 import hashlib
 
 
-@dataclass
+@dataclass(slots=True)
 class ParsedPage:
     doc_id: str
     page_number: int
@@ -11,7 +11,7 @@ class ParsedPage:
     text: str
 
 
-@dataclass
+@dataclass(slots=True)
 class RawChunk:
     doc_id: str
     page_number: int
@@ -19,9 +19,11 @@ class RawChunk:
     start_char: int
     end_char: int
     text: str
+    # Set when the chunk continues past page_number; end_char is then on this page
+    end_page_number: Optional[int] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class TextChunk:
     doc_id: str
     chunk_id: str
@@ -35,6 +37,7 @@ class TextChunk:
     domain: str
     source: str
     source_system: str
+    end_page_number: Optional[int] = None
     
     @staticmethod
     def generate_chunk_id(doc_id: str, page_number: int, chunk_index: int) -> str:
@@ -0,0 +1,14 @@
+from .metrics import metrics, MetricsRegistry, Counter, Histogram
+from .tracing import Tracer, Span, DocumentTimings, get_tracer, TRACE_SLOWEST_DOCUMENTS
+
+__all__ = [
+    "metrics",
+    "MetricsRegistry",
+    "Counter",
+    "Histogram",
+    "Tracer",
+    "Span",
+    "DocumentTimings",
+    "get_tracer",
+    "TRACE_SLOWEST_DOCUMENTS",
+]
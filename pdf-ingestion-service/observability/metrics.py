@@ -0,0 +1,113 @@
+import bisect
+import threading
+
+
+# Seconds; spans fast parses up to slow embeds of very large documents
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, description: str, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [bucket counts..., sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [0] * len(self.buckets) + [0.0, 0]
+                self._series[key] = series
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, (('le', bound),))} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, (('le', '+Inf'),))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide ingestion metrics, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self.stage_seconds = Histogram(
+            "ingestion_stage_seconds", "Time spent per document in each ingestion stage"
+        )
+        self.bytes_downloaded = Counter("ingestion_bytes_downloaded_total", "PDF bytes downloaded from R2")
+        self.pages_parsed = Counter("ingestion_pages_parsed_total", "PDF pages with extracted text")
+        self.parse_backend = Counter("ingestion_parse_backend_total", "PDF extraction attempts, by backend and outcome")
+        self.chunks_embedded = Counter("ingestion_chunks_embedded_total", "Chunks sent to the embedder")
+        self.points_upserted = Counter("ingestion_points_upserted_total", "Points written to Qdrant")
+        self.points_unchanged = Counter("ingestion_points_unchanged_total", "Re-ingested points left in place because their content was unchanged")
+        self.retries = Counter("ingestion_retries_total", "Retried calls, by component")
+        self.documents = Counter("ingestion_documents_total", "Documents processed, by outcome")
+
+    def render(self) -> str:
+        lines = []
+        for metric in (
+            self.stage_seconds,
+            self.bytes_downloaded,
+            self.pages_parsed,
+            self.parse_backend,
+            self.chunks_embedded,
+            self.points_upserted,
+            self.points_unchanged,
+            self.retries,
+            self.documents,
+        ):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import uuid
+import threading
+from typing import Optional
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from utils import data_path
+from .metrics import metrics
+
+
+# Comma-separated: "jsonl" (TRACE_JSONL_PATH) and/or "otel" (OTLP via the standard OTEL_* env vars)
+TRACE_EXPORT = os.getenv("TRACE_EXPORT", "")
+TRACE_SLOWEST_DOCUMENTS = int(os.getenv("TRACE_SLOWEST_DOCUMENTS", "10"))
+SERVICE_NAME = "pdf-ingestion-service"
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_time: float
+    attributes: dict = field(default_factory=dict)
+    duration_seconds: float = 0.0
+    status: str = "ok"
+    error: Optional[str] = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration_seconds": round(self.duration_seconds, 6),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class JsonLinesExporter:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("TRACE_JSONL_PATH") or data_path("traces.jsonl")
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def _create_otel_tracer():
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    except ImportError as e:
+        print(f"Warning: TRACE_EXPORT includes otel but OpenTelemetry is not installed ({e}); skipping")
+        return None
+
+    provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    return trace.get_tracer(SERVICE_NAME)
+
+
+class Tracer:
+    """Timing spans for ingestion stages.
+
+    Every span feeds the ingestion_stage_seconds histogram under its name. Spans are
+    also written as JSON lines and/or mirrored to OpenTelemetry when TRACE_EXPORT asks
+    for it. Nesting is tracked per thread; spans opened on worker threads (downloads)
+    are roots that share the run's trace_id.
+    """
+
+    def __init__(self, export: str = TRACE_EXPORT):
+        targets = {t.strip().lower() for t in export.split(",") if t.strip()}
+        self.jsonl = JsonLinesExporter() if "jsonl" in targets else None
+        self.otel = _create_otel_tracer() if "otel" in targets else None
+        self.trace_id = uuid.uuid4().hex
+        self._local = threading.local()
+
+    def start_trace(self, trace_id: Optional[str] = None) -> str:
+        """Begin a new trace (one per ingestion run); later root spans join it."""
+        self.trace_id = trace_id or uuid.uuid4().hex
+        return self.trace_id
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = []
+            self._local.stack = stack
+        return stack
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else self.trace_id,
+            span_id=uuid.uuid4().hex[:16],
+            parent_id=parent.span_id if parent else None,
+            start_time=time.time(),
+            attributes={k: v for k, v in attributes.items() if v is not None},
+        )
+        otel_span = self.otel.start_as_current_span(name, attributes=span.attributes) if self.otel else nullcontext()
+
+        stack.append(span)
+        start = time.perf_counter()
+        with otel_span as live_otel_span:
+            try:
+                yield span
+            except Exception as e:
+                span.status = "error"
+                span.error = str(e)
+                raise
+            finally:
+                span.duration_seconds = time.perf_counter() - start
+                stack.pop()
+                metrics.stage_seconds.observe(span.duration_seconds, stage=name)
+                if live_otel_span is not None:
+                    for key, value in span.attributes.items():
+                        live_otel_span.set_attribute(key, value)
+                if self.jsonl:
+                    try:
+                        self.jsonl.export(span)
+                    except Exception as e:
+                        print(f"Warning: could not write trace span: {e}")
+
+
+class DocumentTimings:
+    """Per-document seconds by stage, for the slowest-documents summary of a run."""
+
+    def __init__(self):
+        self._timings = {}
+        self._lock = threading.Lock()
+
+    def add(self, doc_id: str, stage: str, seconds: float):
+        with self._lock:
+            stages = self._timings.setdefault(doc_id, {})
+            stages[stage] = stages.get(stage, 0.0) + seconds
+
+    def slowest(self, limit: int = TRACE_SLOWEST_DOCUMENTS) -> list[dict]:
+        with self._lock:
+            ranked = sorted(self._timings.items(), key=lambda item: sum(item[1].values()), reverse=True)
+        return [
+            {
+                "doc_id": doc_id,
+                "total_seconds": round(sum(stages.values()), 3),
+                "stages": {stage: round(seconds, 3) for stage, seconds in stages.items()},
+            }
+            for doc_id, stages in ranked[:limit]
+        ]
+
+    def print_summary(self, limit: int = TRACE_SLOWEST_DOCUMENTS) -> list[dict]:
+        slowest = self.slowest(limit)
+        if not slowest:
+            return slowest
+
+        print(f"\nSlowest {len(slowest)} document(s):")
+        for entry in slowest:
+            breakdown = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in entry["stages"].items())
+            print(f"  {entry['total_seconds']:7.2f}s  {entry['doc_id']}  ({breakdown})")
+        return slowest
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = Tracer()
+    return _tracer
@@ -1,3 +1,15 @@
-from .pdf_parser import PdfParser, ParseFailureReason
+from .pdf_parser import PdfParser, ParseFailureReason, MIN_TEXT_THRESHOLD
+from .backends import PypdfBackend, PdfiumBackend, load_backends, PDF_BACKENDS
+from .parsed_text_store import ParsedTextStore, PARSED_TEXT_ENABLED
 
-__all__ = ["PdfParser", "ParseFailureReason"]
+__all__ = [
+    "PdfParser",
+    "ParseFailureReason",
+    "MIN_TEXT_THRESHOLD",
+    "PypdfBackend",
+    "PdfiumBackend",
+    "load_backends",
+    "PDF_BACKENDS",
+    "ParsedTextStore",
+    "PARSED_TEXT_ENABLED",
+]
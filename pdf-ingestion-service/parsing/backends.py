@@ -0,0 +1,129 @@
+import io
+import os
+import statistics
+import threading
+from typing import Optional
+from pypdf import PdfReader
+
+
+# Tried in order per document; a later backend runs when an earlier one errors or
+# extracts less than MIN_TEXT_THRESHOLD characters
+PDF_BACKENDS = os.getenv("PDF_BACKENDS", "pypdfium2,pypdf")
+# A vertical gap this many times the page's usual line pitch is read as a paragraph break
+PARAGRAPH_GAP_FACTOR = 1.5
+# PDFium keeps global state; documents are extracted one at a time per process
+_PDFIUM_LOCK = threading.Lock()
+
+# (page_number, page_label, text) for every page, including empty ones
+ExtractedPage = tuple[int, Optional[str], str]
+
+
+class PypdfBackend:
+    """Pure-Python extraction; slow, but keeps blank lines (paragraph breaks) in layout order."""
+
+    name = "pypdf"
+
+    def extract_pages(self, file_bytes: bytes) -> list[ExtractedPage]:
+        pdf_reader = PdfReader(io.BytesIO(file_bytes))
+        pages = []
+        for page_num, page in enumerate(pdf_reader.pages, start=1):
+            page_label = None
+            if hasattr(page, "page_number") and page.page_number is not None:
+                page_label = str(page.page_number)
+            pages.append((page_num, page_label, page.extract_text() or ""))
+        return pages
+
+
+def _text_lines(textpage) -> list[list[float]]:
+    """[left, bottom, right, top] per visual line, merging text rects that overlap vertically."""
+    lines = []
+    for index in range(textpage.count_rects()):
+        left, bottom, right, top = textpage.get_rect(index)
+        if lines and bottom < lines[-1][3] and top > lines[-1][1]:
+            line = lines[-1]
+            line[0] = min(line[0], left)
+            line[1] = min(line[1], bottom)
+            line[2] = max(line[2], right)
+            line[3] = max(line[3], top)
+        else:
+            lines.append([left, bottom, right, top])
+    return lines
+
+
+class PdfiumBackend:
+    """PDFium (Chrome's PDF engine) through pypdfium2; native and several times faster than pypdf.
+
+    PDFium drops blank lines, so paragraph breaks (which the chunker splits on) are put
+    back from the gaps between text lines. PDFium is not thread-safe, so extraction
+    holds a process-wide lock (several pipelines can share a process).
+    """
+
+    name = "pypdfium2"
+
+    def __init__(self):
+        import pypdfium2
+        self._pdfium = pypdfium2
+
+    def extract_pages(self, file_bytes: bytes) -> list[ExtractedPage]:
+        with _PDFIUM_LOCK:
+            pdf = self._pdfium.PdfDocument(file_bytes)
+            try:
+                pages = []
+                for index in range(len(pdf)):
+                    page = pdf[index]
+                    textpage = page.get_textpage()
+                    try:
+                        text = self._page_text(textpage)
+                    finally:
+                        textpage.close()
+                        page.close()
+                    page_label = pdf.get_page_label(index) or None
+                    pages.append((index + 1, page_label, text))
+                return pages
+            finally:
+                pdf.close()
+
+    @staticmethod
+    def _page_text(textpage) -> str:
+        lines = _text_lines(textpage)
+        text_lines = textpage.get_text_bounded().split("\r\n")
+        if len(lines) < 2:
+            return "\n".join(text_lines)
+
+        if len(text_lines) != len(lines):
+            # PDFium broke lines differently from the geometry; read each line by its box
+            text_lines = [textpage.get_text_bounded(*line).replace("\r\n", " ") for line in lines]
+
+        pitches = [above[3] - below[3] for above, below in zip(lines, lines[1:]) if above[3] > below[3]]
+        pitch = statistics.median(pitches) if pitches else 0.0
+        out = [text_lines[0]]
+        for above, below, text in zip(lines, lines[1:], text_lines[1:]):
+            if pitch and above[3] - below[3] > PARAGRAPH_GAP_FACTOR * pitch:
+                out.append("")
+            out.append(text)
+        return "\n".join(out)
+
+
+BACKENDS = {
+    PypdfBackend.name: PypdfBackend,
+    PdfiumBackend.name: PdfiumBackend,
+}
+
+
+def load_backends(names: str = PDF_BACKENDS) -> list:
+    """Instantiate the named backends in order; ones whose library is missing are skipped."""
+    backends = []
+    for name in (n.strip().lower() for n in names.split(",")):
+        if not name:
+            continue
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown PDF backend: {name} (choose from {', '.join(BACKENDS)})")
+        try:
+            backends.append(BACKENDS[name]())
+        except ImportError as e:
+            print(f"Warning: PDF backend {name} is not installed ({e}); skipping")
+
+    if not backends:
+        # pypdf is a hard dependency, so there is always something to fall back to
+        backends.append(PypdfBackend())
+    return backends
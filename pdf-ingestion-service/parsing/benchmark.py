@@ -0,0 +1,47 @@
+"""PDF extraction benchmark on the synthetic legal corpus, one backend at a time.
+
+    python -m parsing.benchmark --documents 50
+    python -m parsing.benchmark --backends pypdfium2,pypdf --max-pages 40
+"""
+import argparse
+import time
+from benchmark.synthetic_corpus import CorpusConfig, generate_corpus
+from .backends import PDF_BACKENDS, load_backends
+
+
+def run(backend, documents) -> tuple[float, int, int, int]:
+    """(seconds, pages, characters, blank-line paragraph breaks) extracted from the documents."""
+    pages = 0
+    characters = 0
+    breaks = 0
+    start = time.perf_counter()
+    for document in documents:
+        for _, _, text in backend.extract_pages(document.data):
+            pages += 1
+            characters += len(text)
+            breaks += text.count("\n \n") + text.count("\n\n")
+    return (time.perf_counter() - start, pages, characters, breaks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=50)
+    parser.add_argument("--max-pages", type=int, default=20)
+    parser.add_argument("--backends", default=PDF_BACKENDS)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    documents = list(generate_corpus(CorpusConfig(documents=args.documents, max_pages=args.max_pages, seed=args.seed)))
+    total_mb = sum(len(document.data) for document in documents) / (1024 * 1024)
+    print(f"{len(documents)} PDFs, {sum(d.pages for d in documents)} pages, {total_mb:.1f} MB")
+
+    for backend in load_backends(args.backends):
+        seconds, pages, characters, breaks = run(backend, documents)
+        print(
+            f"  {backend.name:<10} {seconds:8.3f}s  {pages / seconds:8.1f} pages/s  "
+            f"{characters} chars  {breaks} paragraph breaks"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+from typing import Optional
+from datetime import datetime
+import threading
+import sqlite3
+import json
+import zlib
+import os
+from models import ParsedPage
+from utils import data_path
+
+
+PARSED_TEXT_ENABLED = os.getenv("INGESTION_PARSED_TEXT_ENABLED", "true").lower() == "true"
+# Kept across runs like the manifest: point INGESTION_DATA_DIR (or this) at a persistent volume
+PARSED_TEXT_PATH = os.getenv("INGESTION_PARSED_TEXT_PATH", "")
+# Written once per PDF version and read back on every rebuild, so size matters more than write speed
+COMPRESSION_LEVEL = int(os.getenv("INGESTION_PARSED_TEXT_COMPRESSION_LEVEL", "9"))
+
+
+class ParsedTextStore:
+    """PdfParser output per PDF checksum in a local SQLite file, to rebuild chunks without the PDFs.
+
+    A row holds one document's pages as zlib-compressed JSON [[page_number, page_label,
+    text], ...] plus the backend that parsed them. Rows are keyed by the checksum of the
+    PDF bytes, so a changed PDF gets a new row and identical PDFs share one; doc_id is
+    filled back in on load.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or PARSED_TEXT_PATH or data_path("parsed_pages.sqlite")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS parsed_pages ("
+                "checksum TEXT PRIMARY KEY, backend TEXT, pages INTEGER NOT NULL, "
+                "data BLOB NOT NULL, parsed_at TEXT NOT NULL)"
+            )
+
+    @staticmethod
+    def _encode(pages: list[ParsedPage]) -> bytes:
+        rows = [[page.page_number, page.page_label, page.text] for page in pages]
+        return zlib.compress(json.dumps(rows, ensure_ascii=False).encode("utf-8"), COMPRESSION_LEVEL)
+
+    @staticmethod
+    def _decode(doc_id: str, data: bytes) -> list[ParsedPage]:
+        return [
+            ParsedPage(doc_id=doc_id, page_number=page_number, page_label=page_label, text=text)
+            for page_number, page_label, text in json.loads(zlib.decompress(data).decode("utf-8"))
+        ]
+
+    def put(self, checksum: str, pages: list[ParsedPage], backend: Optional[str] = None):
+        data = self._encode(pages)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO parsed_pages VALUES (?, ?, ?, ?, ?)",
+                (checksum, backend, len(pages), data, datetime.utcnow().isoformat())
+            )
+
+    def get(self, checksum: str, doc_id: str) -> Optional[list[ParsedPage]]:
+        """The pages stored for checksum, attributed to doc_id; None when there are none or they are unreadable."""
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM parsed_pages WHERE checksum = ?", (checksum,)).fetchone()
+        if row is None:
+            return None
+        try:
+            return self._decode(doc_id, row[0])
+        except Exception as e:
+            print(f"Warning: could not read parsed text for {doc_id}: {e}")
+            return None
+
+    def prune(self, keep_checksums: set[str]) -> int:
+        """Drop rows for PDF versions no longer in the bucket."""
+        with self._lock, self._conn:
+            rows = self._conn.execute("SELECT checksum FROM parsed_pages").fetchall()
+            stale = [(checksum,) for (checksum,) in rows if checksum not in keep_checksums]
+            self._conn.executemany("DELETE FROM parsed_pages WHERE checksum = ?", stale)
+        return len(stale)
+
+    def stats(self) -> dict:
+        with self._lock:
+            documents, pages, stored_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(pages), 0), COALESCE(SUM(LENGTH(data)), 0) FROM parsed_pages"
+            ).fetchone()
+        return {"documents": documents, "pages": pages, "bytes": stored_bytes}
@@ -1,8 +1,10 @@
 from typing import Optional
 from enum import Enum
-import io
-from pypdf import PdfReader
+import time
+import threading
 from models import ParsedPage
+from observability import metrics
+from .backends import PDF_BACKENDS, load_backends
 
 
 MIN_TEXT_THRESHOLD = 100
@@ -14,36 +16,82 @@ class ParseFailureReason(str, Enum):
 
 
 class PdfParser:
+    """Extracts page text with the first backend in the chain that yields enough of it.
+
+    A backend that raises, or returns less than MIN_TEXT_THRESHOLD characters, hands
+    the document to the next one. last_backend names the backend that won the most
+    recent parse; stats holds per-backend pages, seconds, wins and failures.
+    """
+
+    def __init__(self, backends: str = PDF_BACKENDS):
+        self.backends = load_backends(backends)
+        self.last_backend: Optional[str] = None
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {
+                backend.name: {"documents": 0, "pages": 0, "seconds": 0.0, "failures": 0}
+                for backend in self.backends
+            }
+
+    def _record(self, name: str, seconds: float, pages: int = 0, won: bool = False):
+        with self._lock:
+            stats = self.stats[name]
+            stats["seconds"] += seconds
+            if won:
+                stats["documents"] += 1
+                stats["pages"] += pages
+            else:
+                stats["failures"] += 1
+        metrics.parse_backend.inc(backend=name, outcome="won" if won else "failed")
+
+    def summary(self) -> dict:
+        """Per-backend stats with pages/s over the time spent in winning and losing attempts."""
+        with self._lock:
+            return {
+                name: {
+                    **stats,
+                    "seconds": round(stats["seconds"], 3),
+                    "pages_per_second": round(stats["pages"] / stats["seconds"], 1) if stats["seconds"] > 0 else 0.0,
+                }
+                for name, stats in self.stats.items()
+            }
+
     def parse(self, doc_id: str, file_bytes: bytes) -> tuple[Optional[list[ParsedPage]], Optional[ParseFailureReason]]:
-        try:
-            pdf_reader = PdfReader(io.BytesIO(file_bytes))
+        self.last_backend = None
+        failure_reason = ParseFailureReason.FAILED_PARSE_ERROR
+
+        for backend in self.backends:
+            start = time.perf_counter()
+            try:
+                extracted = backend.extract_pages(file_bytes)
+            except Exception as e:
+                self._record(backend.name, time.perf_counter() - start)
+                print(f"  {backend.name} failed on {doc_id}: {e}")
+                continue
+
             pages = []
             total_text_length = 0
-            
-            for page_num, page in enumerate(pdf_reader.pages, start=1):
-                text = page.extract_text()
-                
+            for page_num, page_label, text in extracted:
                 if not text or text.strip() == "":
                     continue
-                
                 total_text_length += len(text.strip())
-                
-                page_label = None
-                if hasattr(page, "page_number") and page.page_number is not None:
-                    page_label = str(page.page_number)
-                
-                parsed_page = ParsedPage(
+                pages.append(ParsedPage(
                     doc_id=doc_id,
                     page_number=page_num,
                     page_label=page_label,
                     text=text
-                )
-                pages.append(parsed_page)
-            
+                ))
+
             if total_text_length < MIN_TEXT_THRESHOLD:
-                return (None, ParseFailureReason.FAILED_PARSE_TEXT_EMPTY)
-            
+                self._record(backend.name, time.perf_counter() - start)
+                failure_reason = ParseFailureReason.FAILED_PARSE_TEXT_EMPTY
+                continue
+
+            self._record(backend.name, time.perf_counter() - start, pages=len(extracted), won=True)
+            self.last_backend = backend.name
             return (pages, None)
-        
-        except Exception as e:
-            return (None, ParseFailureReason.FAILED_PARSE_ERROR)
+
+        return (None, failure_reason)
@@ -0,0 +1,3 @@
+from .ingestion_pipeline import IngestionPipeline, INGESTION_MODE
+
+__all__ = ["IngestionPipeline", "INGESTION_MODE"]
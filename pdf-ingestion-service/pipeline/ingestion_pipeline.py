@@ -0,0 +1,1165 @@
+import os
+import time
+import random
+import threading
+from typing import Optional
+from contextlib import contextmanager
+from dataclasses import dataclass
+import numpy as np
+from r2 import get_r2_client, R2Manifest, ListingDiff, MANIFEST_ENABLED
+from state import get_state_store, WriteBehindStateStore, IngestionJournal, Checkpoint, JOURNAL_ENABLED, DocumentLeaseStore, LEASES_ENABLED
+from state.document_leases import CLAIM_AHEAD
+from state.ingestion_journal import STAGE_PARSED, STAGE_CHUNKED, STAGE_EMBEDDED, STAGE_UPSERTING
+from ingestion import IngestionDecisionEngine, IngestionDecision
+from fetch import PdfFetcher, MIN_CONCURRENT_DOWNLOADS, MAX_CONCURRENT_DOWNLOADS
+from parsing import PdfParser, ParsedTextStore, PARSED_TEXT_ENABLED
+from chunking import LegalChunker, MetadataEnricher
+from embedding import get_embedder
+from vectorstore import QdrantVectorStore, BlueGreenReindexer, WRITE_STRATEGY, VERSION_FIELD, CONTENT_HASH_FIELD, content_hash
+from reconciliation import DeletionReconciler
+from dedup import ChunkDeduplicator, DedupPlan
+from sparse import Bm25Encoder, SPARSE_VECTORS_ENABLED
+from chunkstore import get_chunk_text_store, compact_payload, PAYLOAD_MODE
+from utils import compute_file_checksum, data_path
+from jobs import IngestionJob
+from models import ChunkBatch
+from models.chunk_batch import NO_PAGE
+from observability import metrics, get_tracer, DocumentTimings
+from .memory_budget import MemoryBudget, Reservation, CHUNK_OVERHEAD_BYTES, VECTOR_BYTES_PER_CHUNK
+
+
+# "incremental" (default), "reindex" for a blue/green rebuild of the whole collection, or
+# "rebuild" for a reindex that re-chunks and re-embeds stored parsed text instead of re-fetching
+INGESTION_MODE = os.getenv("INGESTION_MODE", "incremental").lower()
+
+STAGE_DISCOVER = "discover"
+STAGE_RECONCILE = "reconcile"
+STAGE_DECIDE = "decide"
+STAGE_FETCH = "fetch"
+STAGE_CHUNK = "parse_chunk"
+STAGE_EMBED_UPSERT = "embed_upsert"
+STAGE_PUBLISH = "publish"
+
+# Journal checkpoints in the order a document reaches them
+JOURNAL_STAGE_ORDER = (STAGE_PARSED, STAGE_CHUNKED, STAGE_EMBEDDED, STAGE_UPSERTING)
+
+
+@dataclass
+class DocumentOutcome:
+    doc_id: str
+    success: bool
+    stage: str
+    error: Optional[str] = None
+
+
+class IngestionPipeline:
+    """One sync of the R2 bucket into Qdrant: discover → reconcile → decide → fetch → chunk → embed/upsert.
+
+    Services are created on first run and reused by later runs in the same process.
+    """
+
+    def __init__(
+        self,
+        r2_client=None,
+        state_store=None,
+        embedder=None,
+        vector_store=None,
+        manifest=None,
+        deduplicator=None,
+        journal=None,
+        parser=None,
+        text_store=None,
+        sparse_encoder=None,
+        leases=None,
+        parsed_store=None,
+    ):
+        # Services passed in are used as-is (benchmarks, local stand-ins); the rest are built from env
+        self._overrides = {
+            "r2_client": r2_client,
+            "state_store": state_store,
+            "embedder": embedder,
+            "vector_store": vector_store,
+            "manifest": manifest,
+            "deduplicator": deduplicator,
+            "journal": journal,
+            "parser": parser,
+            "text_store": text_store,
+            "sparse_encoder": sparse_encoder,
+            "leases": leases,
+            "parsed_store": parsed_store,
+        }
+        self.tracer = get_tracer()
+        self._timings = DocumentTimings()
+        self._journaling = False
+        self._leasing = False
+        self._rebuilding = False
+        # Documents whose dedup canonical chunks changed; kept out of the manifest until re-ingested
+        self._stale_dependents = set()
+        # Chunk text store a reindex writes to; promoted over the live texts when it publishes
+        self._staging_texts = None
+        self._resume_stats = {}
+        self._services_ready = False
+        self._services_lock = threading.Lock()
+        # Documents go through parse → upsert one at a time, whether from a sync or ingest_document,
+        # so the dedup index, BM25 statistics and state writes never see two at once
+        self._document_lock = threading.Lock()
+        # doc_id -> on_event(event, data) for documents ingested through ingest_document
+        self._listeners = {}
+
+    @contextmanager
+    def _stage(self, name: str, doc_id: Optional[str] = None, **attributes):
+        """Trace a stage; per-document stages also count toward the slowest-documents summary."""
+        with self.tracer.span(name, doc_id=doc_id, **attributes) as span:
+            yield span
+        if doc_id:
+            self._timings.add(doc_id, name, span.duration_seconds)
+            listener = self._listeners.get(doc_id)
+            if listener:
+                listener("stage", {"stage": name, "seconds": round(span.duration_seconds, 4), **span.attributes})
+
+    def _ensure_services(self):
+        # The sync job thread and a /documents request can both get here first
+        with self._services_lock:
+            if not self._services_ready:
+                self._create_services()
+
+    def _create_services(self):
+        overrides = self._overrides
+        self.r2_client = overrides["r2_client"] or get_r2_client()
+        mongo_url = os.getenv("MONGO_URL", "mongodb://mongo:27017")
+        state_store = overrides["state_store"] or get_state_store(mongo_url=mongo_url)
+        # Defers completion markers and etag-only writes to stage boundaries, and times every call
+        self.state_store = state_store if isinstance(state_store, WriteBehindStateStore) else WriteBehindStateStore(state_store)
+        self.decision_engine = IngestionDecisionEngine(self.r2_client, self.state_store)
+        self.embedder = overrides["embedder"] or get_embedder()
+        self.vector_store = overrides["vector_store"] or QdrantVectorStore()
+        # Set only for compact payloads: chunk text then lives here instead of in Qdrant
+        self.text_store = overrides["text_store"] or (
+            get_chunk_text_store(self.state_store.db) if PAYLOAD_MODE == "compact" else None
+        )
+        self.deletion_reconciler = DeletionReconciler(
+            self.state_store, self.vector_store, self.text_store, on_deleted=self._forget_deleted
+        )
+        self.manifest = overrides["manifest"] or R2Manifest()
+        self.parser = overrides["parser"] or PdfParser()
+        # Parser output by PDF checksum, so a rebuild can re-chunk without fetching or parsing
+        self.parsed_store = overrides["parsed_store"] or (ParsedTextStore() if PARSED_TEXT_ENABLED else None)
+        self.chunker = LegalChunker()
+        self.enricher = MetadataEnricher()
+        self.deduplicator = overrides["deduplicator"] or ChunkDeduplicator()
+        indexed_chunks = self.deduplicator.load()
+        if indexed_chunks:
+            print(f"Loaded dedup index with {indexed_chunks} chunk(s)")
+        self.sparse_encoder = overrides["sparse_encoder"] or (Bm25Encoder() if SPARSE_VECTORS_ENABLED else None)
+        if self.sparse_encoder is not None and self.sparse_encoder.load():
+            print(f"Loaded BM25 vocabulary with {len(self.sparse_encoder)} term(s)")
+        # The journal and leases live in the Mongo state database; the SQLite backend has none
+        has_db = self.state_store.db is not None
+        self.journal = overrides["journal"] or (IngestionJournal(self.state_store.db) if JOURNAL_ENABLED and has_db else None)
+        if JOURNAL_ENABLED and self.journal is None:
+            print(f"Ingestion journal off: the {self.state_store.name} state backend has no database for it")
+        elif self.journal is not None:
+            print(f"Ingestion journal on: artifacts under {self.journal.artifact_dir} (resumes only if it is a persistent volume)")
+        if LEASES_ENABLED and not has_db and overrides["leases"] is None:
+            raise ValueError(f"Document leases need the mongo state backend, not {self.state_store.name}")
+        # Set when several workers share the bucket: each document is processed under a lease
+        self.leases = overrides["leases"] or (DocumentLeaseStore(self.state_store.db) if LEASES_ENABLED else None)
+        self._services_ready = True
+
+    def run(self, job: IngestionJob):
+        self._ensure_services()
+        # A rebuild is a reindex whose documents come from the parsed text store where possible
+        reindex_mode = job.mode in ("reindex", "rebuild")
+        self._rebuilding = job.mode == "rebuild" and self.parsed_store is not None
+        self.tracer.start_trace(job.job_id)
+        self._timings = DocumentTimings()
+        # A reindex builds a fresh collection, so there is nothing to resume into
+        self._journaling = self.journal is not None and not reindex_mode
+        # A reindex loads a staging collection only this process knows about, so it runs alone
+        self._leasing = self.leases is not None and not reindex_mode
+        self.state_store.reset_stats()
+        # Marked before this run: already out of the saved manifest, so discover lists them as added
+        self._stale_dependents = set()
+
+        with self._stage(STAGE_DISCOVER, mode=job.mode):
+            objects, diff = self._discover(job, reindex_mode)
+        documents = [self.r2_client.build_pdf_document(obj) for obj in diff.changed_objects]
+
+        reindexer = None
+        target_store = self.vector_store
+        if reindex_mode:
+            print(f"\nFull {job.mode} requested: bulk-loading into a new collection")
+            reindexer = BlueGreenReindexer(self.vector_store.client)
+            target_store = reindexer.create_staging()
+            if self.text_store is not None:
+                # Staging chunk_ids are the live points' ids, so their texts must not overwrite the served ones
+                self._staging_texts = self.text_store.staging()
+            # Canonical chunks must live in the collection being built
+            self.deduplicator.reset()
+            if self.sparse_encoder is not None:
+                self.sparse_encoder.reset()
+
+        with self._stage(STAGE_RECONCILE):
+            self._reconcile(job, diff.current_keys)
+
+        try:
+            failed_doc_ids = self._process_documents(job, documents, reindexer, target_store)
+        finally:
+            # Completion markers must be stored before the manifest stops these documents being re-decided
+            unflushed = self._flush_state()
+            self._report_state_store(job)
+
+        if not MANIFEST_ENABLED:
+            return
+        if reindexer is not None and not reindexer.published:
+            # Objects changed since the last incremental sync went only into the dropped staging
+            # collection; the previous manifest keeps them changed for the next run
+            print("Manifest not updated: the reindex was not published")
+            return
+        # Failed documents are left out so the next run sees them as new and retries them
+        self.manifest.save(objects, exclude_keys=failed_doc_ids | unflushed | self._stale_dependents)
+
+    def ingest_document(self, object_key: str, file_bytes: Optional[bytes] = None, on_event=None) -> DocumentOutcome:
+        """Fast path for one document outside a sync: parse → chunk → embed → upsert straight away.
+
+        With file_bytes the PDF is first put in R2 under object_key, so later syncs find it
+        already ingested instead of reconciling its points away; without, object_key is read
+        from R2. on_event(event, data) gets a "stage" event as each stage finishes and one
+        "done" event. The dedup index and BM25 vocabulary are saved by the next sync.
+        """
+        emit = on_event or (lambda event, data: None)
+        self._ensure_services()
+        doc_id = object_key
+        start = time.perf_counter()
+
+        def done(outcome: DocumentOutcome, **extra) -> DocumentOutcome:
+            metrics.documents.inc(outcome="ingested" if outcome.success else f"failed_{outcome.stage}")
+            emit("done", {
+                "doc_id": doc_id,
+                "success": outcome.success,
+                "stage": outcome.stage,
+                "error": outcome.error,
+                "seconds": round(time.perf_counter() - start, 4),
+                **extra,
+            })
+            return outcome
+
+        if self._listeners.setdefault(doc_id, emit) is not emit:
+            return done(DocumentOutcome(doc_id, False, STAGE_FETCH, "Document is already being ingested"))
+        claimed = False
+        failed_stage = STAGE_FETCH
+        try:
+            with self._stage(STAGE_FETCH, doc_id, uploaded=file_bytes is not None) as span:
+                if file_bytes is not None:
+                    obj = self.r2_client.upload_pdf(object_key, file_bytes)
+                else:
+                    obj = self.r2_client.head_pdf(object_key)
+                    file_bytes = self.r2_client.download_pdf(object_key)
+                span.set_attribute("bytes", len(file_bytes))
+            doc_meta = self.r2_client.build_pdf_document(obj)
+            checksum = compute_file_checksum(file_bytes)
+
+            state = self.state_store.get(doc_id)
+            if state and state.upsert_completed and state.checksum == checksum:
+                if state.etag != doc_meta.etag:
+                    self.state_store.update_etag_only(doc_id, doc_meta.etag)
+                return done(DocumentOutcome(doc_id, True, STAGE_EMBED_UPSERT), unchanged=True)
+
+            if self.leases is not None:
+                claimed = self.leases.claim(doc_id)
+                if not claimed:
+                    return done(DocumentOutcome(doc_id, False, STAGE_FETCH, "Document is being ingested by another worker"))
+
+            job = IngestionJob(trigger="api", mode="document")
+            job.mark_running()
+            for stage in (STAGE_CHUNK, STAGE_EMBED_UPSERT):
+                job.start_stage(stage, total=1)
+            reservation = Reservation(MemoryBudget())
+            failed_stage = STAGE_EMBED_UPSERT
+            try:
+                with self._document_lock, self.tracer.span("document", doc_id=doc_id, bytes=len(file_bytes), trigger="api"):
+                    outcome = self._process_document(
+                        job, doc_meta, file_bytes, checksum, self.vector_store, False, reservation
+                    )
+            finally:
+                reservation.free()
+            return done(outcome)
+        except Exception as e:
+            return done(DocumentOutcome(doc_id, False, failed_stage, str(e)))
+        finally:
+            self._flush_state()
+            if claimed:
+                self.leases.release(doc_id)
+            self._listeners.pop(doc_id, None)
+
+    def _discover(self, job: IngestionJob, reindex_mode: bool) -> tuple[list[dict], ListingDiff]:
+        job.start_stage(STAGE_DISCOVER)
+        list_start = time.perf_counter()
+        try:
+            objects = list(self.r2_client.filter_pdf_objects(self.r2_client.list_objects_parallel()))
+        except Exception as e:
+            raise RuntimeError(f"Failed to list R2 objects: {e}") from e
+        list_seconds = time.perf_counter() - list_start
+
+        # A reindex rebuilds everything, so it diffs against an empty manifest
+        previous = self.manifest.load() if MANIFEST_ENABLED and not reindex_mode else {}
+        diff = R2Manifest.diff(objects, previous)
+
+        print(f"Discovered {len(objects)} PDF documents in bucket {self.r2_client.bucket_name} ({list_seconds:.2f}s)")
+        print(
+            f"Manifest diff: {len(diff.added)} added, {len(diff.changed)} changed, "
+            f"{len(diff.removed)} removed, {diff.unchanged} unchanged"
+        )
+
+        total_size_mb = sum(obj["Size"] for obj in objects) / (1024 * 1024)
+        print(f"Total size: {total_size_mb:.2f} MB")
+
+        domains = {}
+        for obj in objects:
+            domain = self.r2_client.extract_domain(obj["Key"])
+            domains[domain] = domains.get(domain, 0) + 1
+
+        print(f"Domains: {dict(sorted(domains.items()))}")
+
+        job.advance(STAGE_DISCOVER, completed=len(objects))
+        job.summary.update({
+            "listed": len(objects),
+            "list_seconds": round(list_seconds, 3),
+            "added": len(diff.added),
+            "changed": len(diff.changed),
+            "removed": len(diff.removed),
+            "unchanged": diff.unchanged,
+        })
+        job.finish_stage(STAGE_DISCOVER)
+        return (objects, diff)
+
+    def _process_documents(self, job: IngestionJob, documents, reindexer, target_store) -> set[str]:
+        """Decide, then stream each document through fetch → parse → chunk → embed → upsert.
+
+        Returns the doc_ids that failed or were left to other workers.
+        """
+        reindex_mode = reindexer is not None
+        with self._stage(STAGE_DECIDE, documents=len(documents)):
+            download_candidates, checksums_to_mark, resume_entries = self._decide(job, documents, reindex_mode)
+        self._flush_state()
+
+        if not download_candidates:
+            print("\nNo PDFs to download (all skipped)")
+            if reindexer:
+                self._abandon_reindex(reindexer)
+            else:
+                # Deleted documents may have left the dedup index
+                self._save_indexes()
+            return set()
+
+        outcomes, reindexed_records, leased_elsewhere = self._stream_documents(
+            job, documents, download_candidates, checksums_to_mark, resume_entries, target_store, reindex_mode
+        )
+        failed = [o for o in outcomes if not o.success]
+        successful_upserts = len(outcomes) - len(failed)
+
+        if reindexer:
+            if successful_upserts == 0:
+                print("\nNo documents were loaded; dropping the staging collection")
+                self._abandon_reindex(reindexer)
+            else:
+                self._publish_reindex(job, reindexer, reindexed_records, len(failed))
+
+        failures_by_stage = {}
+        for outcome in failed:
+            failures_by_stage[outcome.stage] = failures_by_stage.get(outcome.stage, 0) + 1
+
+        job.summary.update({
+            "candidates": len(download_candidates),
+            "failed_downloads": failures_by_stage.get(STAGE_FETCH, 0),
+            "parse_failures": failures_by_stage.get(STAGE_CHUNK, 0),
+            "successful_upserts": successful_upserts,
+            "failed_upserts": failures_by_stage.get(STAGE_EMBED_UPSERT, 0),
+        })
+
+        print(f"\n=== Ingestion Complete ===")
+        print(f"Successful: {successful_upserts}/{len(outcomes)} documents")
+        if failed:
+            print(f"Failed: {len(failed)} documents")
+            for outcome in failed:
+                print(f"  - {outcome.doc_id} [{outcome.stage}]: {outcome.error}")
+
+        job.summary["slowest_documents"] = self._timings.print_summary()
+
+        # Left out of this worker's manifest so its next run re-decides them from shared state
+        return {o.doc_id for o in failed} | leased_elsewhere
+
+    def _reconcile(self, job: IngestionJob, current_doc_ids: set[str]):
+        job.start_stage(STAGE_RECONCILE)
+        deleted_count, deletion_error = self.deletion_reconciler.reconcile_deletions(current_doc_ids)
+
+        if deletion_error:
+            print(f"Warning: Deletion reconciliation failed: {deletion_error}")
+            job.advance(STAGE_RECONCILE, completed=0, failed=1)
+        elif deleted_count > 0:
+            print(f"Deleted {deleted_count} stale point(s) from vector store")
+            job.advance(STAGE_RECONCILE, completed=deleted_count)
+        else:
+            print("No deletions needed")
+        job.finish_stage(STAGE_RECONCILE)
+
+    def _decide(self, job: IngestionJob, documents, reindex_mode: bool):
+        job.start_stage(STAGE_DECIDE, total=len(documents))
+        print("\nProcessing decisions:")
+        ingest_count = 0
+        skip_count = 0
+        reingest_count = 0
+        download_candidates = []
+
+        # Store checksums for later marking
+        checksums_to_mark = {}
+
+        known_states = self.decision_engine.preload_states()
+        print(f"Loaded {known_states} document state(s) from MongoDB")
+
+        journal_entries = self.journal.load_all() if self._journaling else {}
+        resume_entries = {}
+        if journal_entries:
+            print(f"Found {len(journal_entries)} journaled document(s) from an interrupted run")
+
+        for doc in documents:
+            entry = journal_entries.get(doc.doc_id)
+            resumed = None
+            if entry and entry.etag == doc.etag:
+                # The journaled checksum stands in for the decide-time download
+                resumed = self.decision_engine.decide_resumed(doc, entry.checksum)
+
+            if reindex_mode:
+                # Checksum is taken from the downloaded bytes instead of a second download; a
+                # rebuild uses the one state recorded, which keys the document's parsed text
+                checksum = self.decision_engine.known_checksum(doc) if self._rebuilding else None
+                decision = IngestionDecision.REINGEST
+            elif resumed:
+                decision, checksum = resumed
+                resume_entries[doc.doc_id] = entry
+            else:
+                if entry:
+                    # Object changed since the entry was written, or the upsert finished after all
+                    self.journal.clear(doc.doc_id)
+                decision, checksum = self.decision_engine.decide(doc)
+
+            if decision == IngestionDecision.INGEST:
+                print(f"  INGEST   {doc.object_key}")
+                download_candidates.append((doc.doc_id, doc.object_key))
+                checksums_to_mark[doc.doc_id] = (doc, checksum)
+                ingest_count += 1
+            elif decision == IngestionDecision.SKIP:
+                print(f"  SKIP     {doc.object_key} (etag unchanged)")
+                skip_count += 1
+            elif decision == IngestionDecision.REINGEST:
+                if doc.doc_id in resume_entries:
+                    reason = f"resuming from {entry.stage}"
+                elif reindex_mode:
+                    reason = job.mode
+                else:
+                    reason = "checksum changed or incomplete upload"
+                print(f"  REINGEST {doc.object_key} ({reason})")
+                download_candidates.append((doc.doc_id, doc.object_key))
+                checksums_to_mark[doc.doc_id] = (doc, checksum)
+                reingest_count += 1
+            job.advance(STAGE_DECIDE)
+
+        etag_updates = self.decision_engine.flush_etag_updates()
+        if etag_updates:
+            print(f"Updated etag for {etag_updates} unchanged document(s)")
+
+        print(f"\nSummary: {ingest_count} INGEST, {skip_count} SKIP, {reingest_count} REINGEST")
+        job.summary.update({"ingest": ingest_count, "skip": skip_count, "reingest": reingest_count})
+        job.finish_stage(STAGE_DECIDE)
+
+        return (download_candidates, checksums_to_mark, resume_entries)
+
+    def _stream_documents(self, job: IngestionJob, documents, download_candidates, checksums_to_mark, resume_entries, target_store, reindex_mode: bool):
+        """Process downloads as they arrive, holding at most INGESTION_MEMORY_BUDGET_MB in flight.
+
+        Documents with a journal checkpoint go first and skip the download, as do documents
+        a rebuild finds in the parsed text store. With leases,
+        each document is claimed right before its download and released once done;
+        documents another worker holds are skipped, then retried once at the end in
+        case their lease expired (the worker died) or was released without finishing.
+        """
+        total = len(download_candidates)
+        for stage in (STAGE_FETCH, STAGE_CHUNK, STAGE_EMBED_UPSERT):
+            job.start_stage(stage, total=total)
+
+        documents_map = {doc.doc_id: doc for doc in documents}
+        sizes = {doc.object_key: doc.size for doc in documents}
+        etags = {doc.object_key: doc.etag for doc in documents}
+        budget = MemoryBudget()
+        self.deduplicator.reset_stats()
+        self.parser.reset_stats()
+        self._resume_stats = {
+            "documents": 0,
+            "by_stage": {},
+            "downloads_avoided": 0,
+            "parses_avoided": 0,
+            "embeddings_avoided": 0,
+            "batches_skipped": 0,
+        }
+        outcomes = []
+        reindexed_records = []
+        leased_elsewhere = set()
+        from_parsed_text = 0
+        doc_num = 0
+
+        def finish(outcome: DocumentOutcome, doc_meta, checksum: str):
+            metrics.documents.inc(outcome="ingested" if outcome.success else f"failed_{outcome.stage}")
+            outcomes.append(outcome)
+            if outcome.success and reindex_mode:
+                reindexed_records.append((doc_meta.doc_id, doc_meta.etag, checksum))
+            self._release(doc_meta.doc_id)
+
+        def claim(doc_id: str) -> bool:
+            if not self._leasing:
+                return True
+            if self._claim(documents_map[doc_id]):
+                leased_elsewhere.discard(doc_id)
+                return True
+            leased_elsewhere.add(doc_id)
+            return False
+
+        if self._leasing:
+            # Download threads wait here rather than claim documents this worker will not reach soon
+            self._claim_slots = threading.BoundedSemaphore(CLAIM_AHEAD)
+            self.leases.start_heartbeat()
+            # Workers walk the candidates in different orders so they rarely race for one
+            download_candidates = list(download_candidates)
+            random.Random(self.leases.worker_id).shuffle(download_candidates)
+
+        try:
+            to_download = []
+            for doc_id, object_key in download_candidates:
+                entry = resume_entries.get(doc_id)
+                if entry:
+                    checksum = entry.checksum
+                    checkpoint = self.journal.load_checkpoint(entry)
+                else:
+                    _, checksum = checksums_to_mark[doc_id]
+                    checkpoint = self._load_parsed(doc_id, checksum)
+                if checkpoint is None:
+                    to_download.append((doc_id, object_key))
+                    continue
+                if not claim(doc_id):
+                    continue
+
+                doc_num += 1
+                if entry:
+                    print(f"\n[{doc_num}/{total}] Resuming {doc_id} from {entry.stage}...")
+                    self._count_resume(checkpoint)
+                else:
+                    print(f"\n[{doc_num}/{total}] Rebuilding {doc_id} from parsed text...")
+                    from_parsed_text += 1
+                job.advance(STAGE_FETCH)
+                doc_meta = documents_map[doc_id]
+                reservation = Reservation(budget)
+                try:
+                    with self._document_lock, self.tracer.span("document", doc_id=doc_id, resumed_from=checkpoint.stage):
+                        outcome = self._process_document(
+                            job, doc_meta, None, checksum, target_store, reindex_mode, reservation,
+                            checkpoint=checkpoint
+                        )
+                    del checkpoint
+                except Exception as e:
+                    outcome = self._document_failed(job, doc_id, e)
+                finally:
+                    reservation.free()
+                finish(outcome, doc_meta, checksum)
+
+            if to_download:
+                print(
+                    f"\nDownloading {len(to_download)} PDFs with adaptive concurrency ({MIN_CONCURRENT_DOWNLOADS}-{MAX_CONCURRENT_DOWNLOADS}), "
+                    f"memory budget {budget.max_bytes / (1024 * 1024):.0f} MB..."
+                )
+            fetcher = PdfFetcher(self.r2_client)
+
+            def process_downloads(candidates):
+                nonlocal doc_num
+                for result in fetcher.iter_pdfs(
+                    candidates, budget, sizes=sizes, spill_dir=data_path("spill"), claim=claim, etags=etags
+                ):
+                    if result.skipped:
+                        continue
+                    doc_num += 1
+                    print(f"\n[{doc_num}/{total}] Processing {result.doc_id}...")
+                    self._timings.add(result.doc_id, STAGE_FETCH, result.latency_seconds)
+
+                    if not result.success:
+                        print(f"  FAILED_DOWNLOAD: {result.doc_id} - {result.error}")
+                        job.advance(STAGE_FETCH, completed=0, failed=1)
+                        metrics.documents.inc(outcome=f"failed_{STAGE_FETCH}")
+                        outcomes.append(DocumentOutcome(result.doc_id, False, STAGE_FETCH, result.error))
+                        self._release(result.doc_id)
+                        continue
+                    job.advance(STAGE_FETCH)
+
+                    doc_meta = documents_map[result.doc_id]
+                    _, checksum = checksums_to_mark[result.doc_id]
+                    reservation = Reservation(budget, held=0 if result.spill_path else result.size_bytes)
+                    try:
+                        if result.spill_path:
+                            reservation.resize(result.size_bytes)
+                        file_bytes = fetcher.load_bytes(result)
+                        result.file_bytes = None
+                        if checksum is None:
+                            checksum = compute_file_checksum(file_bytes)
+
+                        with self._document_lock, self.tracer.span("document", doc_id=result.doc_id, bytes=result.size_bytes):
+                            outcome = self._process_document(
+                                job, doc_meta, file_bytes, checksum, target_store, reindex_mode, reservation
+                            )
+                        del file_bytes
+                    except Exception as e:
+                        outcome = self._document_failed(job, result.doc_id, e)
+                    finally:
+                        reservation.free()
+                    finish(outcome, doc_meta, checksum)
+
+            process_downloads(to_download)
+            if leased_elsewhere:
+                stragglers = [(doc_id, key) for doc_id, key in to_download if doc_id in leased_elsewhere]
+                print(f"\nRetrying {len(stragglers)} document(s) leased by other workers")
+                process_downloads(stragglers)
+        finally:
+            if self._leasing:
+                self.leases.stop_heartbeat()
+
+        for stage in (STAGE_FETCH, STAGE_CHUNK, STAGE_EMBED_UPSERT):
+            job.finish_stage(stage)
+
+        if self.deduplicator.enabled:
+            print(
+                f"\nDedup: {self.deduplicator.embeddings_saved} embedding(s) saved, "
+                f"{self.deduplicator.points_avoided} point(s) avoided, index holds {len(self.deduplicator.index)} chunk(s)"
+            )
+            job.summary.update({
+                "embeddings_saved": self.deduplicator.embeddings_saved,
+                "points_avoided": self.deduplicator.points_avoided,
+            })
+
+        parse_summary = self.parser.summary()
+        if any(stats["documents"] or stats["failures"] for stats in parse_summary.values()):
+            print("\nPDF extraction by backend:")
+            for name, stats in parse_summary.items():
+                print(
+                    f"  {name:<10} {stats['documents']} document(s), {stats['pages']} pages in {stats['seconds']:.2f}s "
+                    f"({stats['pages_per_second']:.1f} pages/s), {stats['failures']} failure(s)"
+                )
+        job.summary["parse_backends"] = parse_summary
+
+        if not reindex_mode:
+            self._save_indexes()
+        if self.sparse_encoder is not None and len(self.sparse_encoder):
+            print(
+                f"BM25 vocabulary: {len(self.sparse_encoder)} term(s) over {self.sparse_encoder.doc_count} chunk(s), "
+                f"avg {self.sparse_encoder.avg_doc_length:.1f} terms/chunk"
+            )
+
+        resumed = self._resume_stats
+        if resumed["documents"]:
+            by_stage = ", ".join(f"{count} from {stage}" for stage, count in resumed["by_stage"].items())
+            print(
+                f"\nResumed {resumed['documents']} document(s) from the journal ({by_stage}): "
+                f"{resumed['downloads_avoided']} download(s), {resumed['parses_avoided']} parse(s), "
+                f"{resumed['embeddings_avoided']} embedding(s) and {resumed['batches_skipped']} upsert batch(es) not redone"
+            )
+        job.summary["resumed"] = resumed
+
+        if self._rebuilding:
+            print(f"\nRebuilt {from_parsed_text}/{total} document(s) from parsed text; {total - from_parsed_text} fetched and parsed")
+            job.summary["from_parsed_text"] = from_parsed_text
+
+        if self._leasing:
+            print(f"\nWorker {self.leases.worker_id} left {len(leased_elsewhere)} document(s) to other workers")
+            job.summary.update({"worker_id": self.leases.worker_id, "leased_elsewhere": len(leased_elsewhere)})
+
+        print(f"\nPeak in-flight memory: {budget.peak / (1024 * 1024):.1f} MB of {budget.max_bytes / (1024 * 1024):.0f} MB budget")
+        job.summary["peak_budget_mb"] = round(budget.peak / (1024 * 1024), 1)
+        return (outcomes, reindexed_records, leased_elsewhere)
+
+    @staticmethod
+    def _document_failed(job: IngestionJob, doc_id: str, error: Exception) -> DocumentOutcome:
+        """An unexpected error in one document fails that document, not the sync."""
+        print(f"  FAILED: {doc_id} - {error}")
+        job.advance(STAGE_EMBED_UPSERT, completed=0, failed=1)
+        return DocumentOutcome(doc_id, False, STAGE_EMBED_UPSERT, str(error))
+
+    def _claim(self, doc_meta) -> bool:
+        """Lease a document for this worker; False if another worker holds it or finished it after decide.
+
+        Blocks while CLAIM_AHEAD claimed documents are still unfinished. A lease or state
+        error also returns False: it runs on a download thread, where raising would end
+        the sync, and the document is left to another worker (or this one's retry).
+        """
+        self._claim_slots.acquire()
+        claimed = False
+        try:
+            claimed = self.leases.claim(doc_meta.doc_id)
+            if claimed:
+                state = self.state_store.get(doc_meta.doc_id)
+                if not (state and state.upsert_completed and state.etag == doc_meta.etag):
+                    return True
+        except Exception as e:
+            print(f"  Warning: could not claim {doc_meta.doc_id}: {e} (leaving it to another worker)")
+        self._claim_slots.release()
+        if claimed:
+            try:
+                self.leases.release(doc_meta.doc_id)
+            except Exception as e:
+                print(f"  Warning: could not release lease on {doc_meta.doc_id}: {e}")
+        return False
+
+    def _release(self, doc_id: str):
+        if not self._leasing:
+            return
+        # The next worker to claim the document must see it as complete
+        self._flush_state()
+        self._claim_slots.release()
+        try:
+            self.leases.release(doc_id)
+        except Exception as e:
+            # The lease expires on its own once the heartbeat stops
+            print(f"  Warning: could not release lease on {doc_id}: {e}")
+
+    def _flush_state(self) -> set[str]:
+        """Write the state store's deferred writes; returns the doc_ids still pending if that failed."""
+        try:
+            self.state_store.flush()
+            return set()
+        except Exception as e:
+            unflushed = self.state_store.pending_doc_ids()
+            print(f"Warning: could not write deferred state for {len(unflushed)} document(s): {e}")
+            return unflushed
+
+    def _report_state_store(self, job: IngestionJob):
+        stats = self.state_store.stats()
+        mode = "write-behind" if stats["write_behind"] else "write-through"
+        print(
+            f"\nState store ({stats['backend']}, {mode}): {stats['calls']} call(s) in {stats['seconds']:.2f}s, "
+            f"{stats['deferred_writes']} write(s) deferred into {stats['flushes']} flush(es)"
+        )
+        job.summary["state_store"] = stats
+
+    def _load_parsed(self, doc_id: str, checksum: Optional[str]) -> Optional[Checkpoint]:
+        """A parsed checkpoint from the parsed text store when rebuilding; None means fetch and parse."""
+        if not self._rebuilding or not checksum:
+            return None
+        pages = self.parsed_store.get(checksum, doc_id)
+        return Checkpoint(STAGE_PARSED, pages=pages) if pages else None
+
+    def _store_parsed(self, doc_id: str, checksum: str, pages):
+        """Keep the parser output for later rebuilds; a failure here never fails the document."""
+        if self.parsed_store is None:
+            return
+        try:
+            with self._stage("store_parsed", doc_id, pages=len(pages)):
+                self.parsed_store.put(checksum, pages, backend=self.parser.last_backend)
+        except Exception as e:
+            print(f"  Warning: could not store parsed text for {doc_id}: {e}")
+
+    def _checkpoint(self, doc_meta, checksum: str, checkpoint: Checkpoint):
+        """Journal a completed stage; a journal failure only costs resumability, never the document."""
+        if not self._journaling:
+            return
+        try:
+            self.journal.checkpoint(doc_meta.doc_id, doc_meta.etag, checksum, checkpoint)
+        except Exception as e:
+            print(f"  Warning: could not journal {checkpoint.stage} for {doc_meta.doc_id}: {e}")
+
+    def _journal_call(self, method: str, *args):
+        if not self._journaling:
+            return
+        try:
+            getattr(self.journal, method)(*args)
+        except Exception as e:
+            print(f"  Warning: journal {method} failed: {e}")
+
+    def _count_resume(self, checkpoint: Checkpoint):
+        stats = self._resume_stats
+        stats["documents"] += 1
+        stats["by_stage"][checkpoint.stage] = stats["by_stage"].get(checkpoint.stage, 0) + 1
+        stats["downloads_avoided"] += 1
+        stats["parses_avoided"] += 1
+        if checkpoint.chunk_data is not None:
+            stats["embeddings_avoided"] += len(checkpoint.chunk_data)
+        stats["batches_skipped"] += len(checkpoint.upserted_batches)
+
+    def _process_document(self, job: IngestionJob, doc_meta, file_bytes: Optional[bytes], checksum: str, target_store, reindex_mode: bool, reservation: Reservation, checkpoint: Optional[Checkpoint] = None) -> DocumentOutcome:
+        """parse → chunk → embed → upsert one document; memory is charged to reservation.
+
+        A journal (or parsed text) checkpoint skips the stages it already covers, and
+        file_bytes is then None.
+        """
+        doc_id = doc_meta.doc_id
+        reached = JOURNAL_STAGE_ORDER.index(checkpoint.stage) if checkpoint else -1
+        pages = checkpoint.pages if checkpoint else None
+        text_chunks = checkpoint.text_chunks if checkpoint else None
+        chunk_data = checkpoint.chunk_data if checkpoint else None
+        held_bytes = len(file_bytes) if file_bytes else 0
+
+        if checkpoint is None:
+            with self._stage("parse", doc_id) as span:
+                pages, failure_reason = self.parser.parse(doc_id, file_bytes)
+                span.set_attribute("pages", len(pages) if pages else 0)
+                span.set_attribute("backend", self.parser.last_backend)
+
+            if failure_reason:
+                print(f"  {failure_reason}: {doc_id}")
+                # Parsing the same bytes again would fail the same way
+                self._journal_call("clear", doc_id)
+                job.advance(STAGE_CHUNK, completed=0, failed=1)
+                return DocumentOutcome(doc_id, False, STAGE_CHUNK, str(failure_reason.value))
+
+            metrics.pages_parsed.inc(len(pages))
+            print(f"  Parsed {doc_id} with {self.parser.last_backend}: {len(pages)} pages with text")
+            self._store_parsed(doc_id, checksum, pages)
+            self._checkpoint(doc_meta, checksum, Checkpoint(STAGE_PARSED, pages=pages))
+
+        if reached < JOURNAL_STAGE_ORDER.index(STAGE_CHUNKED):
+            # file_bytes stays referenced by the caller until this returns
+            reservation.resize(held_bytes + sum(len(page.text) for page in pages))
+
+            with self._stage("chunk", doc_id) as span:
+                text_chunks = self.enricher.enrich_batch(
+                    self.chunker.chunk_batch(pages),
+                    pages,
+                    domain=doc_meta.domain,
+                    doc_type="unknown"
+                )
+                span.set_attribute("chunks", len(text_chunks))
+            print(f"  Processed {doc_id}: {len(pages)} pages → {len(text_chunks)} chunks")
+            self._checkpoint(doc_meta, checksum, Checkpoint(STAGE_CHUNKED, text_chunks=text_chunks))
+        del pages
+        job.advance(STAGE_CHUNK)
+
+        # Step 1: Generate embeddings, reusing vectors of near-duplicate chunks
+        plan = None
+        store = target_store if reindex_mode else self.vector_store
+        if reached < JOURNAL_STAGE_ORDER.index(STAGE_EMBEDDED):
+            chunk_bytes = text_chunks.text_chars() + len(text_chunks) * CHUNK_OVERHEAD_BYTES
+            reservation.resize(held_bytes + chunk_bytes)
+            with self._stage("dedup", doc_id) as span:
+                plan = self.deduplicator.plan(doc_id, doc_meta.domain, text_chunks)
+                span.set_attribute("duplicates", plan.duplicates)
+            with self._stage("embed", doc_id):
+                kept_chunks = self._embed_chunks(text_chunks, plan, store)
+            reservation.resize(held_bytes + chunk_bytes + len(kept_chunks) * VECTOR_BYTES_PER_CHUNK)
+            # Collections created before sparse vectors existed stay dense-only until a reindex
+            sparse_encoder = self.sparse_encoder if store.sparse_vector_name else None
+            with self._stage("sparse", doc_id):
+                chunk_data = self._build_chunk_data(kept_chunks, sparse_encoder, compact=self.text_store is not None)
+            del kept_chunks
+
+            if not chunk_data:
+                print(f"  ✗ Skipping upsert: all embeddings failed")
+                job.advance(STAGE_EMBED_UPSERT, completed=0, failed=1)
+                return DocumentOutcome(doc_id, False, STAGE_EMBED_UPSERT, "All embeddings failed")
+            self._checkpoint(doc_meta, checksum, Checkpoint(STAGE_EMBEDDED, chunk_data=chunk_data))
+        else:
+            reservation.resize(len(chunk_data) * (VECTOR_BYTES_PER_CHUNK + CHUNK_OVERHEAD_BYTES))
+
+        if reindex_mode:
+            # Fresh collection: nothing to delete; state is written after the alias swap
+            with self._stage("upsert", doc_id, points=len(chunk_data)):
+                upsert_success, upsert_error = self._store_texts(doc_id, chunk_data, replace=False, text_store=self._staging_texts)
+                if upsert_success:
+                    upsert_success, upsert_error = target_store.upsert_chunks(chunk_data)
+            if upsert_success:
+                metrics.points_upserted.inc(len(chunk_data))
+                self._mark_dependents_stale(self.deduplicator.commit(plan, text_chunks, self._content_hashes(chunk_data)))
+                print(f"  ✓ Bulk-loaded {len(chunk_data)} chunks")
+                job.advance(STAGE_EMBED_UPSERT)
+                return DocumentOutcome(doc_id, True, STAGE_EMBED_UPSERT)
+            print(f"  ✗ Upsert failed: {upsert_error}")
+            job.advance(STAGE_EMBED_UPSERT, completed=0, failed=1)
+            return DocumentOutcome(doc_id, False, STAGE_EMBED_UPSERT, upsert_error)
+
+        versioned = WRITE_STRATEGY == "versioned"
+        skip_batches = checkpoint.upserted_batches if reached == JOURNAL_STAGE_ORDER.index(STAGE_UPSERTING) else set()
+        on_batch_done = (lambda batch_num: self._journal_call("mark_batch", doc_id, batch_num)) if self._journaling else None
+
+        with self._stage("upsert", doc_id, points=len(chunk_data)) as span:
+            points, unchanged, version = chunk_data, set(), None
+            if versioned:
+                # chunk_ids are deterministic, so new points overwrite old ones in place and
+                # only chunks whose content changed need writing; points a crashed run already
+                # wrote count as unchanged, which makes journaled batch numbers moot here
+                points, unchanged, version = self._versioned_points(chunk_data)
+                skip_batches = set()
+                span.set_attribute("unchanged", len(unchanged))
+
+            if reached < JOURNAL_STAGE_ORDER.index(STAGE_UPSERTING):
+                if not versioned:
+                    # Step 2: Delete existing chunks (clean slate)
+                    print(f"  Deleting existing chunks for {doc_id}...")
+                    del_success, del_error = self.vector_store.delete_by_doc_id(doc_id)
+                    if not del_success:
+                        print(f"  Warning: deletion failed: {del_error} (continuing anyway)")
+
+                # Texts go in before the points that reference them become searchable
+                texts_stored, texts_error = self._store_texts(doc_id, points, replace=not versioned)
+                if not texts_stored:
+                    print(f"  ✗ Upsert failed: {texts_error}")
+                    job.advance(STAGE_EMBED_UPSERT, completed=0, failed=1)
+                    return DocumentOutcome(doc_id, False, STAGE_EMBED_UPSERT, texts_error)
+
+                # Step 3: Mark as ingested (but not complete) before upload
+                self.decision_engine.mark_ingested(doc_meta, checksum)
+                self._journal_call("mark_upserting", doc_id)
+
+            # Step 4: Upsert all chunks in batches, skipping batches a previous run finished
+            upsert_success, upsert_error = self.vector_store.upsert_chunks(
+                points, skip_batches=skip_batches, on_batch_done=on_batch_done
+            )
+
+            if upsert_success and versioned:
+                # Step 4b: Drop the document's points from earlier versions that were not rewritten
+                upsert_success, upsert_error = self._sweep_stale(doc_id, chunk_data, version, unchanged)
+
+        if upsert_success:
+            metrics.points_upserted.inc(len(points))
+            metrics.points_unchanged.inc(len(unchanged))
+            # Step 5: Mark as complete in state (atomic operation)
+            self.state_store.mark_upsert_complete(doc_id)
+            self._journal_call("clear", doc_id)
+            if plan is not None:
+                self._mark_dependents_stale(self.deduplicator.commit(plan, text_chunks, self._content_hashes(chunk_data)))
+            print(f"  ✓ Successfully upserted {len(chunk_data)} chunks")
+            job.advance(STAGE_EMBED_UPSERT)
+            return DocumentOutcome(doc_id, True, STAGE_EMBED_UPSERT)
+
+        print(f"  ✗ Upsert failed: {upsert_error}")
+        job.advance(STAGE_EMBED_UPSERT, completed=0, failed=1)
+        return DocumentOutcome(doc_id, False, STAGE_EMBED_UPSERT, upsert_error)
+
+    def _versioned_points(self, chunk_data: list[dict]) -> tuple[list[dict], set[str], int]:
+        """(points to write, tagged with a new version; chunk_ids already stored unchanged; the version)."""
+        version = time.time_ns() // 1_000_000
+        try:
+            unchanged = self.vector_store.unchanged_chunk_ids(chunk_data)
+        except Exception as e:
+            print(f"  Warning: could not compare with stored points: {e} (rewriting all)")
+            unchanged = set()
+        points = [
+            {**item, "payload": {**item["payload"], VERSION_FIELD: version}}
+            for item in chunk_data
+            if item["chunk_id"] not in unchanged
+        ]
+        if unchanged:
+            print(f"  {len(unchanged)}/{len(chunk_data)} chunk(s) unchanged; writing {len(points)}")
+        return (points, unchanged, version)
+
+    def _sweep_stale(self, doc_id: str, chunk_data: list[dict], version: int, unchanged: set[str]) -> tuple[bool, Optional[str]]:
+        swept, sweep_error = self.vector_store.delete_stale_points(doc_id, version, keep_ids=unchanged)
+        if not swept:
+            # The old points are still there, so the document is not done
+            return (False, f"Stale point sweep failed: {sweep_error}")
+        if self.text_store is not None:
+            try:
+                self.text_store.delete_stale(doc_id, {item["chunk_id"] for item in chunk_data})
+            except Exception as e:
+                print(f"  Warning: could not drop stale chunk texts: {e}")
+        return (True, None)
+
+    def _store_texts(self, doc_id: str, chunk_data: list[dict], replace: bool, text_store=None) -> tuple[bool, Optional[str]]:
+        """Write compact points' texts to the chunk text store (or text_store); replace drops the document's old texts first."""
+        text_store = text_store or self.text_store
+        if text_store is None:
+            return (True, None)
+        items = [(item["chunk_id"], doc_id, item["text"]) for item in chunk_data if "text" in item]
+        try:
+            with self._stage("store_texts", doc_id, chunks=len(items)):
+                if replace:
+                    text_store.delete_by_doc_ids([doc_id])
+                text_store.put_many(items)
+            return (True, None)
+        except Exception as e:
+            return (False, f"Chunk text store write failed: {e}")
+
+    @staticmethod
+    def _build_chunk_data(chunks: ChunkBatch, sparse_encoder: Optional[Bm25Encoder] = None, compact: bool = False) -> list[dict]:
+        """Points for upsert_chunks from an embedded batch; compact ones carry their text beside the payload for the chunk text store."""
+        r2_public_domain = os.getenv("CLOUDFLARE_R2_PUBLIC_DOMAIN", "")
+        pdf_url = f"{r2_public_domain}/{chunks.doc_id}" if r2_public_domain else ""
+        vectors = chunks.vectors.tolist() if len(chunks) else []
+        chunk_data = []
+
+        for i, (chunk_id, text, page_number, chunk_index, end_page) in enumerate(zip(
+            chunks.chunk_ids,
+            chunks.texts,
+            chunks.page_numbers.tolist(),
+            chunks.chunk_indexes.tolist(),
+            chunks.end_page_numbers.tolist(),
+        )):
+            payload = {
+                "doc_id": chunks.doc_id,
+                "page_number": page_number,
+                "page_label": chunks.page_labels.get(page_number),
+                "chunk_index": chunk_index,
+                "text": text,
+                "doc_type": chunks.doc_type,
+                "domain": chunks.domain,
+                "source": chunks.source,
+                "source_system": chunks.source_system,
+                "pdf_url": pdf_url,
+            }
+            if end_page != NO_PAGE:
+                payload["end_page_number"] = end_page
+            if compact:
+                payload = compact_payload(payload)
+            payload[CONTENT_HASH_FIELD] = content_hash(text, payload)
+
+            item = {
+                "chunk_id": chunk_id,
+                "vector": vectors[i],
+                "payload": payload
+            }
+            if compact:
+                item["text"] = text
+            if sparse_encoder is not None:
+                item["sparse_vector"] = sparse_encoder.encode_document(text)
+            chunk_data.append(item)
+
+        return chunk_data
+
+    @staticmethod
+    def _content_hashes(chunk_data: list[dict]) -> dict[str, str]:
+        return {item["chunk_id"]: item["payload"][CONTENT_HASH_FIELD] for item in chunk_data}
+
+    def _mark_dependents_stale(self, doc_ids: set[str]):
+        """Queue documents that matched changed or deleted dedup chunks for re-ingest by the next sync.
+
+        Their state is marked incomplete and they are dropped from the manifest, so the
+        next run lists them as new and decide re-ingests them with a fresh dedup plan.
+        """
+        if not doc_ids:
+            return
+        print(f"  Dedup: {len(doc_ids)} document(s) built on changed chunks will be re-ingested next sync")
+        self._stale_dependents |= doc_ids
+        try:
+            for doc_id in doc_ids:
+                state = self.state_store.get(doc_id)
+                if state is not None:
+                    self.state_store.upsert(doc_id, state.etag, state.checksum, upsert_completed=False)
+            if MANIFEST_ENABLED:
+                self.manifest.forget(doc_ids)
+        except Exception as e:
+            print(f"  Warning: could not queue dedup dependents for re-ingest: {e}")
+
+    def _forget_deleted(self, doc_ids: list[str]):
+        """Drop deleted documents from the dedup index and re-ingest what matched their chunks."""
+        dependents = set()
+        for doc_id in doc_ids:
+            dependents |= self.deduplicator.forget_doc(doc_id)
+        self._mark_dependents_stale(dependents - set(doc_ids))
+
+    def _save_indexes(self):
+        if self.deduplicator.enabled:
+            self.deduplicator.save()
+        if self.sparse_encoder is not None and len(self.sparse_encoder):
+            self.sparse_encoder.save()
+
+    def _restore_indexes(self):
+        """Go back to the saved dedup index and vocabulary, which still describe the live collection."""
+        self.deduplicator.load()
+        if self.sparse_encoder is not None:
+            self.sparse_encoder.load()
+
+    def _abandon_reindex(self, reindexer: BlueGreenReindexer):
+        # The indexes were rebuilt against the staging collection being dropped
+        reindexer.abandon()
+        self._restore_indexes()
+        self._finish_staging_texts(promote=False)
+
+    def _finish_staging_texts(self, promote: bool):
+        """Swap the reindex's texts in for the live ones, or drop them."""
+        staging, self._staging_texts = self._staging_texts, None
+        if staging is None:
+            return
+        try:
+            if promote:
+                staging.promote()
+            else:
+                staging.drop()
+        except Exception as e:
+            action = "promote" if promote else "drop"
+            print(f"Warning: could not {action} the staged chunk texts: {e}")
+
+    def _embed_chunks(self, text_chunks: ChunkBatch, plan: DedupPlan, store) -> ChunkBatch:
+        """Embed the chunks that are not duplicates; duplicates take their canonical chunk's vector.
+
+        Returns the chunks to store with their vectors attached: chunks whose embedding
+        failed are left out, and so are exact duplicates under the "drop" policy.
+        """
+        corpus_vectors = self.deduplicator.resolve(plan, store.retrieve_vectors)
+        fresh = [i for i in range(len(text_chunks)) if not plan.is_duplicate(i)]
+
+        print(f"  Generating embeddings for {len(fresh)} chunks...")
+        if plan.duplicates:
+            print(
+                f"  Dedup ({plan.policy}): {len(plan.within_doc)} repeated in document, "
+                f"{len(plan.across_corpus)} already in corpus"
+            )
+        chunk_texts = [text_chunks.texts[i] for i in fresh]
+        embed_start = time.perf_counter()
+        matrix, valid = self.embedder.embed_matrix(chunk_texts) if chunk_texts else (None, [])
+        metrics.chunks_embedded.inc(len(chunk_texts))
+        embed_seconds = time.perf_counter() - embed_start
+
+        embedding_success = int(sum(valid))
+        embedding_failures = len(chunk_texts) - embedding_success
+        chunks_per_second = len(chunk_texts) / embed_seconds if embed_seconds > 0 else 0.0
+        print(f"  Embedded {embedding_success} chunks in {embed_seconds:.2f}s ({chunks_per_second:.1f} chunks/s)")
+
+        if embedding_failures > 0:
+            print(f"  Embedding failures: {embedding_failures}/{len(fresh)}")
+
+        # Rows of matrix (views, not copies) by chunk position
+        vectors = {fresh[row]: matrix[row] for row in range(len(fresh)) if valid[row]}
+        for position, canonical in plan.within_doc.items():
+            if canonical in vectors:
+                vectors[position] = vectors[canonical]
+        for position, chunk_id in plan.across_corpus.items():
+            vectors[position] = np.asarray(corpus_vectors[chunk_id], dtype=np.float32)
+        self.deduplicator.record(plan)
+
+        kept = [
+            i for i in range(len(text_chunks))
+            if i in vectors and not plan.is_dropped(i)
+        ]
+        kept_chunks = text_chunks.take(kept)
+        if kept:
+            kept_chunks.attach_vectors(np.stack([vectors[i] for i in kept]))
+        return kept_chunks
+
+    def _publish_reindex(self, job: IngestionJob, reindexer: BlueGreenReindexer, reindexed_records, reindex_failures: int):
+        job.start_stage(STAGE_PUBLISH, total=1)
+        if reindex_failures:
+            print(f"\nReindex aborted: {reindex_failures} document(s) failed; alias left on previous collection")
+            self._abandon_reindex(reindexer)
+            job.advance(STAGE_PUBLISH, completed=0, failed=1)
+        else:
+            try:
+                published, publish_error = reindexer.publish()
+            except Exception as e:
+                published, publish_error = False, str(e)
+            if published:
+                # The rebuilt dedup index, vocabulary and chunk texts describe the collection now live
+                self._finish_staging_texts(promote=True)
+                self._save_indexes()
+                self.state_store.bulk_upsert(reindexed_records, upsert_completed=True)
+                if self.parsed_store is not None:
+                    # Every document in the bucket was just loaded, so other rows are old PDF versions
+                    pruned = self.parsed_store.prune({checksum for _, _, checksum in reindexed_records})
+                    if pruned:
+                        print(f"Dropped parsed text for {pruned} superseded PDF version(s)")
+                job.advance(STAGE_PUBLISH)
+            else:
+                print(f"\nReindex publish failed: {publish_error}")
+                self._abandon_reindex(reindexer)
+                job.advance(STAGE_PUBLISH, completed=0, failed=1)
+        job.finish_stage(STAGE_PUBLISH)
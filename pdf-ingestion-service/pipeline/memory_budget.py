@@ -0,0 +1,68 @@
+import os
+import threading
+
+
+MEMORY_BUDGET_BYTES = int(os.getenv("INGESTION_MEMORY_BUDGET_MB", "512")) * 1024 * 1024
+# Downloads finishing above this share of the budget are spilled to disk
+SPILL_WATERMARK = float(os.getenv("INGESTION_SPILL_WATERMARK", "0.75"))
+
+# Rough in-memory costs used to charge the budget
+CHUNK_OVERHEAD_BYTES = 600
+VECTOR_BYTES_PER_CHUNK = 384 * 32  # list[float] of 384 boxed floats
+
+
+class MemoryBudget:
+    """Global byte budget for in-flight PDF bytes, parsed text, chunks and vectors.
+
+    Only admission (acquire) blocks; it is used before a download starts. Work that is
+    already admitted grows its share with charge(), which never blocks, so the consumer
+    can always finish a document and release memory. A single item larger than the
+    whole budget is admitted once nothing else is held.
+    """
+
+    def __init__(self, max_bytes: int = MEMORY_BUDGET_BYTES):
+        self.max_bytes = max_bytes
+        self.in_use = 0
+        self.peak = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, num_bytes: int):
+        with self._condition:
+            while self.in_use > 0 and self.in_use + num_bytes > self.max_bytes:
+                self._condition.wait()
+            self._add(num_bytes)
+
+    def charge(self, num_bytes: int):
+        with self._condition:
+            self._add(num_bytes)
+
+    def release(self, num_bytes: int):
+        with self._condition:
+            self.in_use = max(0, self.in_use - num_bytes)
+            self._condition.notify_all()
+
+    def above_watermark(self, watermark: float = SPILL_WATERMARK) -> bool:
+        with self._condition:
+            return self.in_use > self.max_bytes * watermark
+
+    def _add(self, num_bytes: int):
+        self.in_use += num_bytes
+        self.peak = max(self.peak, self.in_use)
+
+
+class Reservation:
+    """Tracks how much of the budget one document holds so it can be resized and freed."""
+
+    def __init__(self, budget: MemoryBudget, held: int = 0):
+        self.budget = budget
+        self.held = held
+
+    def resize(self, num_bytes: int):
+        if num_bytes > self.held:
+            self.budget.charge(num_bytes - self.held)
+        elif num_bytes < self.held:
+            self.budget.release(self.held - num_bytes)
+        self.held = num_bytes
+
+    def free(self):
+        self.resize(0)
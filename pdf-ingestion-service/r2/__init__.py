@@ -1,3 +1,13 @@
-from .client import R2Client, list_pdf_objects, get_r2_client
+from .client import R2Client, PdfDocument, list_pdf_objects, get_r2_client
+from .manifest import R2Manifest, ManifestEntry, ListingDiff, MANIFEST_ENABLED
 
-__all__ = ["R2Client", "list_pdf_objects", "get_r2_client"]
+__all__ = [
+    "R2Client",
+    "PdfDocument",
+    "list_pdf_objects",
+    "get_r2_client",
+    "R2Manifest",
+    "ManifestEntry",
+    "ListingDiff",
+    "MANIFEST_ENABLED",
+]
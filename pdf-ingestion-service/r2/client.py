@@ -3,10 +3,16 @@ import hashlib
 from typing import Iterable, Optional
 from dataclasses import dataclass
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import boto3
 from botocore.client import Config
 
 
+LIST_WORKERS = int(os.getenv("R2_LIST_WORKERS", "8"))
+# Sized for FETCH_MAX_CONCURRENCY (16) downloads x FETCH_RANGE_PARTS_IN_FLIGHT (4) ranged parts
+MAX_POOL_CONNECTIONS = int(os.getenv("R2_MAX_POOL_CONNECTIONS", "64"))
+
+
 @dataclass
 class PdfDocument:
     doc_id: str
@@ -28,15 +34,21 @@ class R2Client:
         access_key_id: str,
         secret_access_key: str,
         bucket_name: str,
+        endpoint_url: Optional[str] = None,
+        max_pool_connections: int = MAX_POOL_CONNECTIONS,
     ):
-        endpoint_url = f"https://{account_id}.r2.cloudflarestorage.com"
+        # R2_ENDPOINT_URL points the client at a local S3 stand-in (MinIO, moto server)
+        endpoint_url = endpoint_url or os.getenv("R2_ENDPOINT_URL") or f"https://{account_id}.r2.cloudflarestorage.com"
         
         self.client = boto3.client(
             "s3",
             endpoint_url=endpoint_url,
             aws_access_key_id=access_key_id,
             aws_secret_access_key=secret_access_key,
-            config=Config(signature_version="s3v4"),
+            config=Config(
+                signature_version="s3v4",
+                max_pool_connections=max_pool_connections,
+            ),
         )
         self.bucket_name = bucket_name
 
@@ -50,6 +62,33 @@ class R2Client:
             for obj in page["Contents"]:
                 yield obj
 
+    def list_objects_under(self, prefix: str) -> list[dict]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        objects = []
+        
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+            objects.extend(page.get("Contents", []))
+        
+        return objects
+    
+    def list_objects_parallel(self, max_workers: int = LIST_WORKERS) -> list[dict]:
+        """List the bucket with one paginator per top-level prefix (domain folder), in parallel."""
+        paginator = self.client.get_paginator("list_objects_v2")
+        prefixes = []
+        objects = []
+        
+        # Delimited listing of the root: objects at the top level plus one CommonPrefix per folder
+        for page in paginator.paginate(Bucket=self.bucket_name, Delimiter="/"):
+            objects.extend(page.get("Contents", []))
+            prefixes.extend(p["Prefix"] for p in page.get("CommonPrefixes", []))
+        
+        if prefixes:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(prefixes)))) as executor:
+                for prefix_objects in executor.map(self.list_objects_under, prefixes):
+                    objects.extend(prefix_objects)
+        
+        return objects
+
     def filter_pdf_objects(self, objects: Iterable[dict]) -> Iterable[dict]:
         for obj in objects:
             key = obj.get("Key", "")
@@ -85,6 +124,46 @@ class R2Client:
     def download_pdf(self, object_key: str) -> bytes:
         response = self.client.get_object(Bucket=self.bucket_name, Key=object_key)
         return response["Body"].read()
+    
+    def download_range(self, object_key: str, start: int, end: int, etag: Optional[str] = None) -> bytes:
+        """Download bytes [start, end] inclusive; with etag, only from that version of the object.
+
+        A ranged GET against a changed object fails with PreconditionFailed instead of
+        returning part of another version.
+        """
+        kwargs = {"IfMatch": f'"{self.normalize_etag(etag)}"'} if etag else {}
+        response = self.client.get_object(
+            Bucket=self.bucket_name,
+            Key=object_key,
+            Range=f"bytes={start}-{end}",
+            **kwargs
+        )
+        return response["Body"].read()
+    
+    def head_pdf(self, object_key: str) -> dict:
+        """The object as list_objects_v2 would describe it, for build_pdf_document."""
+        response = self.client.head_object(Bucket=self.bucket_name, Key=object_key)
+        return {
+            "Key": object_key,
+            "ETag": response["ETag"],
+            "Size": response["ContentLength"],
+            "LastModified": response["LastModified"],
+            "ContentType": response.get("ContentType"),
+        }
+    
+    def upload_pdf(self, object_key: str, file_bytes: bytes) -> dict:
+        """Put a PDF under object_key; returns it as head_pdf describes it."""
+        self.client.put_object(
+            Bucket=self.bucket_name,
+            Key=object_key,
+            Body=file_bytes,
+            ContentType="application/pdf"
+        )
+        return self.head_pdf(object_key)
+    
+    def get_object_size(self, object_key: str) -> int:
+        response = self.client.head_object(Bucket=self.bucket_name, Key=object_key)
+        return response["ContentLength"]
 
     def build_pdf_document(self, obj: dict, include_checksum: bool = False) -> PdfDocument:
         object_key = obj["Key"]
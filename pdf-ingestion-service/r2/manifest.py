@@ -0,0 +1,104 @@
+import os
+import gzip
+import threading
+import json
+from typing import Optional
+from dataclasses import dataclass, field
+from datetime import datetime
+from utils import data_path
+
+
+MANIFEST_ENABLED = os.getenv("R2_MANIFEST_ENABLED", "true").lower() == "true"
+
+
+@dataclass
+class ManifestEntry:
+    etag: str
+    size: int
+    last_modified: str
+
+
+@dataclass
+class ListingDiff:
+    added: list[dict] = field(default_factory=list)
+    changed: list[dict] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    unchanged: int = 0
+    current_keys: set[str] = field(default_factory=set)
+
+    @property
+    def changed_objects(self) -> list[dict]:
+        return self.added + self.changed
+
+
+def _entry_from_object(obj: dict) -> ManifestEntry:
+    last_modified = obj.get("LastModified")
+    if isinstance(last_modified, datetime):
+        last_modified = last_modified.isoformat()
+    return ManifestEntry(
+        etag=obj.get("ETag", "").strip('"'),
+        size=obj.get("Size", 0),
+        last_modified=last_modified or "",
+    )
+
+
+class R2Manifest:
+    """key → (etag, size, last_modified) of the bucket as of the last completed run, stored as gzipped JSON."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("R2_MANIFEST_PATH") or data_path("r2_manifest.json.gz")
+        # A sync saves while ingest_document may forget keys
+        self._lock = threading.Lock()
+
+    def load(self) -> dict[str, ManifestEntry]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                raw = json.load(f)
+            return {key: ManifestEntry(**value) for key, value in raw.items()}
+        except Exception as e:
+            print(f"Warning: could not read R2 manifest {self.path}: {e} (treating all objects as new)")
+            return {}
+
+    def save(self, objects: list[dict], exclude_keys: Optional[set[str]] = None):
+        """Persist the listing, minus exclude_keys so those objects count as new next run."""
+        exclude_keys = exclude_keys or set()
+        raw = {
+            obj["Key"]: _entry_from_object(obj).__dict__
+            for obj in objects
+            if obj["Key"] not in exclude_keys
+        }
+        with self._lock:
+            self._write(raw)
+
+    def _write(self, raw: dict):
+        tmp_path = f"{self.path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(raw, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    def forget(self, keys: set[str]):
+        """Drop keys from the saved manifest so the next run lists those objects as new."""
+        with self._lock:
+            previous = self.load()
+            if any(key in previous for key in keys):
+                self._write({key: entry.__dict__ for key, entry in previous.items() if key not in keys})
+
+    @staticmethod
+    def diff(objects: list[dict], previous: dict[str, ManifestEntry]) -> ListingDiff:
+        result = ListingDiff()
+
+        for obj in objects:
+            key = obj["Key"]
+            result.current_keys.add(key)
+            entry = previous.get(key)
+            if entry is None:
+                result.added.append(obj)
+            elif entry.etag != obj.get("ETag", "").strip('"') or entry.size != obj.get("Size", 0):
+                result.changed.append(obj)
+            else:
+                result.unchanged += 1
+
+        result.removed = [key for key in previous if key not in result.current_keys]
+        return result
@@ -1,12 +1,15 @@
-from typing import Optional
+from typing import Callable, Optional
 from state.document_state import DocumentStateStore
 from vectorstore.qdrant_client import QdrantVectorStore
 
 
 class DeletionReconciler:
-    def __init__(self, state_store: DocumentStateStore, vector_store: QdrantVectorStore):
+    def __init__(self, state_store: DocumentStateStore, vector_store: QdrantVectorStore, text_store=None, on_deleted: Optional[Callable[[list[str]], None]] = None):
         self.state_store = state_store
         self.vector_store = vector_store
+        self.text_store = text_store
+        # Called with the doc_ids whose points and state were removed
+        self.on_deleted = on_deleted
     
     def reconcile_deletions(self, current_doc_ids: set[str]) -> tuple[int, Optional[str]]:
         try:
@@ -17,10 +20,18 @@ class DeletionReconciler:
             if not deleted_doc_ids:
                 return (0, None)
             
-            deleted_count = self.vector_store.delete_by_doc_ids(list(deleted_doc_ids))
+            stale_doc_ids = sorted(deleted_doc_ids)
             
-            for doc_id in deleted_doc_ids:
-                self.state_store.delete(doc_id)
+            # Returns points actually removed, not documents
+            deleted_count = self.vector_store.delete_by_doc_ids(stale_doc_ids)
+            
+            if self.text_store is not None:
+                self.text_store.delete_by_doc_ids(stale_doc_ids)
+            
+            self.state_store.delete_many(stale_doc_ids)
+            
+            if self.on_deleted is not None:
+                self.on_deleted(stale_doc_ids)
             
             return (deleted_count, None)
         
@@ -0,0 +1,10 @@
+from .legal_tokenizer import tokenize, term_id
+from .bm25_encoder import Bm25Encoder, SPARSE_VECTORS_ENABLED, SPARSE_VECTOR_NAME
+
+__all__ = [
+    "tokenize",
+    "term_id",
+    "Bm25Encoder",
+    "SPARSE_VECTORS_ENABLED",
+    "SPARSE_VECTOR_NAME",
+]
@@ -0,0 +1,123 @@
+import os
+import json
+import math
+import threading
+from collections import Counter
+from typing import Optional
+from utils import data_path
+from .legal_tokenizer import tokenize, term_id
+
+
+SPARSE_VECTORS_ENABLED = os.getenv("SPARSE_VECTORS_ENABLED", "true").lower() == "true"
+SPARSE_VECTOR_NAME = os.getenv("SPARSE_VECTOR_NAME", "bm25")
+BM25_K1 = float(os.getenv("BM25_K1", "1.5"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+# avgdl before any chunk has been counted; ~ a 150-200 token chunk after stopwords
+DEFAULT_AVG_DOC_LENGTH = 100.0
+
+
+class Bm25Encoder:
+    """Sparse BM25 document vectors over a persisted vocabulary.
+
+    Each chunk is a BM25 "document". Stored values are the term-frequency part of
+    BM25 (k1 saturation and b length normalisation against the corpus average chunk
+    length); the collection's sparse vector uses Qdrant's IDF modifier, so the IDF part
+    is applied at query time from the collection itself and never goes stale.
+
+    The vocabulary (term -> id, document frequency) and corpus length stats are kept
+    for avgdl and as the IDF table; they only grow, so a document ingested twice is
+    counted twice until the next full reindex resets them.
+    """
+
+    def __init__(self, path: Optional[str] = None, k1: float = BM25_K1, b: float = BM25_B):
+        self.path = path or os.getenv("BM25_VOCABULARY_PATH") or data_path("bm25_vocabulary.json")
+        self.k1 = k1
+        self.b = b
+        self.doc_freq: dict[str, int] = {}
+        self.doc_count = 0
+        self.total_length = 0
+        self._lock = threading.Lock()
+
+    @property
+    def avg_doc_length(self) -> float:
+        return self.total_length / self.doc_count if self.doc_count else DEFAULT_AVG_DOC_LENGTH
+
+    def encode_document(self, text: str) -> Optional[dict]:
+        """{"indices", "values"} for one chunk, counting it into the vocabulary; None if it has no terms."""
+        terms = tokenize(text)
+        if not terms:
+            return None
+        tf = Counter(terms)
+
+        with self._lock:
+            self.doc_count += 1
+            self.total_length += len(terms)
+            for term in tf:
+                self.doc_freq[term] = self.doc_freq.get(term, 0) + 1
+            avgdl = self.avg_doc_length
+
+        norm = self.k1 * (1 - self.b + self.b * len(terms) / avgdl)
+        weights = {}
+        for term, count in tf.items():
+            # Distinct terms can share an id only on a 32-bit hash collision; merge them
+            index = term_id(term)
+            weights[index] = weights.get(index, 0.0) + count * (self.k1 + 1) / (count + norm)
+        indices = sorted(weights)
+        return {"indices": indices, "values": [round(weights[i], 6) for i in indices]}
+
+    @staticmethod
+    def encode_query(text: str) -> Optional[dict]:
+        """Query vector: one entry per distinct term; Qdrant multiplies in the IDF."""
+        indices = sorted({term_id(term) for term in tokenize(text)})
+        if not indices:
+            return None
+        return {"indices": indices, "values": [1.0] * len(indices)}
+
+    def idf(self, term: str) -> float:
+        """BM25 IDF as Qdrant's modifier computes it: ln(1 + (N - df + 0.5) / (df + 0.5))."""
+        with self._lock:
+            df = self.doc_freq.get(term, 0)
+            return math.log(1 + (self.doc_count - df + 0.5) / (df + 0.5))
+
+    def __len__(self) -> int:
+        return len(self.doc_freq)
+
+    def reset(self):
+        """Start from an empty vocabulary (a full reindex rebuilds it)."""
+        with self._lock:
+            self.doc_freq = {}
+            self.doc_count = 0
+            self.total_length = 0
+
+    def save(self):
+        with self._lock:
+            data = {
+                "k1": self.k1,
+                "b": self.b,
+                "doc_count": self.doc_count,
+                "total_length": self.total_length,
+                "vocabulary": {
+                    term: {"id": term_id(term), "df": df}
+                    for term, df in self.doc_freq.items()
+                },
+            }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def load(self) -> int:
+        self.reset()
+        if not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            with self._lock:
+                self.doc_count = data["doc_count"]
+                self.total_length = data["total_length"]
+                self.doc_freq = {term: entry["df"] for term, entry in data["vocabulary"].items()}
+        except Exception as e:
+            print(f"Warning: could not read BM25 vocabulary {self.path}: {e} (starting empty)")
+            self.reset()
+        return len(self)
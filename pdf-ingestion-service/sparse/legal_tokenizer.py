@@ -0,0 +1,59 @@
+import re
+
+
+# Kept in sync with src/rag/retrieval/legalSparseEncoder.js, which encodes queries
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Common English function words. Negations and modals ("not", "shall", "may", "must")
+# are kept: in statutes and contracts they change what a provision means.
+STOPWORDS = frozenset((
+    "a about above after again all am an and any are as at be because been before being "
+    "below between both but by can could did do does doing down during each few for from "
+    "further had has have having he her here hers herself him himself his how i if in into "
+    "is it its itself just me more most my myself now of off on once only or other our ours "
+    "ourselves out over own same she should so some such than that the their theirs them "
+    "themselves then there these they this those through to too until up very was we were "
+    "what when where which while who whom why will with would you your yours yourself yourselves"
+).split())
+
+# Abbreviations that legal text and queries write both ways
+ABBREVIATIONS = {
+    "sec": "section",
+    "secs": "section",
+    "sections": "section",
+    "art": "article",
+    "arts": "article",
+    "articles": "article",
+    "cl": "clause",
+    "clauses": "clause",
+    "vs": "v",
+    "versus": "v",
+    "govt": "government",
+    "hon": "honourable",
+    "ble": "honourable",
+}
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased word tokens with stopwords removed and legal abbreviations expanded.
+
+    Single letters are dropped unless they are "v" (as in "A v B"); statute references
+    such as "498a" stay one token because letters and digits are not split apart.
+    """
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        token = ABBREVIATIONS.get(token, token)
+        if token in STOPWORDS:
+            continue
+        if len(token) == 1 and token != "v" and not token.isdigit():
+            continue
+        tokens.append(token)
+    return tokens
+
+
+def term_id(term: str) -> int:
+    """Stable 32-bit id for a term (FNV-1a), so queries need no copy of the vocabulary."""
+    h = 0x811C9DC5
+    for byte in term.encode("utf-8"):
+        h = ((h ^ byte) * 0x01000193) & 0xFFFFFFFF
+    return h
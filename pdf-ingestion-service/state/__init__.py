@@ -1,3 +1,21 @@
-from .document_state import DocumentState, DocumentStateStore
+from .document_state import DocumentState, DocumentStateStore, SqliteDocumentStateStore, get_state_store, STATE_BACKEND
+from .write_behind import WriteBehindStateStore, STATE_WRITE_BEHIND
+from .ingestion_journal import IngestionJournal, JournalEntry, Checkpoint, JOURNAL_ENABLED
+from .document_leases import DocumentLeaseStore, LEASES_ENABLED, default_worker_id
 
-__all__ = ["DocumentState", "DocumentStateStore"]
+__all__ = [
+    "DocumentState",
+    "DocumentStateStore",
+    "SqliteDocumentStateStore",
+    "get_state_store",
+    "STATE_BACKEND",
+    "WriteBehindStateStore",
+    "STATE_WRITE_BEHIND",
+    "IngestionJournal",
+    "JournalEntry",
+    "Checkpoint",
+    "JOURNAL_ENABLED",
+    "DocumentLeaseStore",
+    "LEASES_ENABLED",
+    "default_worker_id",
+]
@@ -0,0 +1,99 @@
+from typing import Optional
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+import threading
+import socket
+import os
+
+
+LEASES_ENABLED = os.getenv("INGESTION_LEASES_ENABLED", "false").lower() == "true"
+# A worker that stops heartbeating loses its documents to other workers after this long
+LEASE_TTL_SECONDS = int(os.getenv("INGESTION_LEASE_TTL_SECONDS", "120"))
+HEARTBEAT_INTERVAL_SECONDS = max(1, LEASE_TTL_SECONDS // 4)
+# Documents a worker holds leases on but has not finished; more would leave other workers idle
+CLAIM_AHEAD = int(os.getenv("INGESTION_LEASE_CLAIM_AHEAD", "4"))
+
+
+def default_worker_id() -> str:
+    return os.getenv("INGESTION_WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+
+class DocumentLeaseStore:
+    """Per-document leases in the ingestion_leases collection, so several workers can share a sync.
+
+    A worker claims a document before downloading it and releases it once the
+    document is done, successfully or not. A lease is one document keyed by doc_id;
+    claiming is a single upsert that only matches a lease that is expired or already
+    ours, so two workers racing for a document cannot both win (the loser's insert
+    hits the unique _id). A heartbeat thread pushes expires_at forward for every lease
+    the worker holds; when a worker dies its leases expire and are claimed by others.
+    """
+
+    def __init__(self, db, worker_id: Optional[str] = None, ttl_seconds: int = LEASE_TTL_SECONDS):
+        self.collection = db["ingestion_leases"]
+        self.worker_id = worker_id or default_worker_id()
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self._stop_event = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+        self.collection.create_index("worker_id")
+
+    def claim(self, doc_id: str) -> bool:
+        """Take the lease on doc_id unless another worker holds an unexpired one."""
+        now = datetime.utcnow()
+        try:
+            self.collection.update_one(
+                {
+                    "_id": doc_id,
+                    "$or": [{"expires_at": {"$lt": now}}, {"worker_id": self.worker_id}],
+                },
+                {
+                    "$set": {
+                        "worker_id": self.worker_id,
+                        "expires_at": now + self.ttl,
+                        "claimed_at": now,
+                    }
+                },
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def release(self, doc_id: str):
+        self.collection.delete_one({"_id": doc_id, "worker_id": self.worker_id})
+
+    def renew(self) -> int:
+        """Extend every lease this worker holds; returns how many it still holds."""
+        result = self.collection.update_many(
+            {"worker_id": self.worker_id},
+            {"$set": {"expires_at": datetime.utcnow() + self.ttl}}
+        )
+        return result.matched_count
+
+    def release_all(self) -> int:
+        return self.collection.delete_many({"worker_id": self.worker_id}).deleted_count
+
+    def _heartbeat_loop(self, interval: float):
+        while not self._stop_event.wait(interval):
+            try:
+                self.renew()
+            except Exception as e:
+                print(f"Warning: lease heartbeat for {self.worker_id} failed: {e}")
+
+    def start_heartbeat(self, interval: float = HEARTBEAT_INTERVAL_SECONDS):
+        if self._heartbeat and self._heartbeat.is_alive():
+            return
+        self._stop_event.clear()
+        self._heartbeat = threading.Thread(
+            target=self._heartbeat_loop,
+            args=(interval,),
+            name=f"lease-heartbeat-{self.worker_id}",
+            daemon=True
+        )
+        self._heartbeat.start()
+
+    def stop_heartbeat(self):
+        self._stop_event.set()
+        if self._heartbeat:
+            self._heartbeat.join(timeout=5)
+            self._heartbeat = None
@@ -1,8 +1,27 @@
 from typing import Optional
 from dataclasses import dataclass
 from datetime import datetime
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
+import threading
+import sqlite3
 import os
+from utils import data_path
+
+
+# "mongo" (shared by workers and the API) or "sqlite" (a local file, for single-node runs;
+# the journal and document leases then stay off, and CHUNK_TEXT_STORE must be sqlite)
+STATE_BACKEND = os.getenv("INGESTION_STATE_BACKEND", "mongo").lower()
+STATE_PATH = os.getenv("INGESTION_STATE_PATH", "")
+BULK_WRITE_BATCH_SIZE = 1000
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "20"))
+STATE_PROJECTION = {
+    "_id": 0,
+    "doc_id": 1,
+    "etag": 1,
+    "checksum": 1,
+    "last_ingested_at": 1,
+    "upsert_completed": 1,
+}
 
 
 @dataclass
@@ -15,11 +34,14 @@ class DocumentState:
 
 
 class DocumentStateStore:
-    def __init__(self, mongo_url: str = None):
+    name = "mongo"
+
+    def __init__(self, mongo_url: str = None, client=None):
         self.mongo_url = self._normalize_mongo_url(
             mongo_url or os.getenv("MONGO_URL", "")
         )
-        self.client = MongoClient(self.mongo_url)
+        # client lets callers pass a ready MongoClient (or mongomock.MongoClient)
+        self.client = client or MongoClient(self.mongo_url, maxPoolSize=MONGO_MAX_POOL_SIZE)
         self.db = self._get_database()
         self.collection = self.db["ingestion_state"]
         self._init_db()
@@ -73,19 +95,30 @@ class DocumentStateStore:
         """Create index on doc_id for fast lookups."""
         self.collection.create_index("doc_id", unique=True)
     
+    @staticmethod
+    def _to_state(doc: dict) -> DocumentState:
+        return DocumentState(
+            doc_id=doc["doc_id"],
+            etag=doc["etag"],
+            checksum=doc["checksum"],
+            last_ingested_at=doc["last_ingested_at"],
+            upsert_completed=doc.get("upsert_completed", False)
+        )
+    
     def get(self, doc_id: str) -> Optional[DocumentState]:
-        doc = self.collection.find_one({"doc_id": doc_id})
+        doc = self.collection.find_one({"doc_id": doc_id}, STATE_PROJECTION)
         
         if doc:
-            return DocumentState(
-                doc_id=doc["doc_id"],
-                etag=doc["etag"],
-                checksum=doc["checksum"],
-                last_ingested_at=doc["last_ingested_at"],
-                upsert_completed=doc.get("upsert_completed", False)
-            )
+            return self._to_state(doc)
         return None
     
+    def load_all(self) -> dict[str, DocumentState]:
+        """Load every document state in one projected query, keyed by doc_id."""
+        return {
+            doc["doc_id"]: self._to_state(doc)
+            for doc in self.collection.find({}, STATE_PROJECTION)
+        }
+    
     def upsert(self, doc_id: str, etag: str, checksum: str, upsert_completed: bool = False):
         now = datetime.utcnow().isoformat()
         self.collection.update_one(
@@ -102,6 +135,51 @@ class DocumentStateStore:
             upsert=True
         )
     
+    def _bulk_write(self, operations: list[UpdateOne]) -> int:
+        modified = 0
+        for i in range(0, len(operations), BULK_WRITE_BATCH_SIZE):
+            result = self.collection.bulk_write(
+                operations[i:i + BULK_WRITE_BATCH_SIZE],
+                ordered=False
+            )
+            modified += result.modified_count + result.upserted_count
+        return modified
+    
+    def bulk_upsert(self, records: list[tuple[str, str, str]], upsert_completed: bool = False) -> int:
+        """Upsert many (doc_id, etag, checksum) records in batched bulk writes."""
+        if not records:
+            return 0
+        
+        now = datetime.utcnow().isoformat()
+        operations = [
+            UpdateOne(
+                {"doc_id": doc_id},
+                {
+                    "$set": {
+                        "doc_id": doc_id,
+                        "etag": etag,
+                        "checksum": checksum,
+                        "last_ingested_at": now,
+                        "upsert_completed": upsert_completed
+                    }
+                },
+                upsert=True
+            )
+            for doc_id, etag, checksum in records
+        ]
+        return self._bulk_write(operations)
+    
+    def bulk_update_etags(self, etags: dict[str, str]) -> int:
+        """Apply many etag-only updates (doc_id -> etag) in batched bulk writes."""
+        if not etags:
+            return 0
+        
+        operations = [
+            UpdateOne({"doc_id": doc_id}, {"$set": {"etag": etag}})
+            for doc_id, etag in etags.items()
+        ]
+        return self._bulk_write(operations)
+    
     def update_etag_only(self, doc_id: str, etag: str):
         self.collection.update_one(
             {"doc_id": doc_id},
@@ -119,5 +197,214 @@ class DocumentStateStore:
             {"$set": {"upsert_completed": True}}
         )
     
+    def bulk_mark_upsert_complete(self, doc_ids: list[str]) -> int:
+        if not doc_ids:
+            return 0
+        
+        operations = [
+            UpdateOne({"doc_id": doc_id}, {"$set": {"upsert_completed": True}})
+            for doc_id in doc_ids
+        ]
+        return self._bulk_write(operations)
+    
     def delete(self, doc_id: str):
         self.collection.delete_one({"doc_id": doc_id})
+    
+    def delete_many(self, doc_ids: list[str]) -> int:
+        if not doc_ids:
+            return 0
+        
+        deleted = 0
+        for i in range(0, len(doc_ids), BULK_WRITE_BATCH_SIZE):
+            result = self.collection.delete_many(
+                {"doc_id": {"$in": doc_ids[i:i + BULK_WRITE_BATCH_SIZE]}}
+            )
+            deleted += result.deleted_count
+        return deleted
+    
+    def status_summary(self) -> dict:
+        """Completed/incomplete counts and incomplete doc details in one aggregation."""
+        pipeline = [
+            {
+                "$facet": {
+                    "counts": [
+                        {
+                            "$group": {
+                                "_id": None,
+                                "total": {"$sum": 1},
+                                "completed": {
+                                    "$sum": {"$cond": [{"$eq": ["$upsert_completed", True]}, 1, 0]}
+                                },
+                            }
+                        }
+                    ],
+                    "incomplete_docs": [
+                        {"$match": {"upsert_completed": {"$ne": True}}},
+                        {"$project": {"_id": 0, "doc_id": 1, "last_ingested_at": 1}},
+                    ],
+                }
+            }
+        ]
+        result = next(self.collection.aggregate(pipeline), {})
+        counts = (result.get("counts") or [{}])[0]
+        total = counts.get("total", 0)
+        completed = counts.get("completed", 0)
+        
+        return {
+            "total": total,
+            "completed": completed,
+            "incomplete": total - completed,
+            "incomplete_docs": [
+                {
+                    "doc_id": doc["doc_id"],
+                    "status": "incomplete",
+                    "last_ingested_at": doc.get("last_ingested_at")
+                }
+                for doc in result.get("incomplete_docs", [])
+            ],
+        }
+
+
+class SqliteDocumentStateStore:
+    """Document states in a local SQLite file in WAL mode, for single-node runs without Mongo.
+
+    Same methods as DocumentStateStore. There is no Mongo database behind it (db is
+    None), so the journal and document leases are not available with this backend.
+    """
+    
+    name = "sqlite"
+    db = None
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or STATE_PATH or data_path("ingestion_state.sqlite")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ingestion_state ("
+                "doc_id TEXT PRIMARY KEY, etag TEXT NOT NULL, checksum TEXT NOT NULL, "
+                "last_ingested_at TEXT NOT NULL, upsert_completed INTEGER NOT NULL DEFAULT 0)"
+            )
+    
+    @staticmethod
+    def _to_state(row: tuple) -> DocumentState:
+        doc_id, etag, checksum, last_ingested_at, upsert_completed = row
+        return DocumentState(
+            doc_id=doc_id,
+            etag=etag,
+            checksum=checksum,
+            last_ingested_at=last_ingested_at,
+            upsert_completed=bool(upsert_completed)
+        )
+    
+    def _write_many(self, sql: str, rows: list[tuple]) -> int:
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            return self._conn.executemany(sql, rows).rowcount
+    
+    def get(self, doc_id: str) -> Optional[DocumentState]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT doc_id, etag, checksum, last_ingested_at, upsert_completed "
+                "FROM ingestion_state WHERE doc_id = ?",
+                (doc_id,)
+            ).fetchone()
+        return self._to_state(row) if row else None
+    
+    def load_all(self) -> dict[str, DocumentState]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT doc_id, etag, checksum, last_ingested_at, upsert_completed FROM ingestion_state"
+            ).fetchall()
+        return {row[0]: self._to_state(row) for row in rows}
+    
+    def bulk_upsert(self, records: list[tuple[str, str, str]], upsert_completed: bool = False) -> int:
+        if not records:
+            return 0
+        
+        now = datetime.utcnow().isoformat()
+        return self._write_many(
+            "INSERT INTO ingestion_state VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(doc_id) DO UPDATE SET etag = excluded.etag, checksum = excluded.checksum, "
+            "last_ingested_at = excluded.last_ingested_at, upsert_completed = excluded.upsert_completed",
+            [(doc_id, etag, checksum, now, int(upsert_completed)) for doc_id, etag, checksum in records]
+        )
+    
+    def upsert(self, doc_id: str, etag: str, checksum: str, upsert_completed: bool = False):
+        self.bulk_upsert([(doc_id, etag, checksum)], upsert_completed=upsert_completed)
+    
+    def bulk_update_etags(self, etags: dict[str, str]) -> int:
+        return self._write_many(
+            "UPDATE ingestion_state SET etag = ? WHERE doc_id = ?",
+            [(etag, doc_id) for doc_id, etag in etags.items()]
+        )
+    
+    def update_etag_only(self, doc_id: str, etag: str):
+        self.bulk_update_etags({doc_id: etag})
+    
+    def get_all_doc_ids(self) -> set[str]:
+        with self._lock:
+            return {doc_id for (doc_id,) in self._conn.execute("SELECT doc_id FROM ingestion_state")}
+    
+    def bulk_mark_upsert_complete(self, doc_ids: list[str]) -> int:
+        return self._write_many(
+            "UPDATE ingestion_state SET upsert_completed = 1 WHERE doc_id = ?",
+            [(doc_id,) for doc_id in doc_ids]
+        )
+    
+    def mark_upsert_complete(self, doc_id: str):
+        self.bulk_mark_upsert_complete([doc_id])
+    
+    def delete_many(self, doc_ids: list[str]) -> int:
+        return self._write_many(
+            "DELETE FROM ingestion_state WHERE doc_id = ?",
+            [(doc_id,) for doc_id in doc_ids]
+        )
+    
+    def delete(self, doc_id: str):
+        self.delete_many([doc_id])
+    
+    def status_summary(self) -> dict:
+        with self._lock:
+            total, completed = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(upsert_completed), 0) FROM ingestion_state"
+            ).fetchone()
+            incomplete = self._conn.execute(
+                "SELECT doc_id, last_ingested_at FROM ingestion_state WHERE upsert_completed = 0"
+            ).fetchall()
+        
+        return {
+            "total": total,
+            "completed": completed,
+            "incomplete": total - completed,
+            "incomplete_docs": [
+                {"doc_id": doc_id, "status": "incomplete", "last_ingested_at": last_ingested_at}
+                for doc_id, last_ingested_at in incomplete
+            ],
+        }
+
+
+_shared_stores: dict[str, object] = {}
+_shared_stores_lock = threading.Lock()
+
+
+def get_state_store(mongo_url: str = None, backend: str = STATE_BACKEND):
+    """Return a process-wide state store: one pooled MongoClient per URL, or the SQLite file."""
+    if backend == "sqlite":
+        key = "sqlite:" + (STATE_PATH or data_path("ingestion_state.sqlite"))
+        factory = SqliteDocumentStateStore
+    elif backend == "mongo":
+        key = DocumentStateStore._normalize_mongo_url(mongo_url or os.getenv("MONGO_URL", ""))
+        factory = lambda: DocumentStateStore(mongo_url=key)
+    else:
+        raise ValueError(f"Unknown state backend: {backend} (choose mongo or sqlite)")
+    
+    with _shared_stores_lock:
+        store = _shared_stores.get(key)
+        if store is None:
+            store = factory()
+            _shared_stores[key] = store
+    
+    return store
@@ -0,0 +1,214 @@
+from typing import Optional
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+import hashlib
+import gzip
+import json
+import os
+import numpy as np
+from models import ParsedPage, ChunkBatch
+from utils import DATA_DIR
+
+
+# Off by default: artifacts are local files, and on hosts whose disk does not survive a
+# restart (Cloud Run, most containers) the journal only adds writes. Turn it on where
+# INGESTION_JOURNAL_DIR (or INGESTION_DATA_DIR) is a persistent volume.
+JOURNAL_ENABLED = os.getenv("INGESTION_JOURNAL_ENABLED", "false").lower() == "true"
+JOURNAL_DIR = os.getenv("INGESTION_JOURNAL_DIR", "") or os.path.join(DATA_DIR, "journal")
+
+STAGE_PARSED = "parsed"
+STAGE_CHUNKED = "chunked"
+STAGE_EMBEDDED = "embedded"
+# Old points deleted and state marked ingested; upserted_batches says how far it got
+STAGE_UPSERTING = "upserting"
+
+ARTIFACT_SUFFIXES = {
+    STAGE_PARSED: ".pages.json.gz",
+    STAGE_CHUNKED: ".chunks.json.gz",
+    STAGE_EMBEDDED: ".embedded.npz",
+}
+# Downloaded PDFs journaled by earlier versions; removed with the document's other artifacts
+STALE_ARTIFACT_SUFFIXES = (".pdf",)
+
+JOURNAL_PROJECTION = {
+    "_id": 0,
+    "doc_id": 1,
+    "etag": 1,
+    "checksum": 1,
+    "stage": 1,
+    "artifact_path": 1,
+    "upserted_batches": 1,
+    "updated_at": 1,
+}
+
+
+@dataclass
+class JournalEntry:
+    doc_id: str
+    etag: str
+    checksum: str
+    stage: str
+    artifact_path: Optional[str]
+    upserted_batches: list[int] = field(default_factory=list)
+    updated_at: Optional[str] = None
+
+
+@dataclass
+class Checkpoint:
+    """What a document needs to resume from its last journaled stage."""
+    stage: str
+    pages: Optional[list[ParsedPage]] = None
+    text_chunks: Optional[ChunkBatch] = None
+    chunk_data: Optional[list[dict]] = None
+    upserted_batches: set[int] = field(default_factory=set)
+
+
+class IngestionJournal:
+    """Durable per-document record of the last completed ingestion stage.
+
+    Entries live in the ingestion_journal collection next to ingestion_state; the
+    artifact of the latest stage (parsed pages, chunks, or embedded points) is written
+    under JOURNAL_DIR before its entry, so an entry never points at a file that was not
+    fully written. Each checkpoint replaces the previous stage's artifact, and a
+    document's entry and artifact are removed once its upsert completes.
+
+    The first checkpoint is the parse: the PDF itself is not journaled, since
+    downloading it from R2 again is as good a checkpoint as a local copy. Artifacts
+    are only useful if JOURNAL_DIR is on a persistent volume; an entry whose artifact
+    is gone (a restart on ephemeral disk) just starts the document over.
+    """
+
+    def __init__(self, db, artifact_dir: str = None):
+        self.collection = db["ingestion_journal"]
+        self.artifact_dir = artifact_dir or JOURNAL_DIR
+        os.makedirs(self.artifact_dir, exist_ok=True)
+        self.collection.create_index("doc_id", unique=True)
+
+    @staticmethod
+    def _to_entry(doc: dict) -> JournalEntry:
+        return JournalEntry(
+            doc_id=doc["doc_id"],
+            etag=doc["etag"],
+            checksum=doc["checksum"],
+            stage=doc["stage"],
+            artifact_path=doc.get("artifact_path"),
+            upserted_batches=doc.get("upserted_batches", []),
+            updated_at=doc.get("updated_at"),
+        )
+
+    def load_all(self) -> dict[str, JournalEntry]:
+        return {
+            doc["doc_id"]: self._to_entry(doc)
+            for doc in self.collection.find({}, JOURNAL_PROJECTION)
+        }
+
+    def _artifact_stem(self, doc_id: str) -> str:
+        return os.path.join(self.artifact_dir, hashlib.sha256(doc_id.encode()).hexdigest()[:32])
+
+    def _artifact_path(self, doc_id: str, stage: str) -> str:
+        return self._artifact_stem(doc_id) + ARTIFACT_SUFFIXES[stage]
+
+    @staticmethod
+    def _write_json(path: str, rows: list[dict]):
+        tmp_path = f"{path}.tmp"
+        # Level 1: artifacts are short-lived, so write speed matters more than size
+        with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=1) as f:
+            json.dump(rows, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _read_json(path: str) -> list[dict]:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_artifact(self, path: str, stage: str, checkpoint: Checkpoint):
+        if stage == STAGE_PARSED:
+            self._write_json(path, [asdict(page) for page in checkpoint.pages])
+        elif stage == STAGE_CHUNKED:
+            self._write_json(path, checkpoint.text_chunks.to_rows())
+        elif stage == STAGE_EMBEDDED:
+            # np.savez appends .npz to names without it, so write to a .npz temp file
+            tmp_path = f"{path}.tmp.npz"
+            np.savez(
+                tmp_path,
+                vectors=np.array([item["vector"] for item in checkpoint.chunk_data], dtype=np.float32),
+                chunk_ids=np.array([item["chunk_id"] for item in checkpoint.chunk_data], dtype=str),
+                # Everything but the dense vector (payload, sparse vector) as one JSON document
+                points=np.array(json.dumps([
+                    {key: value for key, value in item.items() if key not in ("chunk_id", "vector")}
+                    for item in checkpoint.chunk_data
+                ])),
+            )
+            os.replace(tmp_path, path)
+
+    def checkpoint(self, doc_id: str, etag: str, checksum: str, checkpoint: Checkpoint):
+        """Persist checkpoint.stage for a document, replacing the previous stage's artifact."""
+        path = self._artifact_path(doc_id, checkpoint.stage)
+        self._write_artifact(path, checkpoint.stage, checkpoint)
+        self.collection.update_one(
+            {"doc_id": doc_id},
+            {
+                "$set": {
+                    "doc_id": doc_id,
+                    "etag": etag,
+                    "checksum": checksum,
+                    "stage": checkpoint.stage,
+                    "artifact_path": path,
+                    "upserted_batches": [],
+                    "updated_at": datetime.utcnow().isoformat(),
+                }
+            },
+            upsert=True
+        )
+        self._remove_artifacts(doc_id, keep=path)
+
+    def mark_upserting(self, doc_id: str):
+        """Old points are deleted and state is marked ingested; only batches remain."""
+        self.collection.update_one(
+            {"doc_id": doc_id},
+            {"$set": {"stage": STAGE_UPSERTING, "updated_at": datetime.utcnow().isoformat()}}
+        )
+
+    def mark_batch(self, doc_id: str, batch_num: int):
+        self.collection.update_one(
+            {"doc_id": doc_id},
+            {"$addToSet": {"upserted_batches": batch_num}}
+        )
+
+    def has_artifact(self, entry: JournalEntry) -> bool:
+        return bool(entry.artifact_path) and os.path.exists(entry.artifact_path)
+
+    def load_checkpoint(self, entry: JournalEntry) -> Optional[Checkpoint]:
+        """Read an entry's artifact back; None when it is missing or unreadable."""
+        if not self.has_artifact(entry):
+            return None
+        path = entry.artifact_path
+        if path.endswith(STALE_ARTIFACT_SUFFIXES):
+            return None
+        try:
+            if path.endswith(ARTIFACT_SUFFIXES[STAGE_PARSED]):
+                return Checkpoint(STAGE_PARSED, pages=[ParsedPage(**row) for row in self._read_json(path)])
+            if path.endswith(ARTIFACT_SUFFIXES[STAGE_CHUNKED]):
+                return Checkpoint(STAGE_CHUNKED, text_chunks=ChunkBatch.from_rows(self._read_json(path)))
+            with np.load(path) as data:
+                points = json.loads(str(data["points"]))
+                chunk_data = [
+                    {"chunk_id": str(chunk_id), "vector": vector.tolist(), **point}
+                    for chunk_id, vector, point in zip(data["chunk_ids"], data["vectors"], points)
+                ]
+            return Checkpoint(entry.stage, chunk_data=chunk_data, upserted_batches=set(entry.upserted_batches))
+        except Exception as e:
+            print(f"Warning: could not read journal artifact {path}: {e} (starting over)")
+            return None
+
+    def _remove_artifacts(self, doc_id: str, keep: Optional[str] = None):
+        stem = self._artifact_stem(doc_id)
+        for suffix in (*ARTIFACT_SUFFIXES.values(), *STALE_ARTIFACT_SUFFIXES):
+            path = stem + suffix
+            if path != keep and os.path.exists(path):
+                os.remove(path)
+
+    def clear(self, doc_id: str):
+        self.collection.delete_one({"doc_id": doc_id})
+        self._remove_artifacts(doc_id)
+
@@ -0,0 +1,190 @@
+from typing import Optional
+from collections import defaultdict
+from dataclasses import replace
+import threading
+import time
+import os
+from .document_state import DocumentState
+
+
+STATE_WRITE_BEHIND = os.getenv("INGESTION_STATE_WRITE_BEHIND", "true").lower() == "true"
+# Deferred writes that trigger a flush before the next stage boundary
+STATE_FLUSH_EVERY = int(os.getenv("INGESTION_STATE_FLUSH_EVERY", "256"))
+
+
+class WriteBehindStateStore:
+    """A state store (Mongo or SQLite) that defers the writes which are safe to lose and times every call.
+
+    Completion markers (mark_upsert_complete) and etag-only updates are held in memory
+    and written in bulk by flush(), which the pipeline calls at stage boundaries; they
+    are also flushed once flush_every of them are pending. Everything else goes
+    straight through, in particular the upsert that records a document as incomplete
+    before its points are written, and it first drops that document's deferred writes
+    so an older completion marker can never be flushed over a newer incomplete record.
+    A crash can therefore only lose completion markers, and a document without one is
+    ingested again on the next run; it is never taken as complete too early.
+
+    Reads see the deferred writes. With write_behind False every write goes through
+    at once; calls are timed either way (stats()).
+    """
+
+    def __init__(self, store, write_behind: bool = STATE_WRITE_BEHIND, flush_every: int = STATE_FLUSH_EVERY):
+        self.store = store
+        self.name = getattr(store, "name", type(store).__name__)
+        # The Mongo database the journal, leases and chunk text store share; None for SQLite
+        self.db = getattr(store, "db", None)
+        self.write_behind = write_behind
+        self.flush_every = flush_every
+        self._lock = threading.RLock()
+        self._pending_etags: dict[str, str] = {}
+        self._pending_complete: set[str] = set()
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.deferred = 0
+        self.flushes = 0
+
+    def _call(self, operation: str, method: str, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return getattr(self.store, method)(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._stats_lock:
+                self.seconds[operation] += elapsed
+                self.calls[operation] += 1
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending_etags) + len(self._pending_complete)
+
+    def pending_doc_ids(self) -> set[str]:
+        with self._lock:
+            return set(self._pending_etags) | self._pending_complete
+
+    def _apply_pending(self, state: DocumentState) -> DocumentState:
+        etag = self._pending_etags.get(state.doc_id, state.etag)
+        completed = state.upsert_completed or state.doc_id in self._pending_complete
+        if etag == state.etag and completed == state.upsert_completed:
+            return state
+        return replace(state, etag=etag, upsert_completed=completed)
+
+    def _forget(self, doc_ids):
+        for doc_id in doc_ids:
+            self._pending_etags.pop(doc_id, None)
+            self._pending_complete.discard(doc_id)
+
+    def _defer(self):
+        self.deferred += 1
+        if self.pending < self.flush_every:
+            return
+        try:
+            self.flush()
+        except Exception as e:
+            # Still pending; the next flush retries them
+            print(f"Warning: state flush failed: {e} ({self.pending} write(s) still pending)")
+
+    def get(self, doc_id: str) -> Optional[DocumentState]:
+        state = self._call("get", "get", doc_id)
+        if state is None:
+            return None
+        with self._lock:
+            return self._apply_pending(state)
+
+    def load_all(self) -> dict[str, DocumentState]:
+        states = self._call("load_all", "load_all")
+        with self._lock:
+            return {doc_id: self._apply_pending(state) for doc_id, state in states.items()}
+
+    def get_all_doc_ids(self) -> set[str]:
+        return self._call("get_all_doc_ids", "get_all_doc_ids")
+
+    def upsert(self, doc_id: str, etag: str, checksum: str, upsert_completed: bool = False):
+        with self._lock:
+            self._forget([doc_id])
+            self._call("upsert", "upsert", doc_id, etag, checksum, upsert_completed=upsert_completed)
+
+    def bulk_upsert(self, records: list[tuple[str, str, str]], upsert_completed: bool = False) -> int:
+        with self._lock:
+            self._forget(doc_id for doc_id, _, _ in records)
+            return self._call("bulk_upsert", "bulk_upsert", records, upsert_completed=upsert_completed)
+
+    def update_etag_only(self, doc_id: str, etag: str):
+        with self._lock:
+            if not self.write_behind:
+                self._call("update_etag", "update_etag_only", doc_id, etag)
+                return
+            self._pending_etags[doc_id] = etag
+            self._defer()
+
+    def bulk_update_etags(self, etags: dict[str, str]) -> int:
+        with self._lock:
+            for doc_id in etags:
+                self._pending_etags.pop(doc_id, None)
+            return self._call("bulk_update_etags", "bulk_update_etags", etags)
+
+    def mark_upsert_complete(self, doc_id: str):
+        with self._lock:
+            if not self.write_behind:
+                self._call("mark_complete", "mark_upsert_complete", doc_id)
+                return
+            self._pending_complete.add(doc_id)
+            self._defer()
+
+    def delete(self, doc_id: str):
+        with self._lock:
+            self._forget([doc_id])
+            self._call("delete", "delete", doc_id)
+
+    def delete_many(self, doc_ids: list[str]) -> int:
+        with self._lock:
+            self._forget(doc_ids)
+            return self._call("delete_many", "delete_many", doc_ids)
+
+    def status_summary(self) -> dict:
+        self.flush()
+        return self._call("status_summary", "status_summary")
+
+    def flush(self) -> int:
+        """Write the deferred etag updates, then the completion markers; returns how many were written.
+
+        On failure the writes stay pending and the error is raised.
+        """
+        with self._lock:
+            if not self.pending:
+                return 0
+            etags, complete = self._pending_etags, self._pending_complete
+            self._pending_etags, self._pending_complete = {}, set()
+            written = 0
+            try:
+                if etags:
+                    self._call("bulk_update_etags", "bulk_update_etags", etags)
+                    written, etags = len(etags), {}
+                if complete:
+                    self._call("bulk_mark_complete", "bulk_mark_upsert_complete", sorted(complete))
+                    written += len(complete)
+            except Exception:
+                self._pending_etags.update(etags)
+                self._pending_complete.update(complete)
+                raise
+            self.flushes += 1
+            return written
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            seconds, calls = dict(self.seconds), dict(self.calls)
+        return {
+            "backend": self.name,
+            "write_behind": self.write_behind,
+            "seconds": round(sum(seconds.values()), 4),
+            "calls": sum(calls.values()),
+            "deferred_writes": self.deferred,
+            "flushes": self.flushes,
+            "by_operation": {
+                operation: {"calls": calls[operation], "seconds": round(elapsed, 4)}
+                for operation, elapsed in sorted(seconds.items(), key=lambda item: -item[1])
+            },
+        }
@@ -1,3 +1,4 @@
 from .checksum import compute_file_checksum
+from .paths import DATA_DIR, data_path
 
-__all__ = ["compute_file_checksum"]
+__all__ = ["compute_file_checksum", "DATA_DIR", "data_path"]
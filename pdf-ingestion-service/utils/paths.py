@@ -0,0 +1,11 @@
+import os
+
+
+DATA_DIR = os.getenv("INGESTION_DATA_DIR", "data")
+
+
+def data_path(*parts: str) -> str:
+    """Path under INGESTION_DATA_DIR for local ingestion artifacts; parent dirs are created."""
+    path = os.path.join(DATA_DIR, *parts)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return path
@@ -1,3 +1,14 @@
-from .qdrant_client import QdrantVectorStore
+from .qdrant_client import QdrantVectorStore, WRITE_STRATEGY, VERSION_FIELD, CONTENT_HASH_FIELD, content_hash
+from .collection_config import CollectionSpec, ensure_collection
+from .reindex import BlueGreenReindexer
 
-__all__ = ["QdrantVectorStore"]
+__all__ = [
+    "QdrantVectorStore",
+    "WRITE_STRATEGY",
+    "VERSION_FIELD",
+    "CONTENT_HASH_FIELD",
+    "content_hash",
+    "CollectionSpec",
+    "ensure_collection",
+    "BlueGreenReindexer",
+]
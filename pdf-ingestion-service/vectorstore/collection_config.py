@@ -0,0 +1,193 @@
+import os
+from typing import Optional
+from dataclasses import dataclass, field
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    Distance,
+    VectorParams,
+    VectorParamsDiff,
+    HnswConfigDiff,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    PayloadSchemaType,
+    Disabled,
+    SparseVectorParams,
+    SparseIndexParams,
+    Modifier,
+)
+from sparse import SPARSE_VECTORS_ENABLED, SPARSE_VECTOR_NAME
+
+
+DEFAULT_PAYLOAD_INDEXES = {
+    "doc_id": PayloadSchemaType.KEYWORD,
+    "domain": PayloadSchemaType.KEYWORD,
+    "doc_type": PayloadSchemaType.KEYWORD,
+    # Versioned writes sweep a document's points from older versions with a filter on this
+    "ingest_version": PayloadSchemaType.INTEGER,
+}
+
+
+@dataclass
+class CollectionSpec:
+    vector_size: int
+    distance: Distance = Distance.COSINE
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    scalar_quantization: bool = False
+    vectors_on_disk: bool = False
+    # Named sparse (BM25) vector stored next to the unnamed dense vector; None for dense only
+    sparse_vector_name: Optional[str] = None
+    payload_indexes: dict[str, PayloadSchemaType] = field(default_factory=lambda: dict(DEFAULT_PAYLOAD_INDEXES))
+
+    @classmethod
+    def from_env(cls, vector_size: int) -> "CollectionSpec":
+        """Build the declared spec from QDRANT_* environment variables.
+
+        With QDRANT_QUANTIZATION=int8 the int8 vectors stay in RAM and the
+        float32 originals move to disk unless QDRANT_VECTORS_ON_DISK says otherwise.
+        """
+        quantization = os.getenv("QDRANT_QUANTIZATION", "none").lower() == "int8"
+        on_disk_default = "true" if quantization else "false"
+        return cls(
+            vector_size=vector_size,
+            hnsw_m=int(os.getenv("QDRANT_HNSW_M", "16")),
+            hnsw_ef_construct=int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "100")),
+            scalar_quantization=quantization,
+            vectors_on_disk=os.getenv("QDRANT_VECTORS_ON_DISK", on_disk_default).lower() == "true",
+            sparse_vector_name=SPARSE_VECTOR_NAME if SPARSE_VECTORS_ENABLED else None,
+        )
+
+    def vectors_config(self) -> VectorParams:
+        return VectorParams(
+            size=self.vector_size,
+            distance=self.distance,
+            on_disk=self.vectors_on_disk,
+        )
+
+    def sparse_vectors_config(self) -> Optional[dict[str, SparseVectorParams]]:
+        if not self.sparse_vector_name:
+            return None
+        # Stored values are BM25 term weights; Qdrant applies the IDF at query time
+        return {
+            self.sparse_vector_name: SparseVectorParams(
+                index=SparseIndexParams(on_disk=self.vectors_on_disk),
+                modifier=Modifier.IDF,
+            )
+        }
+
+    def hnsw_config(self) -> HnswConfigDiff:
+        return HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct)
+
+    def quantization_config(self) -> Optional[ScalarQuantization]:
+        if not self.scalar_quantization:
+            return None
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8,
+                always_ram=True,
+            )
+        )
+
+
+def get_alias_targets(client: QdrantClient) -> dict[str, str]:
+    """Map alias name -> collection name for every alias on the server."""
+    return {
+        alias.alias_name: alias.collection_name
+        for alias in client.get_aliases().aliases
+    }
+
+
+def create_payload_indexes(client: QdrantClient, collection_name: str, spec: CollectionSpec, existing: Optional[set[str]] = None):
+    existing = existing or set()
+    for field_name, schema in spec.payload_indexes.items():
+        if field_name in existing:
+            continue
+        print(f"  Creating payload index {collection_name}.{field_name} ({schema.value})")
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=schema,
+            wait=True,
+        )
+
+
+def create_collection(client: QdrantClient, collection_name: str, spec: CollectionSpec, optimizers_config=None):
+    print(f"Creating Qdrant collection {collection_name} (m={spec.hnsw_m}, ef_construct={spec.hnsw_ef_construct}, int8={spec.scalar_quantization}, on_disk={spec.vectors_on_disk})")
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config=spec.vectors_config(),
+        sparse_vectors_config=spec.sparse_vectors_config(),
+        hnsw_config=spec.hnsw_config(),
+        quantization_config=spec.quantization_config(),
+        optimizers_config=optimizers_config,
+    )
+    create_payload_indexes(client, collection_name, spec)
+
+
+def _config_differences(info, spec: CollectionSpec) -> list[str]:
+    differences = []
+    vectors = info.config.params.vectors
+    hnsw = info.config.hnsw_config
+
+    if hnsw.m != spec.hnsw_m or hnsw.ef_construct != spec.hnsw_ef_construct:
+        differences.append(f"hnsw (m={hnsw.m}, ef_construct={hnsw.ef_construct})")
+
+    has_quantization = info.config.quantization_config is not None
+    if has_quantization != spec.scalar_quantization:
+        differences.append(f"quantization (enabled={has_quantization})")
+
+    if bool(getattr(vectors, "on_disk", False)) != spec.vectors_on_disk:
+        differences.append(f"vectors on_disk ({bool(getattr(vectors, 'on_disk', False))})")
+
+    return differences
+
+
+def ensure_collection(client: QdrantClient, collection_name: str, spec: CollectionSpec) -> set[str]:
+    """Create the collection from spec, or migrate an existing one towards it.
+
+    HNSW, quantization and on-disk settings are updated in place (Qdrant rebuilds
+    the affected segments in the background) and missing payload indexes are added.
+    A vector size or distance mismatch, or a missing sparse vector, cannot be migrated
+    in place and needs a reindex. Returns the sparse vector names the collection has.
+    """
+    collection_names = {c.name for c in client.get_collections().collections}
+    aliases = get_alias_targets(client)
+
+    if collection_name in aliases:
+        # Writes go through the alias; provision the collection it points to
+        collection_name = aliases[collection_name]
+    elif collection_name not in collection_names:
+        create_collection(client, collection_name, spec)
+        return set(spec.sparse_vectors_config() or {})
+
+    info = client.get_collection(collection_name)
+    vectors = info.config.params.vectors
+
+    if isinstance(vectors, VectorParams) and (vectors.size != spec.vector_size or vectors.distance != spec.distance):
+        print(
+            f"Warning: {collection_name} has size={vectors.size}, distance={vectors.distance} "
+            f"but {spec.vector_size}/{spec.distance} is declared; run a full reindex to migrate"
+        )
+
+    sparse_names = set(info.config.params.sparse_vectors or {})
+    if spec.sparse_vector_name and spec.sparse_vector_name not in sparse_names:
+        print(
+            f"Warning: {collection_name} has no sparse vector {spec.sparse_vector_name!r}; "
+            f"chunks are stored dense-only until a full reindex adds it"
+        )
+
+    differences = _config_differences(info, spec)
+    if differences:
+        print(f"Migrating {collection_name} config: {', '.join(differences)}")
+        quantization = spec.quantization_config()
+        client.update_collection(
+            collection_name=collection_name,
+            vectors_config={"": VectorParamsDiff(on_disk=spec.vectors_on_disk)},
+            hnsw_config=spec.hnsw_config(),
+            # Dropping an existing quantization has to be requested explicitly
+            quantization_config=quantization if quantization is not None else Disabled.DISABLED,
+        )
+
+    create_payload_indexes(client, collection_name, spec, existing=set(info.payload_schema or {}))
+    return sparse_names
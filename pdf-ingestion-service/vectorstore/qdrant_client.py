@@ -1,43 +1,79 @@
 import os
 import time
+import json
+import hashlib
 from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
+from qdrant_client.models import PointStruct, SparseVector, Filter, FieldCondition, MatchValue, MatchAny, HasIdCondition
+from observability import metrics
+from .collection_config import CollectionSpec, ensure_collection
 
 
 COLLECTION_NAME = "legal_documents"
 VECTOR_DIMENSION = 384
+UPSERT_PARALLELISM = int(os.getenv("QDRANT_UPSERT_PARALLELISM", "1"))
+MAX_BATCH_BYTES = int(os.getenv("QDRANT_MAX_BATCH_BYTES", str(4 * 1024 * 1024)))
+PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true"
+DELETE_CHUNK_SIZE = int(os.getenv("QDRANT_DELETE_CHUNK_SIZE", "500"))
+# JSON-encoded float32 components average roughly this many bytes each
+VECTOR_BYTES_PER_COMPONENT = 12
+# A sparse entry is an index and a value
+SPARSE_BYTES_PER_ENTRY = 2 * VECTOR_BYTES_PER_COMPONENT
+# "versioned": upsert a document's new points, then sweep its points from older versions;
+# "delete_first": delete all of its points, then upsert (the document is briefly unsearchable)
+WRITE_STRATEGY = os.getenv("QDRANT_WRITE_STRATEGY", "versioned").lower()
+VERSION_FIELD = "ingest_version"
+CONTENT_HASH_FIELD = "content_hash"
+
+
+def content_hash(text: str, payload: dict) -> str:
+    """Fingerprint of what a point stores besides its vectors, which are derived from the same text."""
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8)
+    digest.update(json.dumps(payload, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
 
 
 class QdrantVectorStore:
-    def __init__(self, url: Optional[str] = None, batch_size: int = 100, max_retries: int = 3):
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        batch_size: int = 100,
+        max_retries: int = 3,
+        parallelism: int = UPSERT_PARALLELISM,
+        max_batch_bytes: int = MAX_BATCH_BYTES,
+        prefer_grpc: bool = PREFER_GRPC,
+        collection_spec: Optional[CollectionSpec] = None,
+        collection_name: str = COLLECTION_NAME,
+        client: Optional[QdrantClient] = None,
+        ensure: bool = True,
+    ):
         self.url = url or os.getenv("QDRANT_URL", "http://localhost:6333")
-        self.client = QdrantClient(url=self.url, timeout=60)
+        self.client = client or QdrantClient(url=self.url, timeout=60, prefer_grpc=prefer_grpc)
+        self.collection_name = collection_name
         self.batch_size = batch_size
         self.max_retries = max_retries
-        self._ensure_collection()
+        self.parallelism = max(1, parallelism)
+        self.max_batch_bytes = max_batch_bytes
+        self.collection_spec = collection_spec or CollectionSpec.from_env(VECTOR_DIMENSION)
+        # Cleared when the existing collection predates the sparse vector
+        self.sparse_vector_name = self.collection_spec.sparse_vector_name
+        if ensure:
+            self._ensure_collection()
     
     def _ensure_collection(self):
-        collections = self.client.get_collections().collections
-        collection_names = [c.name for c in collections]
-        
-        if COLLECTION_NAME not in collection_names:
-            self.client.create_collection(
-                collection_name=COLLECTION_NAME,
-                vectors_config=VectorParams(
-                    size=VECTOR_DIMENSION,
-                    distance=Distance.COSINE
-                )
-            )
+        sparse_names = ensure_collection(self.client, self.collection_name, self.collection_spec)
+        if self.sparse_vector_name not in sparse_names:
+            self.sparse_vector_name = None
     
-    def _upsert_batch_with_retry(self, points: list[PointStruct], batch_num: int, total_batches: int) -> tuple[bool, Optional[str]]:
+    def _upsert_batch_with_retry(self, points: list[PointStruct], batch_num: int, total_batches: int, wait: bool = True) -> tuple[bool, Optional[str]]:
         """Upsert a single batch with exponential backoff retry logic."""
         for attempt in range(self.max_retries):
             try:
                 self.client.upsert(
-                    collection_name=COLLECTION_NAME,
+                    collection_name=self.collection_name,
                     points=points,
-                    wait=True
+                    wait=wait
                 )
                 print(f"    Batch {batch_num}/{total_batches}: ✓ {len(points)} points upserted")
                 return (True, None)
@@ -45,6 +81,7 @@ class QdrantVectorStore:
                 error_msg = str(e)
                 if attempt < self.max_retries - 1:
                     wait_time = 2 ** attempt
+                    metrics.retries.inc(component="qdrant_upsert")
                     print(f"    Batch {batch_num}/{total_batches} failed (attempt {attempt + 1}/{self.max_retries}): {error_msg}. Retrying in {wait_time}s...")
                     time.sleep(wait_time)
                 else:
@@ -53,8 +90,123 @@ class QdrantVectorStore:
         
         return (False, "Max retries exceeded")
     
-    def upsert_chunks(self, chunk_data: list[dict]) -> tuple[bool, str]:
-        """Upsert chunks in batches with retry logic. Returns (success, error_message)."""
+    @staticmethod
+    def _estimate_point_bytes(point: PointStruct) -> int:
+        payload_bytes = len(json.dumps(point.payload, ensure_ascii=False, default=str)) if point.payload else 0
+        sparse_bytes = 0
+        if isinstance(point.vector, dict):
+            sparse_bytes = sum(
+                len(vector.indices) * SPARSE_BYTES_PER_ENTRY
+                for vector in point.vector.values() if isinstance(vector, SparseVector)
+            )
+        return payload_bytes + VECTOR_DIMENSION * VECTOR_BYTES_PER_COMPONENT + sparse_bytes
+    
+    def _plan_batches(self, points: list[PointStruct]) -> list[list[PointStruct]]:
+        """Split points into batches bounded by max_batch_bytes and batch_size."""
+        batches = []
+        current = []
+        current_bytes = 0
+        
+        for point in points:
+            point_bytes = self._estimate_point_bytes(point)
+            if current and (
+                current_bytes + point_bytes > self.max_batch_bytes
+                or len(current) >= self.batch_size
+            ):
+                batches.append(current)
+                current = []
+                current_bytes = 0
+            current.append(point)
+            current_bytes += point_bytes
+        
+        if current:
+            batches.append(current)
+        
+        return batches
+    
+    def _upsert_batches_sequential(self, batches: list[tuple[int, list[PointStruct]]], num_batches: int, on_batch_done=None) -> tuple[bool, str]:
+        for batch_num, batch in batches:
+            success, error = self._upsert_batch_with_retry(batch, batch_num, num_batches)
+            if not success:
+                return (False, f"Batch {batch_num}/{num_batches} failed: {error}")
+            if on_batch_done:
+                on_batch_done(batch_num)
+        return (True, "")
+    
+    def _upsert_batches_parallel(self, batches: list[tuple[int, list[PointStruct]]], num_batches: int, on_batch_done=None) -> tuple[bool, str]:
+        """Send all but the last batch concurrently with wait=False, then the last with wait=True.
+        
+        Qdrant applies a collection's updates in WAL order, so once the final write is
+        acknowledged every earlier one has been applied or has failed. A wait=False
+        acknowledgement does not report that failure, so the earlier batches are read
+        back and any not applied are resent with wait=True. Batches are only reported
+        done after that check.
+        """
+        intermediate = batches[:-1]
+        
+        if intermediate:
+            with ThreadPoolExecutor(max_workers=self.parallelism) as executor:
+                futures = [
+                    (batch_num, executor.submit(self._upsert_batch_with_retry, batch, batch_num, num_batches, False))
+                    for batch_num, batch in intermediate
+                ]
+                for batch_num, future in futures:
+                    success, error = future.result()
+                    if not success:
+                        return (False, f"Batch {batch_num}/{num_batches} failed: {error}")
+        
+        last_num, last_batch = batches[-1]
+        success, error = self._upsert_batch_with_retry(last_batch, last_num, num_batches, True)
+        if not success:
+            return (False, f"Batch {last_num}/{num_batches} failed: {error}")
+        
+        for batch_num, batch in intermediate:
+            try:
+                applied = self._batch_applied(batch)
+            except Exception as e:
+                return (False, f"Batch {batch_num}/{num_batches} could not be verified: {e}")
+            if applied:
+                continue
+            print(f"    Batch {batch_num}/{num_batches} was acknowledged but not applied, resending")
+            success, error = self._upsert_batch_with_retry(batch, batch_num, num_batches, True)
+            if not success:
+                return (False, f"Batch {batch_num}/{num_batches} failed: {error}")
+        
+        if on_batch_done:
+            for batch_num, _ in batches:
+                on_batch_done(batch_num)
+        return (True, "")
+    
+    def _batch_applied(self, batch: list[PointStruct]) -> bool:
+        """Whether every point of the batch is stored with the content hash and version it was sent with."""
+        fields = [CONTENT_HASH_FIELD, VERSION_FIELD]
+        stored = {
+            str(point.id): point.payload or {}
+            for point in self.client.retrieve(
+                collection_name=self.collection_name,
+                ids=[point.id for point in batch],
+                with_payload=fields,
+                with_vectors=False
+            )
+        }
+        for point in batch:
+            payload = stored.get(str(point.id))
+            if payload is None:
+                return False
+            if any(field in point.payload and payload.get(field) != point.payload[field] for field in fields):
+                return False
+        return True
+    
+    def upsert_chunks(self, chunk_data: list[dict], skip_batches: Optional[set[int]] = None, on_batch_done=None) -> tuple[bool, str]:
+        """Upsert chunks in batches with retry logic. Returns (success, error_message).
+        
+        An item's "sparse_vector" ({"indices", "values"}) is stored as the collection's
+        named sparse vector when it has one.
+        
+        Batches are numbered from 1 in a deterministic order for the same chunk_data;
+        skip_batches leaves out batches already written, and on_batch_done(batch_num)
+        is called once a batch is acknowledged.
+        """
         if not chunk_data:
             return (True, "")
         
@@ -75,6 +227,10 @@ class QdrantVectorStore:
                 validation_failures += 1
                 continue
             
+            sparse_vector = item.get("sparse_vector")
+            if self.sparse_vector_name and sparse_vector:
+                vector = {"": vector, self.sparse_vector_name: SparseVector(**sparse_vector)}
+            
             points.append(
                 PointStruct(
                     id=chunk_id,
@@ -90,27 +246,42 @@ class QdrantVectorStore:
             return (False, f"All {validation_failures} chunks failed validation")
         
         # Batch upsert with all-or-nothing semantics
-        total_points = len(points)
-        num_batches = (total_points + self.batch_size - 1) // self.batch_size
+        all_batches = self._plan_batches(points)
+        num_batches = len(all_batches)
+        skip_batches = skip_batches or set()
+        batches = [
+            (batch_num, batch)
+            for batch_num, batch in enumerate(all_batches, 1)
+            if batch_num not in skip_batches
+        ]
+        total_points = sum(len(batch) for _, batch in batches)
         
-        print(f"  Upserting {total_points} points in {num_batches} batch(es)...")
+        if not batches:
+            print(f"  All {num_batches} batch(es) already upserted")
+            return (True, "")
         
-        for i in range(0, total_points, self.batch_size):
-            batch = points[i:i + self.batch_size]
-            batch_num = (i // self.batch_size) + 1
-            
-            success, error = self._upsert_batch_with_retry(batch, batch_num, num_batches)
-            
-            if not success:
-                return (False, f"Batch {batch_num}/{num_batches} failed: {error}")
+        skipped_note = f", {num_batches - len(batches)} already done" if len(batches) < num_batches else ""
+        print(f"  Upserting {total_points} points in {len(batches)} batch(es){skipped_note} (parallelism: {self.parallelism})...")
+        
+        start = time.perf_counter()
+        if self.parallelism > 1 and len(batches) > 1:
+            success, error = self._upsert_batches_parallel(batches, num_batches, on_batch_done)
+        else:
+            success, error = self._upsert_batches_sequential(batches, num_batches, on_batch_done)
+        elapsed = time.perf_counter() - start
         
+        if not success:
+            return (False, error)
+        
+        points_per_second = total_points / elapsed if elapsed > 0 else 0.0
+        print(f"  Upserted {total_points} points in {elapsed:.2f}s ({points_per_second:.1f} points/s)")
         return (True, "")
     
     def delete_by_doc_id(self, doc_id: str) -> tuple[bool, Optional[str]]:
         """Delete all chunks for a single document. Returns (success, error_message)."""
         try:
             self.client.delete(
-                collection_name=COLLECTION_NAME,
+                collection_name=self.collection_name,
                 points_selector=Filter(
                     must=[
                         FieldCondition(
@@ -125,26 +296,134 @@ class QdrantVectorStore:
         except Exception as e:
             return (False, str(e))
     
-    def delete_by_doc_ids(self, doc_ids: list[str]) -> int:
-        if not doc_ids:
-            return 0
-        
-        deleted_count = 0
+    def unchanged_chunk_ids(self, chunk_data: list[dict]) -> set[str]:
+        """chunk_ids whose stored point already has the item's content_hash, so rewriting it changes nothing."""
+        hashes = {
+            item["chunk_id"]: item["payload"][CONTENT_HASH_FIELD]
+            for item in chunk_data
+            if item.get("payload") and item["payload"].get(CONTENT_HASH_FIELD)
+        }
+        chunk_ids = list(hashes)
+        unchanged = set()
+        for i in range(0, len(chunk_ids), DELETE_CHUNK_SIZE):
+            points = self.client.retrieve(
+                collection_name=self.collection_name,
+                ids=chunk_ids[i:i + DELETE_CHUNK_SIZE],
+                with_payload=[CONTENT_HASH_FIELD],
+                with_vectors=False
+            )
+            for point in points:
+                chunk_id = str(point.id)
+                if (point.payload or {}).get(CONTENT_HASH_FIELD) == hashes.get(chunk_id):
+                    unchanged.add(chunk_id)
+        return unchanged
+    
+    def delete_stale_points(self, doc_id: str, version: int, keep_ids: Optional[set[str]] = None) -> tuple[bool, Optional[str]]:
+        """Delete a document's points not written at version, in one filtered delete.
         
-        for doc_id in doc_ids:
-            result = self.client.delete(
-                collection_name=COLLECTION_NAME,
+        keep_ids are points left at an older version because their content did not change.
+        Points written before versioning have no version and are swept too.
+        """
+        must_not = [FieldCondition(key=VERSION_FIELD, match=MatchValue(value=version))]
+        if keep_ids:
+            must_not.append(HasIdCondition(has_id=sorted(keep_ids)))
+        try:
+            self.client.delete(
+                collection_name=self.collection_name,
                 points_selector=Filter(
                     must=[
                         FieldCondition(
                             key="doc_id",
                             match=MatchValue(value=doc_id)
                         )
-                    ]
+                    ],
+                    must_not=must_not
+                ),
+                wait=True
+            )
+            return (True, None)
+        except Exception as e:
+            return (False, str(e))
+    
+    @staticmethod
+    def _doc_ids_filter(doc_ids: list[str]) -> Filter:
+        return Filter(
+            must=[
+                FieldCondition(
+                    key="doc_id",
+                    match=MatchAny(any=doc_ids)
                 )
+            ]
+        )
+    
+    def count_by_doc_ids(self, doc_ids: list[str]) -> int:
+        total = 0
+        for i in range(0, len(doc_ids), DELETE_CHUNK_SIZE):
+            result = self.client.count(
+                collection_name=self.collection_name,
+                count_filter=self._doc_ids_filter(doc_ids[i:i + DELETE_CHUNK_SIZE]),
+                exact=True
             )
-            
-            if result and hasattr(result, "operation_id"):
-                deleted_count += 1
+            total += result.count
+        return total
+    
+    def delete_by_doc_ids(self, doc_ids: list[str], wait: bool = True) -> int:
+        """Delete all points of many documents with one MatchAny filter per chunk of doc_ids.
+        
+        Returns the number of points removed, measured by counting before and after.
+        With wait=False the deletes are only queued, so the pre-delete count is returned.
+        """
+        if not doc_ids:
+            return 0
+        
+        points_before = self.count_by_doc_ids(doc_ids)
+        if points_before == 0:
+            return 0
+        
+        for i in range(0, len(doc_ids), DELETE_CHUNK_SIZE):
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=self._doc_ids_filter(doc_ids[i:i + DELETE_CHUNK_SIZE]),
+                wait=wait
+            )
+        
+        if not wait:
+            return points_before
+        
+        points_after = self.count_by_doc_ids(doc_ids)
+        return points_before - points_after
+    
+    def retrieve_vectors(self, chunk_ids: list[str]) -> dict[str, tuple[list[float], Optional[str]]]:
+        """Stored (vector, content hash) by chunk_id; ids that are not in the collection are left out."""
+        if not chunk_ids:
+            return {}
+        
+        points = self.client.retrieve(
+            collection_name=self.collection_name,
+            ids=chunk_ids,
+            with_payload=[CONTENT_HASH_FIELD],
+            with_vectors=True
+        )
+        vectors = {}
+        for point in points:
+            vector = point.vector
+            if isinstance(vector, dict):
+                # Collections with a sparse vector return every named vector; "" is the dense one
+                vector = vector.get("")
+            if vector is not None:
+                vectors[str(point.id)] = (vector, (point.payload or {}).get(CONTENT_HASH_FIELD))
+        return vectors
+    
+    def keyword_search(self, query_vector: dict, limit: int = 12) -> list:
+        """Top points for a sparse query ({"indices", "values"}) against the BM25 vector."""
+        if not self.sparse_vector_name or not query_vector:
+            return []
         
-        return deleted_count
+        result = self.client.query_points(
+            collection_name=self.collection_name,
+            query=SparseVector(**query_vector),
+            using=self.sparse_vector_name,
+            limit=limit,
+            with_payload=True
+        )
+        return result.points
@@ -0,0 +1,203 @@
+import os
+import time
+from datetime import datetime
+from typing import Optional
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    OptimizersConfigDiff,
+    CollectionStatus,
+    CreateAlias,
+    CreateAliasOperation,
+    DeleteAlias,
+    DeleteAliasOperation,
+    PointStruct,
+)
+from .collection_config import CollectionSpec, create_collection, create_payload_indexes, get_alias_targets
+from .qdrant_client import QdrantVectorStore, COLLECTION_NAME, VECTOR_DIMENSION
+
+
+# Qdrant's default; segments above this many KB of vectors get an HNSW index
+INDEXING_THRESHOLD_KB = int(os.getenv("QDRANT_INDEXING_THRESHOLD_KB", "20000"))
+REINDEX_UPSERT_PARALLELISM = int(os.getenv("QDRANT_REINDEX_PARALLELISM", "8"))
+OPTIMIZE_TIMEOUT_SECONDS = int(os.getenv("QDRANT_OPTIMIZE_TIMEOUT_SECONDS", "1800"))
+OPTIMIZE_POLL_SECONDS = 2
+# Version slot for the copy of a pre-alias physical collection; sorts before every timestamp
+LEGACY_VERSION = "00000000000000"
+COPY_BATCH_SIZE = 256
+
+
+class BlueGreenReindexer:
+    """Full rebuild into a fresh versioned collection, published by moving an alias.
+
+    The staging collection is created with HNSW indexing disabled so bulk loading only
+    appends to segments; indexing is enabled once, after the last point is written.
+    Readers keep using the alias (COLLECTION_NAME) and see the previous collection until
+    the swap. Previous versions are kept for rollback().
+    """
+
+    def __init__(self, client: QdrantClient, alias_name: str = COLLECTION_NAME, spec: Optional[CollectionSpec] = None):
+        self.client = client
+        self.alias_name = alias_name
+        self.spec = spec or CollectionSpec.from_env(VECTOR_DIMENSION)
+        self.staging_name: Optional[str] = None
+        # Set once publish() has moved the alias to the staging collection
+        self.published = False
+
+    def list_versions(self) -> list[str]:
+        prefix = f"{self.alias_name}_v"
+        return sorted(
+            c.name for c in self.client.get_collections().collections
+            if c.name.startswith(prefix)
+        )
+
+    def current_target(self) -> Optional[str]:
+        return get_alias_targets(self.client).get(self.alias_name)
+
+    def create_staging(self) -> QdrantVectorStore:
+        """Create the next versioned collection and return a bulk-load store for it."""
+        self.staging_name = f"{self.alias_name}_v{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
+        create_collection(
+            self.client,
+            self.staging_name,
+            self.spec,
+            optimizers_config=OptimizersConfigDiff(indexing_threshold=0),
+        )
+        return QdrantVectorStore(
+            client=self.client,
+            collection_name=self.staging_name,
+            collection_spec=self.spec,
+            parallelism=REINDEX_UPSERT_PARALLELISM,
+            ensure=False,
+        )
+
+    def _wait_for_optimization(self, collection_name: str) -> bool:
+        deadline = time.monotonic() + OPTIMIZE_TIMEOUT_SECONDS
+        # Give the optimizer a moment to pick up the new threshold before polling
+        time.sleep(OPTIMIZE_POLL_SECONDS)
+        while time.monotonic() < deadline:
+            info = self.client.get_collection(collection_name)
+            if info.status == CollectionStatus.GREEN:
+                return True
+            if info.status == CollectionStatus.RED:
+                print(f"  Collection {collection_name} reported RED status: {info.optimizer_status}")
+                return False
+            time.sleep(OPTIMIZE_POLL_SECONDS)
+        return False
+
+    def _point_alias_to(self, collection_name: str):
+        """Move the alias in a single aliases request so readers never see it missing."""
+        operations = []
+        if self.current_target() is not None:
+            operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=self.alias_name)))
+        operations.append(
+            CreateAliasOperation(
+                create_alias=CreateAlias(collection_name=collection_name, alias_name=self.alias_name)
+            )
+        )
+        self.client.update_collection_aliases(change_aliases_operations=operations)
+
+    def publish(self) -> tuple[bool, Optional[str]]:
+        """Enable indexing, wait for optimization, then atomically swap the alias.
+
+        On failure the alias still points at the previous collection; the caller abandon()s staging.
+        """
+        if not self.staging_name:
+            return (False, "No staging collection was created")
+
+        start = time.perf_counter()
+        print(f"Enabling HNSW indexing on {self.staging_name}...")
+        self.client.update_collection(
+            collection_name=self.staging_name,
+            optimizers_config=OptimizersConfigDiff(indexing_threshold=INDEXING_THRESHOLD_KB),
+        )
+
+        if not self._wait_for_optimization(self.staging_name):
+            return (False, f"{self.staging_name} did not finish optimizing within {OPTIMIZE_TIMEOUT_SECONDS}s")
+        print(f"  Indexing finished in {time.perf_counter() - start:.1f}s")
+
+        previous = self.current_target()
+        collection_names = {c.name for c in self.client.get_collections().collections}
+        replacing_physical = self.alias_name in collection_names
+        if replacing_physical:
+            # Qdrant cannot give an alias the name of a collection, so a physical collection
+            # holding it (pre-alias deployments) has to go. Copy it to a version first so the
+            # swap can fall back to it and rollback() can return to it later.
+            try:
+                previous = self._copy_physical_collection()
+            except Exception as e:
+                return (False, f"Could not copy {self.alias_name} before replacing it with an alias: {e}")
+            print(f"  Copied physical collection {self.alias_name} to {previous}; replacing it with an alias")
+            self.client.delete_collection(self.alias_name)
+
+        try:
+            self._point_alias_to(self.staging_name)
+        except Exception as e:
+            if replacing_physical:
+                # The alias request is atomic, so only the dropped physical collection left readers without one
+                self._restore_alias(previous)
+            return (False, f"Could not move alias {self.alias_name} to {self.staging_name}: {e}")
+        print(f"Alias {self.alias_name} -> {self.staging_name} (previous: {previous or 'none'})")
+        self.published = True
+        return (True, None)
+
+    def _copy_physical_collection(self) -> str:
+        """Copy the physical alias_name collection, with its own vector config, into the oldest version slot."""
+        legacy_name = f"{self.alias_name}_v{LEGACY_VERSION}"
+        if self.client.collection_exists(legacy_name):
+            # A copy left by an earlier publish that failed before dropping the original
+            self.client.delete_collection(legacy_name)
+        params = self.client.get_collection(self.alias_name).config.params
+        self.client.create_collection(
+            legacy_name,
+            vectors_config=params.vectors,
+            sparse_vectors_config=params.sparse_vectors,
+        )
+        create_payload_indexes(self.client, legacy_name, self.spec)
+        offset = None
+        while True:
+            records, offset = self.client.scroll(
+                self.alias_name, limit=COPY_BATCH_SIZE, offset=offset, with_payload=True, with_vectors=True
+            )
+            if records:
+                self.client.upsert(
+                    legacy_name,
+                    points=[PointStruct(id=r.id, vector=r.vector, payload=r.payload) for r in records],
+                    wait=True,
+                )
+            if offset is None:
+                break
+
+        expected = self.client.count(self.alias_name, exact=True).count
+        copied = self.client.count(legacy_name, exact=True).count
+        if copied != expected:
+            self.client.delete_collection(legacy_name)
+            raise RuntimeError(f"copied {copied} of {expected} points")
+        return legacy_name
+
+    def _restore_alias(self, collection_name: str):
+        try:
+            self._point_alias_to(collection_name)
+            print(f"  Alias {self.alias_name} restored to {collection_name}")
+        except Exception as e:
+            print(f"  Warning: could not restore alias {self.alias_name} to {collection_name}: {e} (run rollback)")
+
+    def rollback(self) -> tuple[bool, Optional[str]]:
+        """Point the alias back at the version before the current one."""
+        current = self.current_target()
+        versions = self.list_versions()
+        older = [v for v in versions if current is None or v < current]
+        if not older:
+            return (False, "No previous collection version to roll back to")
+
+        self._point_alias_to(older[-1])
+        print(f"Alias {self.alias_name} rolled back to {older[-1]}")
+        return (True, None)
+
+    def abandon(self):
+        """Drop a staging collection that will not be published."""
+        if self.staging_name:
+            try:
+                self.client.delete_collection(self.staging_name)
+            except Exception as e:
+                print(f"  Warning: could not drop staging collection {self.staging_name}: {e}")
+            self.staging_name = None
@@ -59,4 +59,8 @@ module.exports = {
     rerankerProtocol: (process.env.RERANKER_PROTOCOL || 'rest').toLowerCase(),
     embeddingRpcUrl: process.env.EMBEDDING_RPC_URL || null,
   },
+
+  pdfIngestion: {
+    url: process.env.PDF_INGESTION_URL || 'http://localhost:8003',
+  },
 }
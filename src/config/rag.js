@@ -6,6 +6,11 @@ const HYBRID_CANDIDATES = 15
 
 const RRF_K = 60
 
+// "qdrant": keyword search queries the BM25 sparse vectors written at ingestion
+// (when the collection has them); "memory": the in-process index warmed up at startup
+const LEGAL_KEYWORD_BACKEND = process.env.LEGAL_KEYWORD_BACKEND || 'qdrant'
+const LEGAL_SPARSE_VECTOR_NAME = process.env.LEGAL_SPARSE_VECTOR_NAME || 'bm25'
+
 const RERANK_MIN_SCORE = 0.45
 const MIN_RELEVANT_CHUNKS = 1
 
@@ -40,6 +45,8 @@ module.exports = {
   KEYWORD_TOP_K,
   HYBRID_CANDIDATES,
   RRF_K,
+  LEGAL_KEYWORD_BACKEND,
+  LEGAL_SPARSE_VECTOR_NAME,
   RERANK_MIN_SCORE,
   MIN_RELEVANT_CHUNKS,
   LAW_RERANK_MIN_SCORE,
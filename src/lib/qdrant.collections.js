@@ -88,9 +88,12 @@ async function initQdrantCollections() {
       }
     }
 
-    const hasLegal = existing.collections.some(
-      (c) => c.name === LEGAL_COLLECTION
-    )
+    // The ingestion service publishes full reindexes by pointing an alias at a
+    // versioned collection, so legal_documents may be an alias rather than a collection
+    const { aliases = [] } = await client.getAliases()
+    const hasLegal =
+      existing.collections.some((c) => c.name === LEGAL_COLLECTION) ||
+      aliases.some((a) => a.alias_name === LEGAL_COLLECTION)
 
     if (!hasLegal) {
       logger.info('Creating Qdrant collection: legal_documents')
@@ -0,0 +1,53 @@
+// Chunk text for legal points written with compact payloads
+// (QDRANT_PAYLOAD_MODE=compact in the ingestion service): Qdrant keeps only the
+// filter and citation fields, and the text sits in the ingestion service's chunk
+// text store (Mongo or SQLite, per CHUNK_TEXT_STORE). The service's
+// POST /chunks/texts reads whichever store it writes, so the API never reads it directly.
+
+const axios = require('axios')
+const config = require('../../config')
+const logger = require('../../utils/logger')
+
+// MAX_CHUNK_TEXT_LOOKUP in the ingestion service
+const CHUNK_TEXT_BATCH_SIZE = 1000
+const CHUNK_TEXT_TIMEOUT_MS = 10_000
+
+// chunk_id -> text for every id found, one request per CHUNK_TEXT_BATCH_SIZE ids
+const fetchChunkTexts = async (chunkIds) => {
+  const ids = [...new Set(chunkIds.filter(Boolean).map(String))]
+  const texts = new Map()
+
+  for (let i = 0; i < ids.length; i += CHUNK_TEXT_BATCH_SIZE) {
+    const { data } = await axios.post(
+      `${config.pdfIngestion.url}/chunks/texts`,
+      { chunk_ids: ids.slice(i, i + CHUNK_TEXT_BATCH_SIZE) },
+      { timeout: CHUNK_TEXT_TIMEOUT_MS }
+    )
+    for (const [chunkId, text] of Object.entries(data?.texts || {})) {
+      texts.set(chunkId, text)
+    }
+  }
+  return texts
+}
+
+// Fills result.text (and payload.text) for results whose point carried no text.
+// Each result needs chunkId, the Qdrant point id.
+const hydrateLegalTexts = async (results) => {
+  const missing = results.filter((r) => !r.text && r.chunkId)
+  if (missing.length === 0) return results
+
+  try {
+    const texts = await fetchChunkTexts(missing.map((r) => r.chunkId))
+    for (const r of missing) {
+      const text = texts.get(String(r.chunkId))
+      if (!text) continue
+      r.text = text
+      r.payload = { ...r.payload, text }
+    }
+  } catch (error) {
+    logger.warn(`Legal chunk text lookup failed: ${error.message}`)
+  }
+  return results
+}
+
+module.exports = { fetchChunkTexts, hydrateLegalTexts }
@@ -1,6 +1,14 @@
 const natural = require('natural')
 const { removeStopwords } = require('stopword')
-const { KEYWORD_TOP_K } = require('../../config/rag')
+const client = require('../../lib/qdrant.client')
+const { LEGAL_COLLECTION } = require('../../lib/qdrant.collections')
+const logger = require('../../utils/logger')
+const {
+  KEYWORD_TOP_K,
+  LEGAL_SPARSE_VECTOR_NAME,
+} = require('../../config/rag')
+const { encodeSparseQuery } = require('./legalSparseEncoder')
+const { makeLegalChunkKey } = require('./legalVectorRetriever')
 
 const tokenizer = new natural.WordTokenizer()
 
@@ -107,12 +115,47 @@ const indexLegalChunks = (chunks) => {
   for (const c of chunks) legalIndex.upsert(c.key, c.text, c.payload)
 }
 
+// Set once the collection is known to carry the ingestion-time BM25 sparse vectors
+let sparseSearchEnabled = false
+
+const enableSparseKeywordSearch = (enabled = true) => {
+  sparseSearchEnabled = enabled
+}
+
+const legalSparseKeywordSearch = async (query, topK) => {
+  const sparseQuery = encodeSparseQuery(query)
+  if (!sparseQuery) return []
+
+  try {
+    const res = await client.query(LEGAL_COLLECTION, {
+      query: sparseQuery,
+      using: LEGAL_SPARSE_VECTOR_NAME,
+      limit: topK,
+      with_payload: true,
+    })
+
+    return (res?.points || []).map((p) => ({
+      key: makeLegalChunkKey(p.payload),
+      chunkId: p.id,
+      text: p.payload?.text || '',
+      payload: p.payload,
+      keywordScore: p.score,
+    }))
+  } catch (error) {
+    logger.warn(`Legal sparse keyword search failed: ${error.message}`)
+    return []
+  }
+}
+
+// Array from the in-memory index, or a promise when the search runs in Qdrant
 const legalKeywordSearch = (query, topK = KEYWORD_TOP_K) => {
+  if (sparseSearchEnabled) return legalSparseKeywordSearch(query, topK)
   return legalIndex.search(query, topK)
 }
 
 module.exports = {
   legalKeywordSearch,
+  enableSparseKeywordSearch,
   indexLegalChunks,
   tokenize,
   normalizeText,
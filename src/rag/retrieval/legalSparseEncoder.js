@@ -0,0 +1,66 @@
+// Query side of the BM25 sparse vectors written by the ingestion service.
+// Kept in sync with pdf-ingestion-service/sparse/legal_tokenizer.py: a term must
+// tokenize and hash the same way here as it did when the chunk was indexed.
+
+const TOKEN_PATTERN = /[a-z0-9]+/g
+
+// Negations and modals ("not", "shall", "may", "must") are deliberately kept
+const STOPWORDS = new Set(
+  (
+    'a about above after again all am an and any are as at be because been before being ' +
+    'below between both but by can could did do does doing down during each few for from ' +
+    'further had has have having he her here hers herself him himself his how i if in into ' +
+    'is it its itself just me more most my myself now of off on once only or other our ours ' +
+    'ourselves out over own same she should so some such than that the their theirs them ' +
+    'themselves then there these they this those through to too until up very was we were ' +
+    'what when where which while who whom why will with would you your yours yourself yourselves'
+  ).split(' ')
+)
+
+const ABBREVIATIONS = {
+  sec: 'section',
+  secs: 'section',
+  sections: 'section',
+  art: 'article',
+  arts: 'article',
+  articles: 'article',
+  cl: 'clause',
+  clauses: 'clause',
+  vs: 'v',
+  versus: 'v',
+  govt: 'government',
+  hon: 'honourable',
+  ble: 'honourable',
+}
+
+const tokenizeLegal = (text) => {
+  const tokens = []
+  for (const raw of String(text || '').toLowerCase().match(TOKEN_PATTERN) || []) {
+    const token = ABBREVIATIONS[raw] || raw
+    if (STOPWORDS.has(token)) continue
+    if (token.length === 1 && token !== 'v' && !/[0-9]/.test(token)) continue
+    tokens.push(token)
+  }
+  return tokens
+}
+
+// FNV-1a, 32-bit; tokens are ASCII so char codes are the UTF-8 bytes
+const termId = (term) => {
+  let hash = 0x811c9dc5
+  for (let i = 0; i < term.length; i += 1) {
+    hash ^= term.charCodeAt(i)
+    hash = Math.imul(hash, 0x01000193) >>> 0
+  }
+  return hash >>> 0
+}
+
+// One entry per distinct term; the collection's IDF modifier weights them
+const encodeSparseQuery = (text) => {
+  const indices = [...new Set(tokenizeLegal(text).map(termId))].sort(
+    (a, b) => a - b
+  )
+  if (indices.length === 0) return null
+  return { indices, values: indices.map(() => 1) }
+}
+
+module.exports = { tokenizeLegal, termId, encodeSparseQuery }
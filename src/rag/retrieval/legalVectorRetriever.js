@@ -30,6 +30,7 @@ const legalVectorSearch = async (query, topK = VECTOR_TOP_K) => {
 
   return (results || []).map((r) => ({
     key: makeLegalChunkKey(r.payload),
+    chunkId: r.id,
     text: r.payload?.text || '',
     payload: r.payload,
     vectorScore: r.score,
@@ -1,5 +1,6 @@
 const { legalVectorSearch } = require('./legalVectorRetriever')
 const { legalKeywordSearch } = require('./legalKeywordRetriever')
+const { hydrateLegalTexts } = require('./legalChunkTexts')
 const { reciprocalRankFusion } = require('../scoring/reciprocalRankFusion')
 const {
   normalizeLegalQuery,
@@ -41,6 +42,7 @@ const multiQueryLegalRetrieve = async (query) => {
     if (!byKey.has(r.key)) {
       byKey.set(r.key, {
         key: r.key,
+        chunkId: r.chunkId,
         text: r.text,
         payload: r.payload,
         vectorScore: r.vectorScore,
@@ -63,6 +65,7 @@ const multiQueryLegalRetrieve = async (query) => {
     } else {
       byKey.set(r.key, {
         key: r.key,
+        chunkId: r.chunkId,
         text: r.text,
         payload: r.payload,
         vectorScore: undefined,
@@ -88,7 +91,8 @@ const multiQueryLegalRetrieve = async (query) => {
     return bMatches - aMatches
   })
 
-  return merged.slice(0, HYBRID_CANDIDATES)
+  // Compact points carry no text; fetch it only for the candidates that survive fusion
+  return hydrateLegalTexts(merged.slice(0, HYBRID_CANDIDATES))
 }
 
 module.exports = { multiQueryLegalRetrieve }
@@ -113,8 +113,7 @@ const startServer = async () => {
     const rerankingEnabled = ragConfig.ENABLE_RERANKING ? 'ENABLED' : 'DISABLED'
     const rerankingStatus = ragConfig.ENABLE_RERANKING ? '✓' : '✗'
 
-    const pdfIngestionUrl =
-      process.env.PDF_INGESTION_URL || 'http://localhost:8003'
+    const pdfIngestionUrl = config.pdfIngestion.url
     const r2Bucket = process.env.CLOUDFLARE_R2_BUCKET_NAME || 'not-configured'
     const r2PublicDomain =
       process.env.CLOUDFLARE_R2_PUBLIC_DOMAIN || 'not-configured'
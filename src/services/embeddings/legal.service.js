@@ -3,10 +3,16 @@ const { LEGAL_COLLECTION } = require('../../lib/qdrant.collections')
 const logger = require('../../utils/logger')
 const {
   indexLegalChunks,
+  enableSparseKeywordSearch,
 } = require('../../rag/retrieval/legalKeywordRetriever')
+const {
+  LEGAL_KEYWORD_BACKEND,
+  LEGAL_SPARSE_VECTOR_NAME,
+} = require('../../config/rag')
 const {
   makeLegalChunkKey,
 } = require('../../rag/retrieval/legalVectorRetriever')
+const { hydrateLegalTexts } = require('../../rag/retrieval/legalChunkTexts')
 
 class LegalService {
   /**
@@ -17,8 +23,28 @@ class LegalService {
    * - Legal ingestion happens outside this service, so without warmup
    *   the keyword index stays empty after restarts.
    *
+   * Skipped when LEGAL_KEYWORD_BACKEND=qdrant and the collection has the
+   * BM25 sparse vector: keyword search then runs in Qdrant instead.
    */
   static async warmupKeywordIndexFromQdrant(opts = {}) {
+    if (LEGAL_KEYWORD_BACKEND === 'qdrant') {
+      try {
+        const info = await qdrant.getCollection(LEGAL_COLLECTION)
+        if (info?.config?.params?.sparse_vectors?.[LEGAL_SPARSE_VECTOR_NAME]) {
+          enableSparseKeywordSearch(true)
+          logger.info(
+            `Legal keyword search uses Qdrant sparse vector "${LEGAL_SPARSE_VECTOR_NAME}"; skipping in-memory warmup`
+          )
+          return
+        }
+        logger.warn(
+          `${LEGAL_COLLECTION} has no sparse vector "${LEGAL_SPARSE_VECTOR_NAME}" (reindex to add it); using the in-memory keyword index`
+        )
+      } catch (error) {
+        logger.warn(`Could not inspect ${LEGAL_COLLECTION} for sparse vectors: ${error.message}`)
+      }
+    }
+
     const limit =
       Number(opts.limit ?? process.env.LEGAL_WARMUP_LIMIT) || 2000
     const batchSize = Math.min(
@@ -47,14 +73,20 @@ class LegalService {
         const points = Array.isArray(res?.points) ? res.points : []
         if (points.length === 0) break
 
-        const chunks = points
-          .map((p) => {
-            const payload = p?.payload || {}
-            const text = payload?.text || ''
-            if (!text) return null
-            return { key: makeLegalChunkKey(payload), text, payload }
-          })
-          .filter(Boolean)
+        // Compact points have their text in the chunk text store
+        const chunks = (
+          await hydrateLegalTexts(
+            points.map((p) => {
+              const payload = p?.payload || {}
+              return {
+                key: makeLegalChunkKey(payload),
+                chunkId: p?.id,
+                text: payload?.text || '',
+                payload,
+              }
+            })
+          )
+        ).filter((c) => c.text)
 
         indexLegalChunks(chunks)
 